@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Self-hosted, content-hashed static assets.
+
+Everything under static/ is served from memory at /static/<name>.<hash>.<ext>
+with a one-year immutable Cache-Control, so repeat visits revalidate nothing.
+url() in CSS files is rewritten to the hashed names, so a font or image change
+busts the stylesheet that references it as well. Unhashed names still resolve,
+with a no-cache header and an ETag.
+
+Maintenance commands (run once, then commit static/):
+
+    python CMAH_assets.py images    # resize NAPADS.png / CNFAC_Logo.png into static/img (needs Pillow)
+    python CMAH_assets.py vendor    # download the Bootswatch theme and Google fonts into static/vendor
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import sys
+
+import flask
+
+HERE       = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(HERE, "static")
+URL_PREFIX = "/static/"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+class AssetManifest:
+    """Logical path → hashed URL for every file under a directory, with the bytes held in memory."""
+
+    def __init__(self, root=STATIC_DIR, prefix=URL_PREFIX):
+        self.root, self.prefix = root, prefix
+        self.files  = {}    # logical path → (body, etag)
+        self.hashed = {}    # hashed path  → logical path
+        self.urls   = {}    # logical path → hashed URL
+        if os.path.isdir(root):
+            self._scan()
+
+    def _scan(self):
+        raw = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                logical = os.path.relpath(path, self.root).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    raw[logical] = f.read()
+        # Hash non-CSS first so stylesheets can point at the hashed names
+        for logical in sorted(raw, key=lambda p: p.endswith(".css")):
+            body = raw[logical]
+            if logical.endswith(".css"):
+                body = self._rewrite_css(logical, body.decode("utf-8")).encode("utf-8")
+            digest = hashlib.sha256(body).hexdigest()[:12]
+            stem, ext = posixpath.splitext(logical)
+            hashed = f"{stem}.{digest}{ext}"
+            self.files[logical] = (body, digest)
+            self.hashed[hashed] = logical
+            self.urls[logical]  = self.prefix + hashed
+
+    def _rewrite_css(self, logical, text):
+        base = posixpath.dirname(logical)
+
+        def replace(match):
+            ref = match.group(2)
+            if ref.startswith(("data:", "http:", "https:", "//", "#")):
+                return match.group(0)
+            target = posixpath.normpath(posixpath.join(base, ref.split("?")[0].split("#")[0]))
+            url = self.urls.get(target)
+            return f'url("{url}")' if url else match.group(0)
+        return _CSS_URL.sub(replace, text)
+
+    def url(self, logical):
+        """Hashed URL for a file under static/ (KeyError if it does not exist)."""
+        return self.urls[logical]
+
+    def has(self, logical):
+        return logical in self.urls
+
+    def serve(self, path):
+        if path in self.hashed:
+            logical, cache_control = self.hashed[path], IMMUTABLE
+        elif path in self.files:
+            logical, cache_control = path, "no-cache"
+        else:
+            flask.abort(404)
+        body, digest = self.files[logical]
+        if flask.request.if_none_match.contains(digest):
+            response = flask.Response(status=304)
+        else:
+            mimetype = mimetypes.guess_type(logical)[0] or "application/octet-stream"
+            response = flask.Response(body, mimetype=mimetype)
+        response.set_etag(digest)
+        response.headers["Cache-Control"] = cache_control
+        return response
+
+    def install(self, server):
+        server.add_url_rule(self.prefix + "<path:path>", "cmah_static", self.serve)
+
+
+# ─── Maintenance commands ─────────────────────────────────────────────────────
+
+# (source image, output stem, target widths); each width is written as WebP,
+# and the middle one also as a 256-colour PNG for the img src fallback.
+IMAGE_VARIANTS = [
+    ("NAPADS.png",     "img/napads", (480, 960, 1440)),
+    ("CNFAC_Logo.png", "img/logo",   (188, 376, 564)),
+]
+
+
+def variant_name(stem, width, ext):
+    return f"{stem}-{width}.{ext}"
+
+
+def build_images():
+    from PIL import Image   # maintenance-only dependency
+
+    for source, stem, widths in IMAGE_VARIANTS:
+        image = Image.open(os.path.join(HERE, source)).convert("RGBA")
+        for i, width in enumerate(widths):
+            height  = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            out = os.path.join(STATIC_DIR, variant_name(stem, width, "webp"))
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            resized.save(out, "WEBP", quality=82, method=6)
+            if i == len(widths) // 2:
+                fallback = resized.quantize(256, method=Image.Quantize.FASTOCTREE)
+                fallback.save(os.path.join(STATIC_DIR, variant_name(stem, width, "png")), "PNG", optimize=True)
+            print(out, os.path.getsize(out), file=sys.stderr)
+
+
+def srcset(manifest, stem, widths, ext="webp"):
+    return ", ".join(f"{manifest.url(variant_name(stem, w, ext))} {w}w" for w in widths)
+
+
+FONTS_CSS_URL = ("https://fonts.googleapis.com/css2?family=Share+Tech+Mono"
+                 "&family=Barlow+Condensed:wght@300;400;600;700&display=swap")
+
+
+def vendor():
+    """Download the Bootswatch theme and the Google fonts into static/vendor."""
+    import urllib.request
+    import dash_bootstrap_components as dbc
+
+    def fetch(url):
+        # A desktop UA makes Google Fonts answer with woff2
+        req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) Chrome/120"})
+        with urllib.request.urlopen(req, timeout=30) as r:
+            return r.read()
+
+    vendor_dir = os.path.join(STATIC_DIR, "vendor")
+    os.makedirs(os.path.join(vendor_dir, "fonts"), exist_ok=True)
+
+    theme = fetch(dbc.themes.DARKLY).decode("utf-8")
+    # The theme @imports Lato from Google Fonts; drop it so no third-party host is needed
+    theme = re.sub(r"@import url\([^)]*fonts\.googleapis[^)]*\);", "", theme)
+    with open(os.path.join(vendor_dir, "darkly.min.css"), "w", encoding="utf-8") as f:
+        f.write(theme)
+
+    css = fetch(FONTS_CSS_URL).decode("utf-8")
+
+    def localise(match):
+        url = match.group(2)
+        name = "fonts/" + hashlib.sha256(url.encode()).hexdigest()[:16] + posixpath.splitext(url)[1]
+        with open(os.path.join(vendor_dir, name), "wb") as f:
+            f.write(fetch(url))
+        return f'url("{name}")'
+    with open(os.path.join(vendor_dir, "fonts.css"), "w", encoding="utf-8") as f:
+        f.write(_CSS_URL.sub(localise, css))
+
+
+if __name__ == "__main__":
+    commands = {"images": build_images, "vendor": vendor}
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        sys.exit(f"usage: python CMAH_assets.py {{{'|'.join(commands)}}}")
+    commands[sys.argv[1]]()
@@ -0,0 +1,750 @@
+# -*- coding: utf-8 -*-
+"""
+Reproducible benchmarks for the dashboard.
+
+    python CMAH_bench.py micro -o bench/micro.json      # figure builders and callbacks, in-process
+    python CMAH_bench.py load  -o bench/load.json       # gunicorn + /_dash-update-component load test
+    python CMAH_bench.py scaling --workers 1,2,4        # load test at several worker counts
+    python CMAH_bench.py threadsafety                   # concurrent callbacks == sequential callbacks
+    python CMAH_bench.py coldstart --target-s 1.5       # import breakdown + time to first response
+    python CMAH_bench.py history --zones 12 --seasons 10  # trend queries over synthetic seasons
+    python CMAH_bench.py collab --viewers 48 --editors 4  # shared editing: SSE fan-out to many browsers
+    python CMAH_bench.py compare old.json new.json      # flag regressions between two result files
+
+micro reports, per case, the median/p95 wall time, the tracemalloc peak and the
+serialised payload size. Callbacks are driven through the Flask test client,
+so the numbers include Dash dispatch and JSON serialisation. load starts a
+local gunicorn and reports throughput and p50/p95/p99 latency. coldstart
+breaks the import of CMAH_dash down by top-level package, then restarts
+gunicorn repeatedly with and without CMAH_FAST_START=1, timing the first 200
+on / and the first forecast callback. It exits 1 if fast start misses --target-s.
+collab runs one gunicorn worker with CMAH_COLLAB=1, many SSE viewers and a few
+concurrent editors, and exits 1 if any viewer ends with a different grid.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# ─── Helpers ──────────────────────────────────────────────────────────────────
+
+def percentile(values, q):
+    """q-th percentile (0–100) by linear interpolation."""
+    values = sorted(values)
+    if not values:
+        return None
+    k = (len(values) - 1) * q / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata():
+    return {
+        "revision":  git_revision(),
+        "python":    platform.python_version(),
+        "platform":  platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def forecast_request(sens, dist, size_range, grid_code, changed, problems=None):
+    """Body of a /_dash-update-component request for the forecast callback.
+    problems is a problems-store value; None means the single default problem."""
+    return {
+        "output": "..likelihood-matrix.figure...danger-matrix.figure...forecast-summary.children..",
+        "outputs": [{"id": "likelihood-matrix", "property": "figure"},
+                    {"id": "danger-matrix", "property": "figure"},
+                    {"id": "forecast-summary", "property": "children"}],
+        "inputs": [{"id": "sens-slider", "property": "value", "value": sens},
+                   {"id": "dist-slider", "property": "value", "value": dist},
+                   {"id": "size-slider", "property": "value", "value": size_range},
+                   {"id": "danger-grid-store", "property": "data", "value": grid_code},
+                   {"id": "problems-store", "property": "data", "value": problems}],
+        "changedPropIds": changed,
+    }
+
+
+def edit_request(row, col, brush, grid_code, history=None, trigger="grid-editor.clickData", session=None):
+    """Body of a /_dash-update-component request for a grid-editor click (or another edit_grid trigger)."""
+    return {
+        "output": "..danger-grid-store.data...grid-editor.figure...grid-history.data"
+                  "...undo-grid-btn.disabled...redo-grid-btn.disabled..",
+        "outputs": [{"id": "danger-grid-store", "property": "data"},
+                    {"id": "grid-editor", "property": "figure"},
+                    {"id": "grid-history", "property": "data"},
+                    {"id": "undo-grid-btn", "property": "disabled"},
+                    {"id": "redo-grid-btn", "property": "disabled"}],
+        "inputs": [{"id": "grid-editor", "property": "clickData", "value": {"points": [{"x": col, "y": row}]}},
+                   {"id": "reset-grid-btn", "property": "n_clicks", "value": None},
+                   {"id": "profile-select", "property": "value", "value": None},
+                   {"id": "undo-grid-btn", "property": "n_clicks", "value": None},
+                   {"id": "redo-grid-btn", "property": "n_clicks", "value": None}],
+        "state": [{"id": "grid-brush", "property": "value", "value": brush},
+                  {"id": "danger-grid-store", "property": "data", "value": grid_code},
+                  {"id": "grid-history", "property": "data", "value": history or {"undo": [], "redo": []}},
+                  {"id": "collab-session", "property": "data", "value": session}],
+        "changedPropIds": [trigger],
+    }
+
+
+def random_forecast_state(rng):
+    lo = rng.randrange(9)
+    return rng.randrange(7), rng.randrange(5), [lo, rng.randrange(lo, 9)]
+
+
+# ─── Micro benchmarks ─────────────────────────────────────────────────────────
+
+def measure(fn, repeat, setup=None):
+    """Time fn() repeat times (after one warm-up), then once more under tracemalloc."""
+    if setup:
+        setup()
+    payload = fn()
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_ms":     round(statistics.median(times), 3),
+        "p95_ms":        round(percentile(times, 95), 3),
+        "peak_alloc_kb": round(peak / 1024, 1),
+        "payload_bytes": payload,
+        "repeat":        repeat,
+    }
+
+
+def run_micro(repeat):
+    sys.path.insert(0, HERE)
+    import plotly.io as pio
+    import CMAH_dash as dash_app
+    import CMAH_render
+    from CMAH_engine import DEFAULT_GRID_CODE, STATE_LEVEL_CACHE, grid_set_cell, grid_apply, history_record
+
+    client = dash_app.server.test_client()
+    caches = [dash_app.LIKELIHOOD_FIG_CACHE, dash_app.DANGER_BASE_CACHE, dash_app.SUMMARY_CACHE]
+
+    def clear_caches():
+        for cache in caches:
+            cache.clear()
+
+    def post(body):
+        return lambda: len(client.post("/_dash-update-component", json=body).data)
+
+    full = forecast_request(4, 2, [1, 4], DEFAULT_GRID_CODE, ["danger-grid-store.data"])
+    tick = forecast_request(5, 2, [1, 4], DEFAULT_GRID_CODE, ["sens-slider.value"])
+    problems = {"active": 0, "problems": [[5, 2, 1, 4], [2, 1, 0, 2], [6, 4, 3, 7], [1, 3, 2, 5]]}
+    four = forecast_request(5, 2, [1, 4], DEFAULT_GRID_CODE, ["problems-store.data"], problems)
+    bulletin = [tuple(p) for p in problems["problems"][:2]]
+    impact = {
+        "output": "..impact-summary.children...impact-chart.figure..",
+        "outputs": [{"id": "impact-summary", "property": "children"}, {"id": "impact-chart", "property": "figure"}],
+        "inputs": [{"id": "impact-reference", "property": "value", "value": "default"},
+                   {"id": "danger-grid-store", "property": "data", "value": grid_set_cell(DEFAULT_GRID_CODE, 4, 3, 4)}],
+        "changedPropIds": ["danger-grid-store.data"], "state": [],
+    }
+    # A long editing session: the history is at its bound, the newest entry is a reset
+    history, edited = None, DEFAULT_GRID_CODE
+    for i in range(120):
+        delta = [[i % 9, i // 9 % 9, int(edited[i % 9 * 9 + i // 9 % 9]), i % 5 + 1]]
+        edited, history = grid_apply(edited, delta), history_record(history, delta)
+    history = history_record(history, dash_app.grid_diff(edited, DEFAULT_GRID_CODE))
+    undo = edit_request(0, 0, "Low", DEFAULT_GRID_CODE, history, trigger="undo-grid-btn.n_clicks")
+    uncertainty = {
+        "output": "uncertainty-bar.children", "outputs": {"id": "uncertainty-bar", "property": "children"},
+        "inputs": [{"id": "uncertainty-state", "property": "data",
+                    "value": {"spread": [2, 1, 1], "sens": 5, "dist": 2, "size": [1, 4],
+                              "grid": DEFAULT_GRID_CODE, "problems": problems}}],
+        "changedPropIds": ["uncertainty-state.data"], "state": [],
+    }
+    cases = {
+        "build_likelihood_figure":
+            (lambda: len(pio.to_json(dash_app.build_likelihood_figure(1.5, 1.0))), None),
+        "build_danger_figure":
+            (lambda: len(pio.to_json(dash_app.build_danger_figure([2, 6], [1, 4], DEFAULT_GRID_CODE))), None),
+        # The 81-dropdown make_danger_grid_buttons was replaced by this single heatmap
+        "build_grid_editor_figure":
+            (lambda: len(pio.to_json(dash_app.build_grid_editor_figure(DEFAULT_GRID_CODE))), None),
+        "update_all.full.cold":  (post(full), clear_caches),
+        "update_all.full.warm":  (post(full), None),
+        "update_all.slider_tick": (post(tick), None),
+        # Four problems on one base heatmap: only the overlays are rebuilt
+        "update_all.problems4.warm": (post(four), None),
+        # 20,000 Monte Carlo samples per problem, sampling cache cleared each run
+        "update_uncertainty.problems4": (post(uncertainty), dash_app.UNCERTAINTY_CACHE.clear),
+        # Full 1,575-state comparison after an edit, nothing cached
+        "update_impact.edit":    (post(impact), lambda: (dash_app.IMPACT_CACHE.clear(), STATE_LEVEL_CACHE.clear())),
+        "edit_grid.cell":        (post(edit_request(3, 4, "Extreme", DEFAULT_GRID_CODE)), None),
+        "edit_grid.undo_reset":  (post(undo), None),
+        # Bulletin graphics drawn without plotly (CMAH_render), cache cleared each run
+        "render.danger.svg":     (lambda: len(CMAH_render.render("danger", bulletin, DEFAULT_GRID_CODE, "svg")),
+                                  CMAH_render.RENDER_CACHE.clear),
+        "render.danger.png":     (lambda: len(CMAH_render.render("danger", bulletin, DEFAULT_GRID_CODE, "png")),
+                                  CMAH_render.RENDER_CACHE.clear),
+        "layout":                (lambda: len(client.get("/_dash-layout").data), None),
+    }
+    results = {}
+    for name, (fn, setup) in cases.items():
+        results[name] = measure(fn, repeat, setup)
+        print(f"{name:28s} {results[name]['median_ms']:9.3f} ms  p95 {results[name]['p95_ms']:9.3f} ms"
+              f"  peak {results[name]['peak_alloc_kb']:8.1f} KB  {results[name]['payload_bytes']:8d} B",
+              file=sys.stderr)
+    return results
+
+
+# ─── History store ────────────────────────────────────────────────────────────
+
+def synthetic_history(zones, seasons, seed):
+    """Rows for HistoryStore.record_many: a forecast with 1–3 problems every day
+    from Nov 15 to Apr 15 in each zone and season, with danger drifting day to day."""
+    import datetime
+    from CMAH_engine import DEFAULT_GRID_CODE, assess
+    from CMAH_history import to_day
+
+    rng = random.Random(seed)
+    rows = []
+    for z in range(zones):
+        for year in range(2026 - seasons, 2026):
+            first, last = to_day(datetime.date(year, 11, 15)), to_day(datetime.date(year + 1, 4, 15))
+            state = [rng.randrange(7), rng.randrange(5), 2, 4]
+            for day in range(first, last + 1):
+                state = [min(6, max(0, state[0] + rng.choice((-1, 0, 0, 1)))),
+                         min(4, max(0, state[1] + rng.choice((-1, 0, 0, 1)))), 2, 4]
+                problems = [state] + [[rng.randrange(7), rng.randrange(5), 1, rng.randrange(1, 9)]
+                                      for _ in range(rng.randrange(3))]
+                result = assess(*zip(*problems), DEFAULT_GRID_CODE)
+                for i, p in enumerate(problems):
+                    rows.append((f"Zone {z:02d}", day, i, *p, int(result.lik_lo[i]), int(result.lik_hi[i]),
+                                 int(result.max_level[i]), DEFAULT_GRID_CODE, None, 0.0))
+    return rows
+
+
+def run_history(zones, seasons, repeat, seed):
+    """Seed a throwaway history database and time trend queries and chart building over it."""
+    sys.path.insert(0, HERE)
+    from CMAH_history import HistoryStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.sqlite3")
+        store = HistoryStore(path)
+        rows = synthetic_history(zones, seasons, seed)
+        t0 = time.perf_counter()
+        store.record_many(rows)
+        insert_s = time.perf_counter() - t0
+        store._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        names = [z for z, *_ in store.zones()]
+        last_season = (f"{2025}-11-15", f"{2026}-04-15")
+
+        os.environ["CMAH_HISTORY_DB"] = path
+        import CMAH_dash as dash_app
+        dash_app.HISTORY = store
+
+        cases = {
+            "one_zone.one_season":  lambda: store.daily_max(names[:1], *last_season),
+            "one_zone.all_seasons": lambda: store.daily_max(names[:1]),
+            "all_zones.one_season": lambda: store.daily_max(names, *last_season),
+            "all_zones.all_seasons": lambda: store.daily_max(names),
+            "update_history.all":   lambda: dash_app.update_history(names, None, None),
+        }
+        results = {"rows": len(rows), "zones": zones, "seasons": seasons,
+                   "insert_s": round(insert_s, 3), "db_bytes": os.path.getsize(path)}
+        for name, fn in cases.items():
+            fn()
+            times = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                fn()
+                times.append((time.perf_counter() - t0) * 1000)
+            results[name] = {"median_ms": round(statistics.median(times), 3),
+                             "p95_ms": round(percentile(times, 95), 3)}
+            print(f"{name:24s} {results[name]['median_ms']:9.3f} ms  p95 {results[name]['p95_ms']:9.3f} ms",
+                  file=sys.stderr)
+        print(f"{len(rows)} rows, {results['db_bytes'] / 1e6:.1f} MB", file=sys.stderr)
+    return results
+
+
+# ─── Load test ────────────────────────────────────────────────────────────────
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(port, workers, threads, env=None):
+    """Start gunicorn (with gunicorn.conf.py) on port and return (process, seconds until the first 200 on /)."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "CMAH_dash:server", "--bind", f"127.0.0.1:{port}",
+         "--workers", str(workers), "--threads", str(threads), "--timeout", "120"],
+        cwd=HERE, env={**os.environ, "WEB_CONCURRENCY": str(workers), "CMAH_THREADS": str(threads), **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2) as r:
+                if r.status == 200:
+                    return proc, time.perf_counter() - t0
+        except OSError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def process_tree_pss_mb(pid):
+    """Proportional set size of pid and its children in MB (shared pages split between
+    processes, so forked workers aren't double counted); None where /proc isn't available."""
+    pids, total_kb = [pid], 0
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+        for p in pids:
+            with open(f"/proc/{p}/smaps_rollup") as f:
+                total_kb += next(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+    except (OSError, StopIteration):
+        return None
+    return round(total_kb / 1024, 1)
+
+
+def run_load(workers, threads, concurrency, requests, seed, slider_ticks=True, env=None):
+    sys.path.insert(0, HERE)
+    from CMAH_engine import DEFAULT_GRID_CODE
+
+    port = free_port()
+    proc, ready_s = start_gunicorn(port, workers, threads, env)
+    url = f"http://127.0.0.1:{port}/_dash-update-component"
+    rng = random.Random(seed)
+    changed = ["sens-slider.value"] if slider_ticks else ["danger-grid-store.data"]
+    bodies = [json.dumps(forecast_request(*random_forecast_state(rng), DEFAULT_GRID_CODE, changed)).encode()
+              for _ in range(requests)]
+
+    def send(body):
+        req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        t0 = time.perf_counter()
+        with urllib.request.urlopen(req, timeout=120) as r:
+            n = len(r.read())
+        return (time.perf_counter() - t0) * 1000, n
+
+    try:
+        for body in bodies[:min(50, requests)]:      # warm caches and imports
+            send(body)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(send, bodies))
+        elapsed = time.perf_counter() - t0
+        memory_mb = process_tree_pss_mb(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    latencies = [ms for ms, _ in samples]
+    result = {
+        "workers": workers, "threads": threads, "concurrency": concurrency,
+        "requests": requests, "slider_ticks": slider_ticks,
+        "ready_s":        round(ready_s, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms":         round(percentile(latencies, 50), 2),
+        "p95_ms":         round(percentile(latencies, 95), 2),
+        "p99_ms":         round(percentile(latencies, 99), 2),
+        "mean_bytes":     round(statistics.mean(n for _, n in samples)),
+        "memory_pss_mb":  memory_mb,
+    }
+    print(json.dumps(result), file=sys.stderr)
+    return result
+
+
+def run_scaling(worker_counts, threads, concurrency, requests, seed, slider_ticks):
+    """run_load once per worker count, with the shared figure cache on for more than one worker."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in worker_counts:
+            shared = os.path.join(tmp, f"cache-{workers}.sqlite3") if workers > 1 else ""
+            results.append(run_load(workers, threads, concurrency, requests, seed, slider_ticks,
+                                    env={"CMAH_SHARED_CACHE": shared}))
+    base = results[0]["throughput_rps"]
+    for r in results:
+        r["speedup"] = round(r["throughput_rps"] / base, 2)
+        print(f"workers {r['workers']:2d} × threads {r['threads']}: {r['throughput_rps']:8.1f} req/s "
+              f"(×{r['speedup']:.2f})  p95 {r['p95_ms']:8.1f} ms  PSS {r['memory_pss_mb']} MB", file=sys.stderr)
+    return results
+
+
+# ─── Shared editing ───────────────────────────────────────────────────────────
+
+def process_tree_cpu_s(pid):
+    """User + system CPU seconds of pid and its children so far; None where /proc isn't available."""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids = [pid] + [int(p) for p in f.read().split()]
+        total = 0
+        for p in pids:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            total += int(fields[11]) + int(fields[12])
+    except (OSError, IndexError, ValueError):
+        return None
+    return total / os.sysconf("SC_CLK_TCK")
+
+
+def sse_events(response):
+    """(event, data, id) for each message of a text/event-stream response."""
+    event = data = event_id = None
+    for raw in response:
+        line = raw.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if event is not None:
+                yield event, json.loads(data), event_id
+            event = data = event_id = None
+        elif line.startswith("event: "):
+            event = line[7:]
+        elif line.startswith("data: "):
+            data = line[6:]
+        elif line.startswith("id: "):
+            event_id = line[4:]
+
+
+def run_collab(viewers, editors, edits, seed, session="bench"):
+    """
+    Multi-client test of shared editing against a local gunicorn with CMAH_COLLAB=1:
+    viewers browsers follow one session over SSE while editors send edit_grid
+    callbacks concurrently. Every viewer keeps its own grid from the stream alone
+    and must end with the session's grid. Reports push latency (callback sent →
+    cell received), idle CPU with every stream open and memory.
+    """
+    sys.path.insert(0, HERE)
+    from CMAH_engine import DEFAULT_GRID_CODE, GRID_SHAPE, DANGER_LEVELS, grid_cell, grid_set_cell
+
+    port = free_port()
+    proc, _ = start_gunicorn(port, 1, viewers + editors + 4,
+                             env={"CMAH_COLLAB": "1", "CMAH_COLLAB_STREAMS": str(viewers + 1)})
+    base = f"http://127.0.0.1:{port}"
+    stream_url = f"{base}/collab/{session}/events?grid={DEFAULT_GRID_CODE}"
+    rng = random.Random(seed)
+    # Distinct (row, col, level) edits that all change the default grid, so each is published once
+    cells = [(r, c, lv) for r in range(GRID_SHAPE[0]) for c in range(GRID_SHAPE[1])
+             for lv in range(len(DANGER_LEVELS)) if lv != grid_cell(DEFAULT_GRID_CODE, r, c)]
+    rng.shuffle(cells)
+    cells = cells[:edits]
+    sent = {}
+    joined = threading.Semaphore(0)
+
+    class Viewer(threading.Thread):
+        def __init__(self):
+            super().__init__(daemon=True)
+            self.grid, self.received, self.latency = None, 0, []
+
+        def run(self):
+            try:
+                with urllib.request.urlopen(stream_url, timeout=120) as response:
+                    for event, data, _ in sse_events(response):
+                        if event == "grid":
+                            self.grid = data["grid"]
+                            joined.release()
+                            continue
+                        now = time.perf_counter()
+                        for r, c, lv in data:
+                            self.grid = grid_set_cell(self.grid, r, c, lv)
+                            self.latency.append(now - sent[(r, c, lv)])
+                            self.received += 1
+            except OSError:     # the server is stopped at the end of the run
+                pass
+
+    def edit(cell):
+        r, c, lv = cell
+        body = json.dumps(edit_request(r, c, DANGER_LEVELS[lv], DEFAULT_GRID_CODE, session=session)).encode()
+        req = urllib.request.Request(f"{base}/_dash-update-component", data=body,
+                                     headers={"Content-Type": "application/json"})
+        sent[cell] = time.perf_counter()
+        with urllib.request.urlopen(req, timeout=120) as response:
+            response.read()
+
+    try:
+        clients = [Viewer() for _ in range(viewers)]
+        for v in clients:
+            v.start()
+        for _ in clients:
+            if not joined.acquire(timeout=60):
+                raise RuntimeError("viewers did not connect")
+        cpu0 = process_tree_cpu_s(proc.pid)
+        time.sleep(2.0)
+        cpu1 = process_tree_cpu_s(proc.pid)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(editors) as pool:
+            list(pool.map(edit, cells))
+        edit_s = time.perf_counter() - t0
+        deadline = time.time() + 60
+        while time.time() < deadline and any(v.received < len(cells) for v in clients):
+            time.sleep(0.05)
+        # A browser joining now gets the session's grid as its first event
+        with urllib.request.urlopen(stream_url, timeout=30) as response:
+            expected = next(data["grid"] for event, data, _ in sse_events(response) if event == "grid")
+        memory_mb = process_tree_pss_mb(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    latencies = [x * 1000 for v in clients for x in v.latency]
+    diverged = sum(1 for v in clients if v.grid != expected or v.received != len(cells))
+    result = {
+        "viewers": viewers, "editors": editors, "edits": len(cells),
+        "edits_per_s":   round(len(cells) / edit_s, 1),
+        "deliveries":    len(latencies),
+        "p50_ms":        round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms":        round(percentile(latencies, 95), 2) if latencies else None,
+        "max_ms":        round(max(latencies), 2) if latencies else None,
+        "idle_cpu_pct":  round((cpu1 - cpu0) / 2.0 * 100, 1) if cpu0 is not None else None,
+        "memory_pss_mb": memory_mb,
+        "diverged":      diverged,
+    }
+    print(json.dumps(result), file=sys.stderr)
+    return result
+
+
+# ─── Thread safety ────────────────────────────────────────────────────────────
+
+def run_threadsafety(threads, states, rounds, seed):
+    """
+    Replay the same callback requests sequentially and then from many threads at
+    once (with cold caches) and check every concurrent response is byte-identical
+    to its sequential one. Returns the number of mismatches.
+    """
+    sys.path.insert(0, HERE)
+    import CMAH_dash as dash_app
+    from CMAH_engine import DEFAULT_GRID_CODE, DANGER_LEVELS
+
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(states):
+        changed = rng.choice([["danger-grid-store.data"], ["sens-slider.value"], ["size-slider.value"]])
+        bodies.append(forecast_request(*random_forecast_state(rng), DEFAULT_GRID_CODE, changed))
+        bodies.append(edit_request(rng.randrange(9), rng.randrange(9), rng.choice(DANGER_LEVELS), DEFAULT_GRID_CODE))
+    caches = [dash_app.LIKELIHOOD_FIG_CACHE, dash_app.DANGER_BASE_CACHE, dash_app.SUMMARY_CACHE]
+
+    def send(body):
+        with dash_app.server.test_client() as client:
+            return client.post("/_dash-update-component", json=body, headers={"Accept-Encoding": "identity"}).data
+
+    expected = [send(body) for body in bodies]
+    jobs = [i for i in range(len(bodies)) for _ in range(rounds)]
+    rng.shuffle(jobs)
+    for cache in caches:
+        cache.clear()
+    with ThreadPoolExecutor(threads) as pool:
+        got = list(pool.map(lambda i: send(bodies[i]), jobs))
+    mismatches = sum(1 for i, data in zip(jobs, got) if data != expected[i])
+    print(f"{len(jobs)} concurrent callback requests on {threads} threads: {mismatches} mismatches", file=sys.stderr)
+    return {"threads": threads, "requests": len(jobs), "mismatches": mismatches}
+
+
+# ─── Cold start ───────────────────────────────────────────────────────────────
+
+def import_breakdown(env=None):
+    """Self time (ms) of every module imported by `import CMAH_dash`, summed per top-level package."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import CMAH_dash"], cwd=HERE,
+                         env={**os.environ, **(env or {})}, capture_output=True, text=True, check=True).stderr
+    totals = {}
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0.0) + int(self_us) / 1000
+    return dict(sorted(((k, round(v, 1)) for k, v in totals.items()), key=lambda kv: -kv[1]))
+
+
+def cold_start_once(env):
+    """One cold gunicorn start: seconds to the first 200 on /, then the first forecast callback."""
+    sys.path.insert(0, HERE)
+    from CMAH_engine import DEFAULT_GRID_CODE
+
+    port = free_port()
+    proc, ready_s = start_gunicorn(port, 1, 1, env)
+    try:
+        body = json.dumps(forecast_request(2, 1, [1, 4], DEFAULT_GRID_CODE, ["danger-grid-store.data"])).encode()
+        req = urllib.request.Request(f"http://127.0.0.1:{port}/_dash-update-component", data=body,
+                                     headers={"Content-Type": "application/json"})
+        t0 = time.perf_counter()
+        with urllib.request.urlopen(req, timeout=120) as r:
+            r.read()
+        first_callback_ms = (time.perf_counter() - t0) * 1000
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return ready_s, first_callback_ms
+
+
+def run_coldstart(runs, target_s):
+    results = {"target_s": target_s}
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        modes = {
+            "default":    {"CMAH_FAST_START": "0"},
+            "fast_start": {"CMAH_FAST_START": "1", "CMAH_SNAPSHOT_DIR": snapshot_dir},
+        }
+        cold_start_once(modes["fast_start"])     # write the snapshot, as a deploy build step would
+        for mode, env in modes.items():
+            samples = [cold_start_once(env) for _ in range(runs)]
+            results[mode] = {
+                "ready_s":           round(statistics.median(s for s, _ in samples), 3),
+                "ready_s_max":       round(max(s for s, _ in samples), 3),
+                "first_callback_ms": round(statistics.median(ms for _, ms in samples), 1),
+                "imports_ms":        import_breakdown(env),
+            }
+            top = ", ".join(f"{k} {v:.0f}" for k, v in list(results[mode]["imports_ms"].items())[:6])
+            print(f"{mode:11s} ready {results[mode]['ready_s']:.3f} s  first callback "
+                  f"{results[mode]['first_callback_ms']:.1f} ms  imports (ms): {top}", file=sys.stderr)
+    results["target_met"] = results["fast_start"]["ready_s"] <= target_s
+    return results
+
+
+# ─── Compare ──────────────────────────────────────────────────────────────────
+
+def compare(old, new, threshold):
+    """Print per-metric changes; return the number of time metrics that regressed past threshold."""
+    regressions = 0
+    for name in sorted(set(old.get("micro", {})) & set(new.get("micro", {}))):
+        for metric in ("median_ms", "p95_ms", "peak_alloc_kb", "payload_bytes"):
+            a, b = old["micro"][name].get(metric), new["micro"][name].get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            flag = ""
+            if metric.endswith("_ms") and change > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{name:28s} {metric:14s} {a:12.3f} → {b:12.3f}  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CMAH dashboard benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_micro = sub.add_parser("micro", help="figure builders and callbacks in-process")
+    p_micro.add_argument("--repeat", type=int, default=30)
+    p_micro.add_argument("-o", "--output")
+
+    p_load = sub.add_parser("load", help="load test against a local gunicorn")
+    p_load.add_argument("--workers", type=int, default=1)
+    p_load.add_argument("--threads", type=int, default=1)
+    p_load.add_argument("--concurrency", type=int, default=8)
+    p_load.add_argument("--requests", type=int, default=500)
+    p_load.add_argument("--full", action="store_true",
+                        help="send grid-change (full figure) callbacks instead of slider ticks")
+    p_load.add_argument("--seed", type=int, default=0)
+    p_load.add_argument("-o", "--output")
+
+    p_scale = sub.add_parser("scaling", help="load test at several worker counts")
+    p_scale.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    p_scale.add_argument("--threads", type=int, default=4)
+    p_scale.add_argument("--concurrency", type=int, default=16)
+    p_scale.add_argument("--requests", type=int, default=1000)
+    p_scale.add_argument("--full", action="store_true",
+                         help="send grid-change (full figure) callbacks instead of slider ticks")
+    p_scale.add_argument("--seed", type=int, default=0)
+    p_scale.add_argument("-o", "--output")
+
+    p_ts = sub.add_parser("threadsafety", help="concurrent callbacks must match sequential ones")
+    p_ts.add_argument("--threads", type=int, default=16)
+    p_ts.add_argument("--states", type=int, default=100)
+    p_ts.add_argument("--rounds", type=int, default=5)
+    p_ts.add_argument("--seed", type=int, default=0)
+    p_ts.add_argument("-o", "--output")
+
+    p_cold = sub.add_parser("coldstart", help="import breakdown and time to first response after a restart")
+    p_cold.add_argument("--runs", type=int, default=5)
+    p_cold.add_argument("--target-s", type=float, default=1.5,
+                        help="max median seconds from process start to the first 200 with fast start")
+    p_cold.add_argument("-o", "--output")
+
+    p_hist = sub.add_parser("history", help="season history queries over synthetic seasons")
+    p_hist.add_argument("--zones", type=int, default=12)
+    p_hist.add_argument("--seasons", type=int, default=10)
+    p_hist.add_argument("--repeat", type=int, default=30)
+    p_hist.add_argument("--seed", type=int, default=0)
+    p_hist.add_argument("-o", "--output")
+
+    p_collab = sub.add_parser("collab", help="shared grid editing: SSE viewers and concurrent editors")
+    p_collab.add_argument("--viewers", type=int, default=48)
+    p_collab.add_argument("--editors", type=int, default=4)
+    p_collab.add_argument("--edits", type=int, default=200)
+    p_collab.add_argument("--seed", type=int, default=0)
+    p_collab.add_argument("-o", "--output")
+
+    p_cmp = sub.add_parser("compare", help="compare two micro result files")
+    p_cmp.add_argument("old")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown (0.2 = 20%%)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.old) as f_old, open(args.new) as f_new:
+            sys.exit(1 if compare(json.load(f_old), json.load(f_new), args.threshold) else 0)
+
+    if args.command == "micro":
+        results = {"meta": metadata(), "micro": run_micro(args.repeat)}
+    elif args.command == "coldstart":
+        results = {"meta": metadata(), "coldstart": run_coldstart(args.runs, args.target_s)}
+    elif args.command == "scaling":
+        results = {"meta": metadata(), "scaling": run_scaling(
+            [int(w) for w in args.workers.split(",")], args.threads, args.concurrency,
+            args.requests, args.seed, not args.full)}
+    elif args.command == "history":
+        results = {"meta": metadata(), "history": run_history(args.zones, args.seasons, args.repeat, args.seed)}
+    elif args.command == "collab":
+        results = {"meta": metadata(), "collab": run_collab(args.viewers, args.editors, args.edits, args.seed)}
+    elif args.command == "threadsafety":
+        results = {"meta": metadata(), "threadsafety": run_threadsafety(
+            args.threads, args.states, args.rounds, args.seed)}
+    else:
+        results = {"meta": metadata(), "load": run_load(args.workers, args.threads, args.concurrency,
+                                                          args.requests, args.seed, not args.full)}
+    text = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.command == "coldstart" and not results["coldstart"]["target_met"]:
+        sys.exit(1)
+    if args.command == "threadsafety" and results["threadsafety"]["mismatches"]:
+        sys.exit(1)
+    if args.command == "collab" and results["collab"]["diverged"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Shared danger grid editing sessions, pushed to browsers with Server-Sent Events.
+
+Opt-in with CMAH_COLLAB=1. Forecasters who join the same session name on the
+Settings tab edit one grid. edit_grid publishes each edit here as
+[row, col, level] cells instead of changing the browser's grid itself. Every
+browser in the session, the editor included, receives those cells on
+/collab/<name>/events and applies them (assets/cmah_collab.js). So all of them
+apply the same edits in the same order and end up with the same grid.
+
+A Session holds the current grid code, a version number and a short log of
+recent edits. A browser that reconnects with Last-Event-ID gets only the edits
+it missed, or the whole grid if they have left the log. Open streams wait on
+one Condition per session, so an idle viewer costs a blocked thread and no
+CPU, and an edit wakes every stream at once. A ": ping" comment every
+HEARTBEAT seconds keeps proxies from closing idle streams and detects browsers
+that have gone away.
+
+Sessions live in process memory, so gunicorn.conf.py runs one worker with a
+thread per stream in this mode. `python CMAH_bench.py collab` is a local
+multi-client test.
+"""
+import json
+import os
+import re
+import threading
+from collections import deque
+
+from CMAH_engine import grid_apply, is_grid_code
+
+MAX_STREAMS = int(os.environ.get("CMAH_COLLAB_STREAMS", "48"))
+LOG_SIZE    = 256       # edits kept per session for reconnecting browsers
+HEARTBEAT   = 15.0      # seconds between keep-alive comments on an idle stream
+RETRY_MS    = 3000      # EventSource reconnect delay sent to browsers
+
+SESSION_NAME = re.compile(r"^[\w .-]{1,40}$")
+
+
+def sse(event, data, event_id=None):
+    """One Server-Sent Events message."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Session:
+    """One shared grid and the streams watching it."""
+
+    def __init__(self, grid_code):
+        self.grid_code = grid_code
+        self.version = 0
+        self.log = deque(maxlen=LOG_SIZE)   # (version, cells)
+        self.changed = threading.Condition()
+        self.viewers = 0
+
+    def since(self, version):
+        """Edits after version as (version, cells) pairs, or None if some have left the log."""
+        if version >= self.version:
+            return []
+        if not self.log or self.log[0][0] > version + 1:
+            return None
+        return [entry for entry in self.log if entry[0] > version]
+
+
+class Stream:
+    """
+    Response iterable for one open stream. The server calls close() when the
+    browser goes away, even if no message was sent, which frees the stream slot.
+    """
+
+    def __init__(self, messages, on_close):
+        self._messages, self._on_close = messages, on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._messages)
+
+    def close(self):
+        if self._on_close is not None:
+            self._messages.close()
+            self._on_close()
+            self._on_close = None
+
+
+class CollabHub:
+    """Registry of named sessions; publish() and stream() are safe from any thread."""
+
+    def __init__(self, max_streams=MAX_STREAMS, heartbeat=HEARTBEAT):
+        self.heartbeat = heartbeat
+        self.max_streams = max_streams
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_streams)
+        self.published = 0
+
+    def _join(self, name, seed):
+        with self._lock:
+            session = self._sessions.get(name)
+            if session is None:
+                session = self._sessions[name] = Session(seed)
+            session.viewers += 1
+            return session
+
+    def _leave(self, name, session):
+        with self._lock:
+            session.viewers -= 1
+            if session.viewers == 0 and self._sessions.get(name) is session:
+                del self._sessions[name]
+
+    def publish(self, name, cells):
+        """
+        Apply [row, col, level] cells to a session and wake its streams. Returns the
+        new version, or None if nobody is connected to that session.
+        """
+        with self._lock:
+            session = self._sessions.get(name)
+        if session is None:
+            return None
+        with session.changed:
+            session.grid_code = grid_apply(session.grid_code, [(r, c, None, level) for r, c, level in cells])
+            session.version += 1
+            session.log.append((session.version, cells))
+            session.changed.notify_all()
+        self.published += 1
+        return session.version
+
+    def stream(self, name, seed, last_id=None):
+        """
+        SSE messages for one browser, or None if MAX_STREAMS are open. A new
+        session starts from seed (the joining browser's grid). With last_id, only
+        the edits after it are sent; otherwise the whole grid comes first.
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        session = self._join(name, seed)
+        return Stream(self._messages(session, last_id), lambda: self._close(name, session))
+
+    def _close(self, name, session):
+        self._leave(name, session)
+        self._slots.release()
+
+    def _messages(self, session, last_id):
+        yield f"retry: {RETRY_MS}\n\n"
+        with session.changed:
+            version = session.version
+            missed = session.since(last_id) if last_id is not None and last_id <= version else None
+            grid_code = session.grid_code
+        while True:
+            if missed is None:
+                yield sse("grid", {"grid": grid_code}, version)
+            elif missed:
+                for v, cells in missed:
+                    yield sse("cells", cells, v)
+            else:
+                yield ": ping\n\n"
+            with session.changed:
+                session.changed.wait_for(lambda: session.version > version, timeout=self.heartbeat)
+                missed = session.since(version)
+                grid_code = session.grid_code
+                version = session.version
+
+    def stats(self):
+        with self._lock:
+            viewers = sum(s.viewers for s in self._sessions.values())
+            return {"sessions": len(self._sessions), "streams": viewers, "published": self.published}
+
+
+def parse_last_id(value):
+    """Last-Event-ID header (or ?last=) as an int, or None."""
+    try:
+        return int(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def valid_session(name, seed):
+    return bool(SESSION_NAME.match(name or "")) and is_grid_code(seed)
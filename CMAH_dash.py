@@ -4,221 +4,119 @@ Created on Wed Feb 25
 
 @author: andrew schauer/CNFAC
 """
+import os
+import sys
+import json
+import hashlib
+import datetime
+
+# CMAH_FAST_START=1 trims worker start-up for hosts that sleep idle apps (see
+# CMAH_snapshot.py). dash imports IPython for notebook support whenever it is
+# installed — about half a second that a web server never uses — so hide it
+# unless we're already running inside IPython.
+FAST_START = os.environ.get("CMAH_FAST_START", "0") == "1"
+if FAST_START and "IPython" not in sys.modules:
+    sys.modules["IPython"] = None
+
+import flask
+from flask import request
 import dash
-from dash import dcc, html, Input, Output, State, callback_context, ALL
+from dash import (dcc, html, Input, Output, State, callback_context, ClientsideFunction, Patch, no_update,
+                  set_props)
+from dash.exceptions import MissingCallbackContextException
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
-import json
-import copy
+from plotly.io.json import to_json_plotly
 import numpy as np
 
-app = dash.Dash(__name__, external_stylesheets=[
-    dbc.themes.DARKLY,
-    "https://fonts.googleapis.com/css2?family=Share+Tech+Mono&family=Barlow+Condensed:wght@300;400;600;700&display=swap"
+from CMAH_engine import (
+    SENSITIVITY_LABELS, SENSITIVITY_SLIDER_LABELS, DISTRIBUTION_LABELS, DISTRIBUTION_SLIDER_LABELS,
+    SIZE_LABELS, LIKELIHOOD_LABELS, LIKELIHOOD_MATRIX, LIKELIHOOD_ANCHORS,
+    SENSITIVITY_STEPS, DISTRIBUTION_STEPS, LIKELIHOOD_STEPS, SIZE_STEPS, SCALES_FINGERPRINT,
+    slider_to_sens, slider_to_dist,
+    DANGER_COLORS, DANGER_TEXT, DANGER_LEVELS,
+    DEFAULT_GRID_CODE, GRID_SHAPE, LEVEL_INDEX, LEVEL_NAMES, LEVEL_COLORS, LEVEL_ABBREV,
+    SENSITIVITY_LOOKUP, DISTRIBUTION_LOOKUP,
+    BOX_INDEX_CACHE, decode_grid, grid_cell, grid_fingerprint, box_index, likelihood_range,
+    is_grid_code, parse_level, parse_size, assess, simulate_danger, UNCERTAINTY_SAMPLES, compare_grids,
+    likelihood_highlight_path, danger_highlight_path, PROBLEM_COLORS, MAX_PROBLEMS,
+    grid_diff, grid_apply, history_record, history_step, EMPTY_GRID_HISTORY,
+    LRUCache,
+)
+from CMAH_assets import AssetManifest, srcset
+from CMAH_collab import CollabHub, parse_last_id, valid_session
+from CMAH_profiles import ProfileStore, parse_profile_ref, DEFAULT_DB_PATH
+from CMAH_history import HistoryStore, downsample, from_days, DEFAULT_DB_PATH as DEFAULT_HISTORY_PATH
+import CMAH_http
+import CMAH_metrics
+from CMAH_sharedcache import SharedCache, TieredCache
+from CMAH_snapshot import Snapshot, DEFAULT_SNAPSHOT_DIR, fingerprint
+from CMAH_metrics import instrument
+
+# Theme, fonts, CSS and images are served from static/ under content-hashed
+# names (CMAH_assets.py), so the page doesn't depend on any third-party host.
+# Flask's own /static route is disabled in favour of the hashed one.
+ASSETS = AssetManifest()
+if ASSETS.has("vendor/fonts.css"):
+    FONT_STYLESHEET = ASSETS.url("vendor/fonts.css")
+else:
+    # Not vendored yet (python CMAH_assets.py vendor): map the names onto system fonts
+    FONT_STYLESHEET = ASSETS.url("system-fonts.css")
+
+server = flask.Flask(__name__, static_folder=None)
+app = dash.Dash(__name__, server=server, external_stylesheets=[
+    ASSETS.url("vendor/darkly.min.css"),
+    FONT_STYLESHEET,
+    ASSETS.url("cmah.css"),
 ], suppress_callback_exceptions=True)
 app.title = "CMAH Dashboard"
-server = app.server
-
-# Inject CSS to style danger cell dropdowns
+ASSETS.install(server)
+
+# Fast start: default figures, the frozen layout/dependency responses and the
+# first forecast come from a snapshot on disk when one matches this build.
+SNAPSHOT = (Snapshot(os.environ.get("CMAH_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR), extra=[SCALES_FINGERPRINT, *sorted(ASSETS.urls.values())])
+            if FAST_START else None)
+
+
+def startup_figure(name, build):
+    """Figure dict for the page layout, taken from the snapshot when fast start has one."""
+    if SNAPSHOT is None:
+        return build().to_plotly_json()
+    return SNAPSHOT.get_or_build(("figure", name), lambda: build().to_plotly_json())
+
+# CMAH_CLIENTSIDE=1 evaluates slider moves in the browser (assets/cmah_clientside.js);
+# the server then only renders the initial page and handles grid edits.
+CLIENTSIDE_MODE = os.environ.get("CMAH_CLIENTSIDE", "0") == "1"
+# CMAH_PATCH_UPDATES=1 (default) answers slider-only moves with partial figure
+# updates; full figures are only resent when the danger grid changes.
+PATCH_UPDATES = os.environ.get("CMAH_PATCH_UPDATES", "1") == "1"
+
+# CMAH_COLLAB=1 lets forecasters join a shared grid editing session on the
+# Settings tab; edits are pushed to every browser in it (CMAH_collab.py).
+COLLAB_MODE = os.environ.get("CMAH_COLLAB", "0") == "1"
+COLLAB = CollabHub() if COLLAB_MODE else None
+
+# Saved grid profiles (Settings tab and the JSON API's grid=<name>)
+PROFILES = ProfileStore(os.environ.get("CMAH_PROFILE_DB", DEFAULT_DB_PATH))
+# Issued forecasts (Issue button on the forecast tab, History tab)
+HISTORY  = HistoryStore(os.environ.get("CMAH_HISTORY_DB", DEFAULT_HISTORY_PATH))
+
+# Only the viewport tag goes into the page template; slider and responsive-graph
+# CSS lives in static/cmah.css and is served with the other hashed assets.
 app.index_string = app.index_string.replace(
     "</head>",
-    """<style>
-/* Remove default Dash dropdown chrome on danger cells */
-.danger-cell-dropdown .Select-control {
-    background-color: inherit !important;
-    border: 1px solid #1a1a1a !important;
-    border-radius: 0 !important;
-    height: 38px !important;
-    min-height: 38px !important;
-    cursor: pointer !important;
-}
-.danger-cell-dropdown .Select-value-label,
-.danger-cell-dropdown .Select-placeholder {
-    color: inherit !important;
-    font-family: "Barlow Condensed", sans-serif !important;
-    font-size: 11px !important;
-    font-weight: 600 !important;
-    line-height: 38px !important;
-    padding: 0 4px !important;
-}
-.danger-cell-dropdown .Select-arrow-zone { display: none !important; }
-.danger-cell-dropdown .Select-clear-zone { display: none !important; }
-.danger-cell-dropdown .Select-input { display: none !important; }
-.danger-cell-dropdown .Select--single > .Select-control .Select-value { padding: 0 4px !important; }
-/* Dropdown menu panel */
-.danger-cell-dropdown .Select-menu-outer {
-    background-color: #0d1b2a !important;
-    border: 1px solid #1e3a4a !important;
-    border-radius: 0 !important;
-    z-index: 9999 !important;
-    width: 160px !important;
-    min-width: 160px !important;
-}
-.danger-cell-dropdown .Select-option {
-    background-color: #0d1b2a !important;
-    color: #ccc !important;
-    font-family: "Barlow Condensed", sans-serif !important;
-    font-size: 12px !important;
-    padding: 6px 10px !important;
-}
-.danger-cell-dropdown .Select-option:hover,
-.danger-cell-dropdown .Select-option.is-focused {
-    background-color: #1e3a4a !important;
-}
-.danger-cell-dropdown .VirtualizedSelectFocusedOption {
-    background-color: #1e3a4a !important;
-}
-/* Hide the filled range bar on the sensitivity and distribution point sliders */
-#sens-slider .dash-slider-range,
-#dist-slider .dash-slider-range,
-#sens-slider .dash-slider-track,
-#dist-slider .dash-slider-track {
-    background-color: #1e3a4a !important;
-}
-/* Center graphs on desktop */
-#likelihood-matrix, #danger-matrix { display: block; margin: 0 auto; }
-/* Mobile: scale entire graph container down to fit screen */
-@media (max-width: 767px) {
-    #likelihood-matrix, #danger-matrix {
-        width: 100% !important;
-        overflow: hidden;
-    }
-    #likelihood-matrix > div, #danger-matrix > div,
-    #likelihood-matrix .js-plotly-plot, #danger-matrix .js-plotly-plot,
-    #likelihood-matrix .plot-container, #danger-matrix .plot-container {
-        width: 100% !important;
-    }
-    #likelihood-matrix .main-svg, #danger-matrix .main-svg {
-        width: 100% !important;
-        height: auto !important;
-    }
-}
-</style>
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
+    """<meta name="viewport" content="width=device-width, initial-scale=1.0">
 </head>"""
 )
 
-# ─── Constants ────────────────────────────────────────────────────────────────
-
-# Full labels (indices 0,2,4,6) and half-step labels (indices 1,3,5)
-SENSITIVITY_LABELS  = ["Unreactive", "Stubborn", "Reactive", "Touchy"]
-SENSITIVITY_SLIDER_LABELS = [
-    "Unreactive",
-    "Unr.–Stub.",
-    "Stubborn",
-    "Stub.–React.",
-    "Reactive",
-    "React.–Touchy",
-    "Touchy",
-]
-# Map slider index → effective sensitivity index (0-3) for matrix lookup
-def slider_to_sens(v):
-    return v / 2.0  # 0,0.5,1,1.5,2,2.5,3
-DISTRIBUTION_LABELS = ["Isolated", "Specific", "Widespread"]
-DISTRIBUTION_SLIDER_LABELS = [
-    "Isolated",
-    "Isol.–Specific",
-    "Specific",
-    "Spec.–Widespread",
-    "Widespread",
-]
-def slider_to_dist(v):
-    return v / 2.0  # 0,0.5,1,1.5,2
-
-# 10 size steps
-SIZE_LABELS = ["1", "1.5", "2", "2.5", "3", "3.5", "4", "4.5", "5"]
-
-# 10 likelihood steps (5 named + 4 intermediates + 1 extreme)
-LIKELIHOOD_LABELS = [
-    "Unlikely",
-    "Unlikely–Possible",
-    "Possible",
-    "Possible–Likely",
-    "Likely",
-    "Likely–Very Likely",
-    "Very Likely",
-    "Very Likely–Almost Certain",
-    "Almost Certain",
-]
-
-# Likelihood matrix from the uploaded image:
-# rows = Distribution (0=Isolated, 1=Specific, 2=Widespread)
-# cols = Sensitivity  (0=Unreactive, 1=Stubborn, 2=Reactive, 3=Touchy)
-# Values map to indices in LIKELIHOOD_LABELS (using steps 0,2,4,6,8 = the named levels)
-LIKELIHOOD_MATRIX = [
-    [0, 0, 2, 4],   # Isolated:    Unlikely, Unlikely, Possible, Likely
-    [0, 2, 4, 6],   # Specific:    Unlikely, Possible, Likely,   Very Likely
-    [0, 2, 6, 8],   # Widespread:  Unlikely, Possible, Very Likely, Almost Certain
-]
-
-# Official avalanche danger colors
-DANGER_COLORS = {
-    "No Rating":    "#444444",
-    "Low":          "#50B848",
-    "Moderate":     "#FFF200",
-    "Considerable": "#F7941E",
-    "High":         "#ED1C24",
-    "Extreme":      "#231F20",
-}
-DANGER_TEXT = {
-    "No Rating":    "#cccccc",
-    "Low":          "#111111",
-    "Moderate":     "#111111",
-    "Considerable": "#111111",
-    "High":         "#ffffff",
-    "Extreme":      "#ffffff",
-}
-DANGER_LEVELS = ["No Rating", "Low", "Moderate", "Considerable", "High", "Extreme"]
-
-DANGER_ABBREV = {
-    "No Rating": "—", "Low": "Low", "Moderate": "Mod",
-    "Considerable": "Con", "High": "High", "Extreme": "Ext"
-}
-
-
-def _build_default_grid():
-    """9×9 danger grid: rows=Likelihood (0-8), cols=Size (0-8)."""
-    return [
-        ["Low","Low","Low","Low","Low","Low","Low","Low","Low"],
-        ["Low","Low","Low","Moderate","Moderate","Moderate","Considerable","Considerable","Considerable"],
-        ["Low","Low","Moderate","Moderate","Moderate","Considerable","Considerable","High","High"],
-        ["Low","Low","Moderate","Moderate","Considerable","Considerable","High","High","Extreme"],
-        ["Low","Moderate","Moderate","Considerable","Considerable","High","High","Extreme","Extreme"],
-        ["Low","Moderate","Considerable","Considerable","High","High","Extreme","Extreme","Extreme"],
-        ["Low","Moderate","Considerable","High","High","Extreme","Extreme","Extreme","Extreme"],
-        ["Low","Moderate","High","High","Extreme","Extreme","Extreme","Extreme","Extreme"],
-        ["Low","Moderate","High","High","Extreme","Extreme","Extreme","Extreme","Extreme"],
-    ]
-
-DEFAULT_DANGER_GRID = _build_default_grid()
-
-
 # ─── Figure builders ──────────────────────────────────────────────────────────
 
-def rounded_rect_path(x0, y0, x1, y1, r=0.12):
-    """Return an SVG path string for a rounded rectangle in data coordinates."""
-    # Clamp r so it doesn't exceed half the box size
-    r = min(r, abs(x1 - x0) / 2.0, abs(y1 - y0) / 2.0)
-    p = (
-        f"M {x0+r},{y0} "
-        f"L {x1-r},{y0} "
-        f"Q {x1},{y0} {x1},{y0+r} "
-        f"L {x1},{y1-r} "
-        f"Q {x1},{y1} {x1-r},{y1} "
-        f"L {x0+r},{y1} "
-        f"Q {x0},{y1} {x0},{y1-r} "
-        f"L {x0},{y0+r} "
-        f"Q {x0},{y0} {x0+r},{y0} Z"
-    )
-    return p
-
-
 def build_likelihood_figure(sf, df, fig_w=465, fig_h=350):
     """
-    sf = sensitivity float 0.0-3.0, df = distribution float 0.0-2.0.
-    Numeric axes so add_shape works for any position including half-steps.
+    sf = sensitivity float 0.0-3.0, df = distribution float 0.0-2.0 (slider_to_sens/dist).
+    Numeric axes so add_shape works for any position between named steps.
     """
-    z = np.array(LIKELIHOOD_MATRIX, dtype=float)
+    z = np.array(LIKELIHOOD_MATRIX)
     colorscale = [
         [0.00, "#2a2a2a"],
         [0.33, "#5a5a5a"],
@@ -226,41 +124,24 @@ def build_likelihood_figure(sf, df, fig_w=465, fig_h=350):
         [1.00, "#d8d8d8"],
     ]
     # Numeric positions for each cell centre
-    x_vals = list(range(len(SENSITIVITY_LABELS)))   # [0,1,2,3]
-    y_vals = list(range(len(DISTRIBUTION_LABELS)))  # [0,1,2]
+    x_vals = list(range(len(SENSITIVITY_LABELS)))
+    y_vals = list(range(len(DISTRIBUTION_LABELS)))
 
+    # Cell names are heatmap text rather than one annotation per cell; without a
+    # textfont colour plotly picks dark or light text to contrast with each cell
     fig = go.Figure()
     fig.add_trace(go.Heatmap(
         z=z, x=x_vals, y=y_vals,
-        colorscale=colorscale, zmin=0, zmax=8,
+        colorscale=colorscale, zmin=0, zmax=len(LIKELIHOOD_LABELS) - 1,
         showscale=False, hoverinfo="skip",
+        text=np.array(LIKELIHOOD_LABELS, dtype=object)[z].tolist(), texttemplate="%{text}",
+        textfont=dict(size=12, family="Barlow Condensed"),
     ))
 
-    cell_text = [
-        ["Unlikely",  "Unlikely", "Possible",    "Likely"],
-        ["Unlikely",  "Possible", "Likely",       "Very Likely"],
-        ["Unlikely",  "Possible", "Very Likely",  "Almost Certain"],
-    ]
-    # Use dark text on lighter cells (higher likelihood values), light on dark
-    for ri in range(3):
-        for ci in range(4):
-            val = LIKELIHOOD_MATRIX[ri][ci]  # 0-8
-            text_color = "#111111" if val >= 6 else "#ffffff"
-            fig.add_annotation(
-                x=ci, y=ri,
-                text=cell_text[ri][ci], showarrow=False,
-                font=dict(size=12, color=text_color, family="Barlow Condensed"),
-            )
-
     if sf is not None and df is not None:
-        import math
-        # Draw a box covering the cell(s) touched by this point.
-        # On a half-step, the point sits on a boundary so we highlight both neighbours.
-        s_lo = math.floor(sf); s_hi = math.ceil(sf)
-        d_lo = math.floor(df); d_hi = math.ceil(df)
         fig.add_shape(
             type="path",
-            path=rounded_rect_path(s_lo - 0.45, d_lo - 0.45, s_hi + 0.45, d_hi + 0.45, r=0.15),
+            path=likelihood_highlight_path(sf, df),
             line=dict(color="#00e5ff", width=3),
             fillcolor="rgba(0, 229, 255, 0.18)",
         )
@@ -307,26 +188,18 @@ def build_likelihood_figure(sf, df, fig_w=465, fig_h=350):
     return fig
 
 
-def build_danger_figure(lik_range, size_range, danger_grid, fig_w=420, fig_h=420):
-    z, text = [], []
-    for r in range(9):
-        row_z, row_t = [], []
-        for c in range(9):
-            d = danger_grid[r][c]
-            row_z.append(DANGER_LEVELS.index(d))
-            row_t.append(d)
-        z.append(row_z)
-        text.append(row_t)
+def build_danger_figure(lik_range, size_range, grid_code, fig_w=420, fig_h=420):
+    z    = decode_grid(grid_code)
+    text = LEVEL_NAMES[z].tolist()
 
-    color_vals = [DANGER_COLORS[d] for d in DANGER_LEVELS]
-    colorscale  = [[i / 5, color_vals[i]] for i in range(6)]
+    colorscale  = [[i / 5, LEVEL_COLORS[i]] for i in range(6)]
 
-    x_vals = list(range(len(SIZE_LABELS)))       # [0..8]
-    y_vals = list(range(len(LIKELIHOOD_LABELS))) # [0..8]
+    x_vals = list(range(len(SIZE_LABELS)))
+    y_vals = list(range(len(LIKELIHOOD_LABELS)))
 
     fig = go.Figure()
     fig.add_trace(go.Heatmap(
-        z=z, x=x_vals, y=y_vals,
+        z=z.tolist(), x=x_vals, y=y_vals,
         colorscale=colorscale, zmin=0, zmax=5,
         showscale=False, text=text,
         hovertemplate="Size: %{x}<br>Likelihood: %{y}<br>Danger: %{text}<extra></extra>",
@@ -335,16 +208,9 @@ def build_danger_figure(lik_range, size_range, danger_grid, fig_w=420, fig_h=420
     # No text labels in the danger matrix — colour alone conveys the level
 
     if lik_range and size_range:
-        l0, l1 = lik_range
-        s0, s1 = size_range
-        pad_s = 0.49 if s0 != s1 else 0.42
-        pad_l = 0.49 if l0 != l1 else 0.42
-        fig.add_shape(
-            type="path",
-            path=rounded_rect_path(s0 - pad_s, l0 - pad_l, s1 + pad_s, l1 + pad_l, r=0.2),
-            line=dict(color="#00e5ff", width=3),
-            fillcolor="rgba(0, 229, 255, 0.18)",
-        )
+        shape, trace = danger_overlay(lik_range, size_range, grid_code)
+        fig.add_shape(shape)
+        fig.add_trace(trace)
 
     fig.update_layout(
         paper_bgcolor="#0d1b2a", plot_bgcolor="#0d1b2a",
@@ -364,8 +230,8 @@ def build_danger_figure(lik_range, size_range, danger_grid, fig_w=420, fig_h=420
         ),
         yaxis=dict(
             tickmode="array",
-            tickvals=[0, 2, 4, 6, 8],
-            ticktext=["Unlikely", "Possible", "Likely", "Very Likely", "Almost Certain"],
+            tickvals=list(range(0, len(LIKELIHOOD_LABELS), LIKELIHOOD_STEPS)),
+            ticktext=LIKELIHOOD_ANCHORS,
             tickfont=dict(family="Barlow Condensed", color="#bbb", size=10),
             title=dict(text="Likelihood",
                        font=dict(family="Barlow Condensed", color="#888", size=11)),
@@ -380,19 +246,170 @@ def build_danger_figure(lik_range, size_range, danger_grid, fig_w=420, fig_h=420
     return fig
 
 
-# ─── Settings grid dropdowns ──────────────────────────────────────────────────
+# ─── Avalanche problems ───────────────────────────────────────────────────────
+# A forecast carries up to MAX_PROBLEMS avalanche problems, each its own
+# (sensitivity, distribution, size range). The danger matrix shows all of them
+# on one heatmap: the base figure depends only on the grid and is cached, and
+# each problem adds a highlight shape and a driver-marker trace on top, so a
+# forecast with N problems costs N small overlays rather than N figures.
+
+# (sens_val, dist_val, size_lo, size_hi), the sliders' defaults: Stubborn,
+# Isolated–Specific, size 1.5–3 on the default scales
+DEFAULT_PROBLEM = (SENSITIVITY_STEPS, DISTRIBUTION_STEPS // 2, SIZE_STEPS // 2, 2 * SIZE_STEPS)
+DEFAULT_PROBLEMS = {"active": 0, "problems": [list(DEFAULT_PROBLEM)]}
+
+
+def _rgba(color, alpha):
+    return f"rgba({int(color[1:3], 16)}, {int(color[3:5], 16)}, {int(color[5:7], 16)}, {alpha})"
+
+
+def overlay_style(slot, active):
+    """
+    Highlight shape and driver-marker trace styling (plotly JSON, no positions)
+    for problem number slot. The problem being edited is drawn solid and filled,
+    the others dotted.
+    """
+    color = PROBLEM_COLORS[slot]
+    shape = {"type": "path", "line": {"color": color, "width": 3}, "fillcolor": _rgba(color, 0.18)}
+    trace = {"type": "scatter", "mode": "markers", "hoverinfo": "skip", "showlegend": False,
+             "marker": {"symbol": "circle-open", "size": 14, "color": color, "line": {"width": 2}}}
+    if not active:
+        shape = {**shape, "line": {"color": color, "width": 2, "dash": "dot"}, "fillcolor": "rgba(0, 0, 0, 0)"}
+        trace = {**trace, "marker": {**trace["marker"], "size": 11}}
+    return shape, trace
+
+
+def danger_overlay(lik_range, size_range, grid_code, slot=0, active=True):
+    """(shape, trace) for one problem: its box on the danger matrix and the cell(s) setting its max."""
+    shape, trace = overlay_style(slot, active)
+    drivers = box_index(grid_code).argmax_cells(lik_range, size_range)
+    return ({**shape, "path": danger_highlight_path(lik_range, size_range)},
+            {**trace, "x": [c for _, c in drivers], "y": [r for r, _ in drivers]})
+
+
+def compose_danger_figure(base, overlays):
+    """A cached base danger figure (plotly JSON) with problem overlays stacked on it."""
+    return {
+        **base,
+        "data":   base["data"] + [trace for _, trace in overlays],
+        "layout": {**base["layout"], "shapes": [shape for shape, _ in overlays]},
+    }
+
+
+def current_problems(store, sens_val, dist_val, size_range):
+    """
+    (problems, active) from problems-store, with the problem being edited taken
+    from the sliders: the store only catches up when another problem is selected,
+    so slider moves never need a round trip through it.
+    """
+    store = store or DEFAULT_PROBLEMS
+    problems = [tuple(p) for p in store["problems"]]
+    active = store["active"]
+    problems[active] = (sens_val, dist_val, *size_range)
+    return tuple(problems), active
+
+
+# ─── Figure cache ─────────────────────────────────────────────────────────────
+
+# Figures are cached as plain dicts (already passed through to_plotly_json) so a
+# hit skips both figure construction and plotly's property validation.
+# With several workers (CMAH_SHARED_CACHE set, see gunicorn.conf.py) a figure
+# built by one worker is shared with the rest through SQLite, and each worker
+# keeps only a small in-process LRU.
+SHARED_CACHE = (SharedCache(os.environ["CMAH_SHARED_CACHE"], fingerprint([SCALES_FINGERPRINT]))
+                if os.environ.get("CMAH_SHARED_CACHE") else None)
+_figure_codec = {"shared": SHARED_CACHE, "dumps": lambda fig: to_json_plotly(fig).encode(), "loads": json.loads}
+
+# One likelihood figure per sensitivity × distribution step (35 on the default scales).
+LIKELIHOOD_FIG_CACHE = TieredCache("likelihood_figure",
+                                   len(SENSITIVITY_SLIDER_LABELS) * len(DISTRIBUTION_SLIDER_LABELS),
+                                   **_figure_codec)
+# Keyed by grid — the danger heatmap without problem overlays (compose_danger_figure).
+DANGER_BASE_CACHE    = TieredCache("danger_base", 64, **_figure_codec)
+# Keyed by (problems, active, grid) — the full forecast state.
+SUMMARY_CACHE        = LRUCache(maxsize=8192)
+
+
+# ─── History chart ────────────────────────────────────────────────────────────
+
+HISTORY_MAX_POINTS = 300    # per zone; about one point per 3 px of chart width
+HISTORY_GAP_DAYS   = 21     # break the line across gaps longer than this (off-season)
+ZONE_COLORS = ["#00e5ff", "#ff6ec7", "#c6ff00", "#ffab40", "#b388ff", "#69f0ae", "#ff8a80", "#ffd740"]
+
+
+def _break_gaps(days, *series, max_gap):
+    """Insert None after any step longer than max_gap days so plotly leaves a gap."""
+    cut = np.flatnonzero(np.diff(days) > max_gap) + 1
+    x = np.insert(np.datetime_as_string(from_days(days)).astype(object), cut, None)
+    return [x.tolist()] + [np.insert(y.astype(object), cut, None).tolist() for y in series]
+
+
+def history_series(trends):
+    """Downsample HistoryStore.daily_max() output to {zone: (bucket days, max level, min level)}."""
+    return {zone: downsample(days, levels, HISTORY_MAX_POINTS) for zone, (days, levels) in trends.items()}
+
+
+def build_history_figure(series, fig_h=420):
+    """
+    Season danger trend per zone from history_series(): a step line of the highest
+    danger in each bucket, shaded down to the lowest. Returned as plotly JSON — a
+    multi-season chart has hundreds of points per trace, and plotly's per-value
+    validation would cost more than the query.
+    """
+    traces = []
+    for i, (zone, (bucket_days, hi, lo)) in enumerate(series.items()):
+        if not len(bucket_days):
+            continue
+        color = ZONE_COLORS[i % len(ZONE_COLORS)]
+        # Downsampled buckets can be wider than HISTORY_GAP_DAYS; only a missing bucket is a gap then
+        width = int(np.diff(bucket_days).min()) if len(bucket_days) > 1 else 1
+        gap = max(HISTORY_GAP_DAYS, width * 2)
+        x, y_hi, y_lo = _break_gaps(bucket_days, hi, lo, max_gap=gap)
+        traces.append({
+            "type": "scatter", "x": x, "y": y_lo, "mode": "lines",
+            "line": {"width": 0, "shape": "hv", "color": color},
+            "hoverinfo": "skip", "showlegend": False, "legendgroup": zone,
+        })
+        traces.append({
+            "type": "scatter", "x": x, "y": y_hi, "mode": "lines", "name": zone, "legendgroup": zone,
+            "line": {"width": 2, "shape": "hv", "color": color},
+            "fill": "tonexty", "fillcolor": _rgba(color, 0.15),
+            "customdata": [None if v is None else DANGER_LEVELS[v] for v in y_hi],
+            "hovertemplate": f"{zone}<br>%{{x}}<br>Max danger: %{{customdata}}<extra></extra>",
+        })
 
-# Dropdown options with colour swatches rendered via HTML
-DROPDOWN_OPTIONS = [
+    font = {"family": "Barlow Condensed", "color": "#bbb", "size": 11}
+    return {"data": traces, "layout": {
+        "paper_bgcolor": "#0d1b2a", "plot_bgcolor": "#0d1b2a",
+        "margin": {"l": 90, "r": 10, "t": 10, "b": 40},
+        "height": fig_h, "autosize": True,
+        "legend": {"orientation": "h", "y": 1.02, "yanchor": "bottom", "x": 0, "font": {**font, "color": "#ccc", "size": 12}},
+        # Faint danger-level bands behind the lines
+        "shapes": [{"type": "rect", "xref": "paper", "x0": 0, "x1": 1, "y0": i - 0.5, "y1": i + 0.5,
+                    "fillcolor": LEVEL_COLORS[i], "opacity": 0.07, "line": {"width": 0}, "layer": "below"}
+                   for i in range(1, len(DANGER_LEVELS))],
+        "xaxis": {"type": "date", "tickfont": font, "gridcolor": "#1e2d3d", "zeroline": False},
+        "yaxis": {"tickmode": "array", "tickvals": list(range(1, len(DANGER_LEVELS))),
+                  "ticktext": DANGER_LEVELS[1:], "tickfont": font,
+                  "range": [0.5, len(DANGER_LEVELS) - 0.5],
+                  "gridcolor": "#1e2d3d", "zeroline": False, "fixedrange": True},
+    }}
+
+
+# ─── Settings grid editor ─────────────────────────────────────────────────────
+
+# Level palette for the grid editor — the option list is defined once and
+# shared by every cell, rather than repeated per cell.
+LEVEL_OPTIONS = [
     {
         "label": html.Span(
             [
                 html.Span(style={
-                    "display": "inline-block", "width": "12px", "height": "12px",
+                    "display": "inline-block", "width": "16px", "height": "16px",
                     "backgroundColor": DANGER_COLORS[d], "marginRight": "6px",
-                    "border": "1px solid #444", "verticalAlign": "middle",
+                    "border": "1px solid #333", "verticalAlign": "middle",
                 }),
-                html.Span(d, style={"fontFamily": "Barlow Condensed", "fontSize": "12px"}),
+                html.Span(d, style={"fontFamily": "Barlow Condensed", "color": "#ccc", "fontSize": "12px"}),
             ]
         ),
         "value": d,
@@ -401,75 +418,172 @@ DROPDOWN_OPTIONS = [
 ]
 
 
-def make_danger_grid_buttons(grid):
-    rows = []
-    for r in range(8, -1, -1):
-        cells = [html.Div(
-            LIKELIHOOD_LABELS[r],
-            style={
-                "color": "#aaa", "fontSize": "10px", "fontFamily": "Barlow Condensed",
-                "width": "130px", "textAlign": "right", "paddingRight": "8px",
-                "display": "flex", "alignItems": "center", "justifyContent": "flex-end",
-                "flexShrink": "0",
-            }
-        )]
-        for c in range(9):
-            danger = grid[r][c]
-            bg     = DANGER_COLORS[danger]
-            fg     = DANGER_TEXT[danger]
-            cells.append(html.Div(
-                dcc.Dropdown(
-                    id={"type": "grid-cell", "row": r, "col": c},
-                    options=DROPDOWN_OPTIONS,
-                    value=danger,
-                    clearable=False,
-                    searchable=False,
-                    style={
-                        "backgroundColor": bg,
-                        "color": fg,
-                        "border": "none",
-                        "width": "58px",
-                        "fontSize": "10px",
-                        "fontFamily": "Barlow Condensed",
-                        "fontWeight": "600",
-                        "minHeight": "38px",
-                    },
-                    className="danger-cell-dropdown",
-                ),
-                style={"width": "58px", "flexShrink": "0"}
-            ))
-        rows.append(html.Div(cells, style={"display": "flex", "marginBottom": "2px"}))
-
-    size_row = html.Div(
-        [html.Div("", style={"width": "138px", "flexShrink": "0"})] +
-        [html.Div(s, style={
-            "width": "58px", "textAlign": "center", "color": "#aaa",
-            "fontSize": "10px", "fontFamily": "Barlow Condensed", "flexShrink": "0"
-        }) for s in SIZE_LABELS],
-        style={"display": "flex", "marginTop": "4px"}
+def build_grid_editor_figure(grid_code, fig_w=640, fig_h=440):
+    """
+    Clickable likelihood × size heatmap for editing the danger grid: each cell shows its level
+    abbreviation, clicking a cell paints it with the level selected in the palette.
+    """
+    z = decode_grid(grid_code)
+
+    colorscale = [[i / 5, LEVEL_COLORS[i]] for i in range(6)]
+
+    x_vals = list(range(len(SIZE_LABELS)))
+    y_vals = list(range(len(LIKELIHOOD_LABELS)))
+
+    fig = go.Figure(go.Heatmap(
+        z=z.tolist(), x=x_vals, y=y_vals,
+        colorscale=colorscale, zmin=0, zmax=5,
+        showscale=False, text=LEVEL_ABBREV[z].tolist(), customdata=LEVEL_NAMES[z].tolist(),
+        texttemplate="%{text}",
+        textfont=dict(family="Barlow Condensed", size=12),
+        xgap=2, ygap=2,
+        hovertemplate="Size: %{x}<br>Likelihood: %{y}<br>Danger: %{customdata}<extra></extra>",
+    ))
+    fig.update_layout(
+        paper_bgcolor="#0d1b2a", plot_bgcolor="#0d1b2a",
+        margin=dict(l=140, r=10, t=10, b=50),
+        dragmode=False,
+        modebar=dict(remove=["all"]),
+        xaxis=dict(
+            tickmode="array",
+            tickvals=x_vals,
+            ticktext=SIZE_LABELS,
+            tickfont=dict(family="Barlow Condensed", color="#aaa", size=11),
+            title=dict(text="← SIZE →",
+                       font=dict(family="Barlow Condensed", color="#555", size=10)),
+            showgrid=False, zeroline=False, fixedrange=True,
+        ),
+        yaxis=dict(
+            tickmode="array",
+            tickvals=y_vals,
+            ticktext=LIKELIHOOD_LABELS,
+            tickfont=dict(family="Barlow Condensed", color="#aaa", size=10),
+            title=dict(text="← LIKELIHOOD →",
+                       font=dict(family="Barlow Condensed", color="#555", size=10)),
+            showgrid=False, zeroline=False, fixedrange=True,
+        ),
+        width=fig_w,
+        height=fig_h,
+        autosize=False,
     )
+    return fig
+
+
+# Above this many changed cells a whole new editor figure is smaller than the patch
+EDITOR_PATCH_CELLS = 24
+
+
+def grid_editor_update(grid_code, deltas, undo=False):
+    """
+    Editor figure update for an edit given as [row, col, old, new] deltas: a
+    partial update that repaints just those cells, or a new figure for large edits.
+    """
+    if len(deltas) > EDITOR_PATCH_CELLS:
+        return build_grid_editor_figure(grid_code)
+    patch = Patch()
+    for row, col, old, new in deltas:
+        level_idx = old if undo else new
+        patch["data"][0]["z"][row][col]          = level_idx
+        patch["data"][0]["text"][row][col]       = LEVEL_ABBREV[level_idx]
+        patch["data"][0]["customdata"][row][col] = DANGER_LEVELS[level_idx]
+    return patch
+
+
+# ─── Grid impact analysis ─────────────────────────────────────────────────────
+
+IMPACT_CACHE = LRUCache(maxsize=256)
+IMPACT_UP, IMPACT_DOWN = "#ff6e40", "#40c4ff"
+
+
+def reference_options():
+    """impact-reference options: the default grid, then every saved profile version, newest first."""
+    options = [{"label": "Default grid", "value": "default"}]
+    for name, latest, _ in PROFILES.list_profiles():
+        options += [{"label": f"{name} v{v}", "value": f"{name}@{v}"} for v in range(latest, 0, -1)]
+    return options
+
+
+def resolve_reference(ref):
+    """Grid code for an impact-reference value, or None if the profile is gone."""
+    if not ref or ref == "default":
+        return DEFAULT_GRID_CODE
+    profile = PROFILES.load(*parse_profile_ref(ref))
+    return profile[1] if profile else None
+
+
+def _impact_heatmap(up, down, totals, x_labels, y_labels, axis):
+    """One heatmap trace (plotly JSON): share of states that changed, arrows for the direction."""
+    changed = (up + down) / totals
+    text = [["" if not (u or d) else " ".join(filter(None, [f"↑{u}" if u else "", f"↓{d}" if d else ""]))
+             for u, d in zip(u_row, d_row)] for u_row, d_row in zip(up.tolist(), down.tolist())]
+    return {
+        "type": "heatmap", "z": changed.tolist(), "x": x_labels, "y": y_labels, "text": text,
+        "texttemplate": "%{text}", "textfont": {"family": "Barlow Condensed", "size": 11, "color": "#fff"},
+        "colorscale": [[0, "#13263a"], [1, "#c0392b"]], "zmin": 0, "zmax": 1, "showscale": False,
+        "xgap": 2, "ygap": 2, "xaxis": f"x{axis}", "yaxis": f"y{axis}",
+        "hovertemplate": "%{y} / %{x}<br>%{z:.0%} changed: %{text}<extra></extra>",
+    }
+
+
+def build_impact_figure(impact, fig_h=300):
+    """
+    Where a grid change shows up, as plotly JSON: sensitivity × distribution (share
+    of the size ranges that change rating) next to size range (share of the
+    sensitivity × distribution states).
+    """
+    lower = np.tril(np.ones(impact.by_size.shape[1:], dtype=bool), -1)
+    size_trace = _impact_heatmap(impact.by_size[0], impact.by_size[1], impact.by_input[0].size,
+                                 SIZE_LABELS, SIZE_LABELS, 2)
+    # Blank out the size_lo > size_hi half
+    size_trace["z"] = [[None if lower[r, c] else v for c, v in enumerate(row)]
+                       for r, row in enumerate(size_trace["z"])]
+    n_sizes = int((~lower).sum())
+    font = {"family": "Barlow Condensed", "color": "#aaa", "size": 10}
+    title = {"family": "Barlow Condensed", "color": "#555", "size": 10}
+    return {"data": [
+        _impact_heatmap(impact.by_input[0].T, impact.by_input[1].T, n_sizes,
+                        SENSITIVITY_SLIDER_LABELS, DISTRIBUTION_SLIDER_LABELS, ""),
+        size_trace,
+    ], "layout": {
+        "paper_bgcolor": "#0d1b2a", "plot_bgcolor": "#0d1b2a",
+        "margin": {"l": 90, "r": 10, "t": 10, "b": 60}, "height": fig_h, "autosize": True,
+        "xaxis":  {"domain": [0, 0.55], "tickfont": font, "fixedrange": True,
+                   "title": {"text": "SENSITIVITY", "font": title}},
+        "yaxis":  {"tickfont": font, "fixedrange": True, "title": {"text": "DISTRIBUTION", "font": title}},
+        "xaxis2": {"domain": [0.68, 1], "tickfont": font, "fixedrange": True, "anchor": "y2",
+                   "title": {"text": "SIZE TO", "font": title}},
+        "yaxis2": {"tickfont": font, "fixedrange": True, "anchor": "x2",
+                   "title": {"text": "SIZE FROM", "font": title, "standoff": 4}},
+    }}
+
+
+def build_impact_summary(impact):
+    """Counts of states that change rating, and the largest level-to-level moves."""
+    changed = impact.raised + impact.lowered
+    text = {"color": "#ccc", "fontFamily": "Barlow Condensed", "fontSize": "13px"}
+    if not changed:
+        return html.Div(f"No change: all {impact.states:,} input states keep their rating.", style=text)
+    moves = [(int(n), DANGER_LEVELS[a], DANGER_LEVELS[b]) for (a, b), n in np.ndenumerate(impact.transitions)
+             if a != b and n]
+    moves.sort(reverse=True)
     return html.Div([
-        html.Div(rows), size_row,
-        html.Div("← SIZE →", style={
-            "textAlign": "center", "color": "#555", "fontSize": "10px",
-            "marginTop": "4px", "fontFamily": "Barlow Condensed", "letterSpacing": "0.15em"
-        })
+        html.Div([
+            html.Span(f"{changed:,} of {impact.states:,} input states ({changed / impact.states:.1%}) change rating: "),
+            html.Span(f"↑ {impact.raised:,} raised", style={"color": IMPACT_UP, "fontWeight": "700"}),
+            html.Span(", "),
+            html.Span(f"↓ {impact.lowered:,} lowered", style={"color": IMPACT_DOWN, "fontWeight": "700"}),
+        ], style=text),
+        html.Div(" · ".join(f"{a} → {b}: {n:,}" for n, a, b in moves[:6]) + (" …" if len(moves) > 6 else ""),
+                 style={**text, "color": "#777", "fontSize": "12px", "marginTop": "4px"}),
     ])
 
 
 # ─── Sliders ──────────────────────────────────────────────────────────────────
 
-def make_range_slider(id, labels, default, half_labels=None):
-    """If half_labels provided, uses those for marks with step=1 over doubled range."""
-    if half_labels:
-        marks = {i: {"label": l, "style": {"color": "#aaa", "fontFamily": "Barlow Condensed", "fontSize": "10px"}}
-                 for i, l in enumerate(half_labels)}
-        return dcc.RangeSlider(
-            id=id, min=0, max=len(half_labels) - 1, step=1,
-            value=[v * 2 for v in default], marks=marks, allowCross=False,
-            tooltip={"always_visible": False},
-        )
-    marks = {i: {"label": l, "style": {"color": "#aaa", "fontFamily": "Barlow Condensed", "fontSize": "11px"}}
+def make_range_slider(id, labels, default, steps=1):
+    """Two-handle slider over every label, with text on every steps-th (named) one."""
+    marks = {i: {"label": l if i % steps == 0 else "",
+                 "style": {"color": "#aaa", "fontFamily": "Barlow Condensed", "fontSize": "11px"}}
              for i, l in enumerate(labels)}
     return dcc.RangeSlider(
         id=id, min=0, max=len(labels) - 1, step=1,
@@ -484,31 +598,125 @@ lbl = {"fontFamily": "Barlow Condensed", "fontWeight": "700", "fontSize": "13px"
        "color": "#00e5ff", "letterSpacing": "0.12em", "marginBottom": "6px"}
 card = {"backgroundColor": "#0d1b2a", "border": "1px solid #1e3a4a", "marginBottom": "14px"}
 
-def make_point_slider(id, half_labels, default_idx):
-    """Single-handle slider — full labels on named steps, empty label on half-steps."""
+def make_point_slider(id, slider_labels, default_idx, steps=2):
+    """Single-handle slider — full labels on named steps, an unlabelled tick in between."""
     marks = {}
-    for i, l in enumerate(half_labels):
-        if i % 2 == 0:
+    for i, l in enumerate(slider_labels):
+        if i % steps == 0:
             # Named step — show label
             marks[i] = {"label": l, "style": {"color": "#aaa", "fontFamily": "Barlow Condensed", "fontSize": "10px"}}
         else:
-            # Half-step — show a small tick but no text
+            # Intermediate step — show a small tick but no text
             marks[i] = {"label": "", "style": {"color": "transparent"}}
     return dcc.Slider(
-        id=id, min=0, max=len(half_labels) - 1, step=1,
+        id=id, min=0, max=len(slider_labels) - 1, step=1,
         value=default_idx, marks=marks,
         tooltip={"always_visible": False},
     )
 
+def initial_figure(name, build):
+    """
+    Graph kwargs for the page layout. In clientside mode the figures ship with the
+    page (the first browser-side call repositions the highlights); otherwise the
+    server renders them in update_all and the layout stays empty.
+    """
+    return {"figure": startup_figure(name, build)} if CLIENTSIDE_MODE else {}
+
+
+def forecast_constants():
+    """Lookup tables the clientside forecast callback needs, shipped once with the layout."""
+    return {
+        "sensitivity_labels":         SENSITIVITY_LABELS,
+        "sensitivity_slider_labels":  SENSITIVITY_SLIDER_LABELS,
+        "distribution_labels":        DISTRIBUTION_LABELS,
+        "distribution_slider_labels": DISTRIBUTION_SLIDER_LABELS,
+        "likelihood_labels":          LIKELIHOOD_LABELS,
+        "size_labels":                SIZE_LABELS,
+        "likelihood_matrix":          LIKELIHOOD_MATRIX,
+        "sensitivity_steps":          SENSITIVITY_STEPS,
+        "distribution_steps":         DISTRIBUTION_STEPS,
+        "default_problem":            DEFAULT_PROBLEM,
+        "danger_levels":              DANGER_LEVELS,
+        "danger_colors":              DANGER_COLORS,
+        "danger_text":                DANGER_TEXT,
+        "default_grid":               DEFAULT_GRID_CODE,
+        # overlay_styles[slot] = [[inactive shape, trace], [active shape, trace]]
+        "overlay_styles":             [[overlay_style(i, False), overlay_style(i, True)]
+                                       for i in range(MAX_PROBLEMS)],
+    }
+
+
+def problem_options(n):
+    """problem-select options for n problems, each labelled with its overlay colour."""
+    return [
+        {
+            "label": html.Span([
+                html.Span(style={"display": "inline-block", "width": "10px", "height": "10px",
+                                 "borderRadius": "50%", "backgroundColor": PROBLEM_COLORS[i],
+                                 "marginRight": "6px", "verticalAlign": "middle"}),
+                html.Span(f"PROBLEM {i + 1}", style={"fontFamily": "Barlow Condensed", "color": "#ccc",
+                                                     "fontSize": "12px", "letterSpacing": "0.08em"}),
+            ]),
+            "value": i,
+        }
+        for i in range(n)
+    ]
+
+
+btn = {"fontFamily": "Barlow Condensed", "padding": "1px 10px"}
+
+# Half-width of each input's distribution in uncertainty mode, in half named steps
+# (SPREAD_SCALE converts to slider positions)
+SPREAD_MARKS = {i: {"label": label, "style": {"color": "#aaa", "fontFamily": "Barlow Condensed", "fontSize": "10px"}}
+                for i, label in enumerate(["0", "±½", "±1", "±1½", "±2"])}
+
+
+SPREAD_SCALE = (SENSITIVITY_STEPS / 2, DISTRIBUTION_STEPS / 2, SIZE_STEPS / 2)
+
+
+def make_spread_slider(id, label, default):
+    return html.Div([
+        html.Span(label, style={"color": "#666", "fontSize": "12px", "fontFamily": "Barlow Condensed",
+                                "width": "90px", "flexShrink": 0}),
+        html.Div(dcc.Slider(id=id, min=0, max=4, step=1, value=default, marks=SPREAD_MARKS), style={"flexGrow": 1}),
+    ], style={"display": "flex", "alignItems": "center", "marginBottom": "4px"})
+
+
+uncertainty_card = dbc.Card(dbc.CardBody([
+    html.Div([
+        html.Div("UNCERTAINTY", style={**lbl, "marginBottom": "0"}),
+        dbc.Switch(id="uncertainty-switch", value=False, style={"marginBottom": "0"}),
+    ], style={"display": "flex", "justifyContent": "space-between", "alignItems": "center"}),
+    html.Div([
+        html.Div("Each input varies by up to ± the spread (in steps) around its slider.",
+                 style={"color": "#777", "fontFamily": "Barlow Condensed", "fontSize": "12px", "margin": "8px 0"}),
+        make_spread_slider("sens-spread", "Sensitivity", 2),
+        make_spread_slider("dist-spread", "Distribution", 1),
+        make_spread_slider("size-spread", "Size", 1),
+        html.Div(id="uncertainty-bar", style={"marginTop": "10px"}),
+    ], id="uncertainty-body", style={"display": "none"},
+       # Slider fallbacks for assets/cmah_uncertainty.js before the sliders report a value
+       **{"data-default-problem": json.dumps(DEFAULT_PROBLEM)}),
+]), style=card)
+
 controls = dbc.Card(dbc.CardBody([
+    html.Div([
+        dcc.RadioItems(
+            id="problem-select", options=problem_options(1), value=0, inline=True,
+            labelStyle={"display": "inline-flex", "alignItems": "center", "marginRight": "14px", "cursor": "pointer"},
+            inputStyle={"marginRight": "6px"},
+        ),
+        dbc.Button("+ Add", id="add-problem-btn", color="info", outline=True, size="sm", style=btn),
+        dbc.Button("Remove", id="remove-problem-btn", color="secondary", outline=True, size="sm", style=btn),
+    ], style={"display": "flex", "gap": "8px", "alignItems": "center", "flexWrap": "wrap", "marginBottom": "16px"}),
     html.Div("DISTRIBUTION", style=lbl),
-    make_point_slider("dist-slider", DISTRIBUTION_SLIDER_LABELS, 1),
+    make_point_slider("dist-slider", DISTRIBUTION_SLIDER_LABELS, DEFAULT_PROBLEM[1], DISTRIBUTION_STEPS),
     html.Div(style={"height": "26px"}),
     html.Div("SENSITIVITY", style=lbl),
-    make_point_slider("sens-slider", SENSITIVITY_SLIDER_LABELS, 2),
+    make_point_slider("sens-slider", SENSITIVITY_SLIDER_LABELS, DEFAULT_PROBLEM[0], SENSITIVITY_STEPS),
     html.Div(style={"height": "26px"}),
     html.Div("SIZE", style=lbl),
-    make_range_slider("size-slider", SIZE_LABELS, [1, 4]),
+    make_range_slider("size-slider", SIZE_LABELS, list(DEFAULT_PROBLEM[2:]), SIZE_STEPS),
 ]), style=card)
 
 forecast_tab = dbc.Row([
@@ -519,13 +727,16 @@ forecast_tab = dbc.Row([
             html.Div("LIKELIHOOD MATRIX", style=lbl),
             html.Div(dcc.Graph(id="likelihood-matrix", config={
                 "displayModeBar": False,
-            }), style={"display": "flex", "justifyContent": "center"}),
+            }, **initial_figure("likelihood", lambda: build_likelihood_figure(0, 0))), style={"display": "flex", "justifyContent": "center"},
+                # Slider steps for the drag handler (assets/cmah_drag.js)
+                **{"data-sens-steps": SENSITIVITY_STEPS, "data-sens-max": len(SENSITIVITY_SLIDER_LABELS) - 1,
+                   "data-dist-steps": DISTRIBUTION_STEPS, "data-dist-max": len(DISTRIBUTION_SLIDER_LABELS) - 1}),
         ]), style=card),
         dbc.Card(dbc.CardBody([
             html.Div("DANGER MATRIX", style=lbl),
             html.Div(dcc.Graph(id="danger-matrix", config={
                 "displayModeBar": False,
-            }), style={"display": "flex", "justifyContent": "center"}),
+            }, **initial_figure("danger", lambda: build_danger_figure([0, 0], [0, 0], DEFAULT_GRID_CODE))), style={"display": "flex", "justifyContent": "center"}),
         ]), style=card),
     ], xs=12, md=8),
     # Right col: summary + NAPADS
@@ -534,41 +745,118 @@ forecast_tab = dbc.Row([
             html.Div("FORECAST SUMMARY", style=lbl),
             html.Div(id="forecast-summary"),
         ]), style=card),
+        uncertainty_card,
+        dbc.Card(dbc.CardBody([
+            html.Div("ISSUE FORECAST", style=lbl),
+            html.Div([
+                dbc.Input(id="issue-zone", placeholder="Zone", size="sm", list="issue-zone-list",
+                          style={"width": "150px", "fontFamily": "Barlow Condensed"}),
+                html.Datalist(id="issue-zone-list"),
+                # No default date: the layout is built once per process, so "today" is filled in when issuing
+                dcc.DatePickerSingle(id="issue-date", placeholder="Today", display_format="YYYY-MM-DD"),
+                dbc.Button("Issue", id="issue-btn", color="info", size="sm", style={"fontFamily": "Barlow Condensed"}),
+            ], style={"display": "flex", "gap": "8px", "alignItems": "center", "flexWrap": "wrap"}),
+            html.Div(id="issue-status", style={"color": "#777", "fontFamily": "Barlow Condensed", "fontSize": "12px",
+                                               "marginTop": "8px"}),
+        ]), style=card),
         html.Img(
-            src="https://raw.githubusercontent.com/AndrewSchauer/CNFAC_Dashboard/main/NAPADS.png",
-            style={"width": "100%", "marginTop": "4px", "borderRadius": "4px", "opacity": "0.9"},
+            src=ASSETS.url("img/napads-960.png"),
+            srcSet=srcset(ASSETS, "img/napads", (480, 960, 1440)),
+            sizes="(max-width: 767px) 100vw, 33vw",
+            alt="North American Public Avalanche Danger Scale",
+            width=2157, height=1613,
+            style={"width": "100%", "height": "auto", "marginTop": "4px", "borderRadius": "4px", "opacity": "0.9"},
         ),
     ], xs=12, md=4),
 ])
 
 
+def collab_controls():
+    """Join/leave a shared editing session; assets/cmah_collab.js reads the level names from data-*."""
+    return html.Div([
+        dbc.Input(id="collab-name", placeholder="Shared session (e.g. zone)", size="sm", maxLength=40,
+                  style={"width": "240px", "fontFamily": "Barlow Condensed"}),
+        dbc.Button("Join", id="collab-join-btn", color="info", size="sm", outline=True,
+                   style={"fontFamily": "Barlow Condensed"}),
+        html.Span(id="collab-status", style={"color": "#777", "fontFamily": "Barlow Condensed", "fontSize": "12px"}),
+    ], style={"display": "flex", "gap": "10px", "alignItems": "center", "flexWrap": "wrap", "marginBottom": "18px"},
+       **{"data-collab-cols": GRID_SHAPE[1],
+          "data-collab-levels": json.dumps([[d, str(a)] for d, a in zip(DANGER_LEVELS, LEVEL_ABBREV)])})
+
+
 settings_tab = html.Div([
     html.Div("CONFIGURE DANGER GRID", style={**lbl, "fontSize": "15px"}),
-    html.P("Click any cell to cycle: No Rating → Low → Moderate → Considerable → High → Extreme → …",
+    html.P("Pick a danger level, then click any cell to set it to that level.",
            style={"color": "#777", "fontFamily": "Barlow Condensed", "fontSize": "12px", "marginBottom": "14px"}),
     html.Div([
-        html.Div([
-            html.Div(style={"width": "16px", "height": "16px", "backgroundColor": DANGER_COLORS[d],
-                            "display": "inline-block", "marginRight": "6px", "border": "1px solid #333"}),
-            html.Span(d, style={"fontFamily": "Barlow Condensed", "color": "#ccc", "fontSize": "12px"})
-        ], style={"display": "flex", "alignItems": "center", "marginRight": "16px"})
-        for d in DANGER_LEVELS
-    ], style={"display": "flex", "flexWrap": "wrap", "gap": "6px", "marginBottom": "18px"}),
-    html.Div([
-        html.Div("← LIKELIHOOD →", style={
-            "writingMode": "vertical-rl", "transform": "rotate(180deg)",
-            "color": "#555", "fontFamily": "Barlow Condensed", "letterSpacing": "0.15em",
-            "fontSize": "10px", "marginRight": "6px", "display": "flex", "alignItems": "center"
-        }),
-        html.Div(id="danger-grid-container", style={"overflowX": "auto"}),
-    ], style={"display": "flex"}),
+        dcc.Dropdown(id="profile-select", placeholder="Load saved profile…", clearable=True,
+                     style={"width": "260px", "color": "#111", "fontFamily": "Barlow Condensed"}),
+        dbc.Input(id="profile-name", placeholder="Profile name (zone or forecaster)", size="sm",
+                  style={"width": "240px", "fontFamily": "Barlow Condensed"}),
+        dbc.Button("Save Profile", id="save-profile-btn", color="info", size="sm",
+                   style={"fontFamily": "Barlow Condensed"}),
+        html.Span(id="profile-status", style={"color": "#777", "fontFamily": "Barlow Condensed", "fontSize": "12px"}),
+    ], style={"display": "flex", "gap": "10px", "alignItems": "center", "flexWrap": "wrap", "marginBottom": "18px"}),
+    *([collab_controls()] if COLLAB_MODE else []),
+    dcc.RadioItems(
+        id="grid-brush", options=LEVEL_OPTIONS, value="Moderate", inline=True,
+        labelStyle={"display": "inline-flex", "alignItems": "center", "marginRight": "16px", "cursor": "pointer"},
+        inputStyle={"marginRight": "6px"},
+        style={"marginBottom": "18px"},
+    ),
+    html.Div(dcc.Graph(
+        id="grid-editor",
+        figure=startup_figure("grid_editor", lambda: build_grid_editor_figure(DEFAULT_GRID_CODE)),
+        config={"displayModeBar": False},
+    ), style={"overflowX": "auto"}),
     html.Div(style={"height": "18px"}),
-    dbc.Button("Reset to Defaults", id="reset-grid-btn", color="secondary", size="sm",
-               style={"fontFamily": "Barlow Condensed"}),
+    html.Div([
+        # assets/cmah_grid_history.js clicks these for Ctrl+Z / Ctrl+Shift+Z (Ctrl+Y)
+        dbc.Button("Undo", id="undo-grid-btn", color="secondary", size="sm", outline=True, disabled=True,
+                   title="Undo (Ctrl+Z)", style={"fontFamily": "Barlow Condensed"}),
+        dbc.Button("Redo", id="redo-grid-btn", color="secondary", size="sm", outline=True, disabled=True,
+                   title="Redo (Ctrl+Shift+Z)", style={"fontFamily": "Barlow Condensed"}),
+        dbc.Button("Reset to Defaults", id="reset-grid-btn", color="secondary", size="sm",
+                   style={"fontFamily": "Barlow Condensed"}),
+    ], style={"display": "flex", "gap": "10px"}),
+    html.Div("IMPACT ANALYSIS", style={**lbl, "fontSize": "15px", "marginTop": "28px"}),
+    html.P("How the grid above changes the rating of every sensitivity × distribution × size state "
+           "compared with another grid. Updates after each edit.",
+           style={"color": "#777", "fontFamily": "Barlow Condensed", "fontSize": "12px", "marginBottom": "10px"}),
+    dcc.Dropdown(id="impact-reference", options=[{"label": "Default grid", "value": "default"}], value="default",
+                 clearable=False, style={"width": "260px", "color": "#111", "fontFamily": "Barlow Condensed",
+                                         "marginBottom": "10px"}),
+    html.Div(id="impact-summary"),
+    dcc.Graph(id="impact-chart", config={"displayModeBar": False}, style={"maxWidth": "900px"}),
+])
+
+history_tab = html.Div([
+    html.Div("SEASON HISTORY", style={**lbl, "fontSize": "15px"}),
+    html.Div([
+        dcc.Dropdown(id="history-zones", multi=True, placeholder="Zones…",
+                     style={"minWidth": "320px", "color": "#111", "fontFamily": "Barlow Condensed"}),
+        dcc.DatePickerRange(id="history-range", display_format="YYYY-MM-DD", clearable=True,
+                            start_date_placeholder_text="From", end_date_placeholder_text="To"),
+    ], style={"display": "flex", "gap": "10px", "alignItems": "center", "flexWrap": "wrap", "marginBottom": "14px"}),
+    dcc.Graph(id="history-chart", config={"displayModeBar": False}),
+    html.Div(id="history-caption", style={"color": "#666", "fontFamily": "Barlow Condensed", "fontSize": "11px"}),
 ])
 
 app.layout = html.Div([
-    dcc.Store(id="danger-grid-store", data=DEFAULT_DANGER_GRID),
+    dcc.Store(id="danger-grid-store", data=DEFAULT_GRID_CODE),
+    # Undo/redo stacks of cell deltas for the grid editor (see "Grid edit history" in CMAH_engine.py)
+    dcc.Store(id="grid-history", data=EMPTY_GRID_HISTORY),
+    # Name of the shared editing session this browser has joined (None: editing alone)
+    dcc.Store(id="collab-session"),
+    # Bumped by assets/cmah_collab.js when session edits arrive
+    *([dcc.Store(id="collab-event")] if COLLAB_MODE else []),
+    # {"active": i, "problems": [[sens, dist, size_lo, size_hi], ...]}; see current_problems
+    dcc.Store(id="problems-store", data=DEFAULT_PROBLEMS),
+    # Snapped {x, y} from dragging on the likelihood matrix (assets/cmah_drag.js)
+    dcc.Store(id="likelihood-pointer"),
+    # Forecast inputs plus spreads, written by assets/cmah_uncertainty.js only while uncertainty mode is on
+    dcc.Store(id="uncertainty-state"),
+    *([dcc.Store(id="forecast-constants", data=forecast_constants())] if CLIENTSIDE_MODE else []),
 
     html.Div([
         html.Div([
@@ -583,8 +871,11 @@ app.layout = html.Div([
                 }),
             ]),
             html.Img(
-                src="https://raw.githubusercontent.com/AndrewSchauer/CNFAC_Dashboard/main/CNFAC_Logo.png",
-                style={"height": "50px"}
+                src=ASSETS.url("img/logo-376.png"),
+                srcSet=srcset(ASSETS, "img/logo", (188, 376, 564)),
+                sizes="188px",
+                alt="CNFAC", width=188, height=50,
+                style={"height": "50px", "width": "auto"}
             ),
         ], style={"display": "flex", "alignItems": "center", "justifyContent": "space-between", "width": "100%"}),
     ], style={"backgroundColor": "#060e1a", "borderBottom": "1px solid #1e3a4a", "padding": "14px 24px 10px"}),
@@ -602,6 +893,12 @@ app.layout = html.Div([
             label_style={"fontFamily": "Barlow Condensed", "letterSpacing": "0.1em", "fontSize": "13px"},
             active_label_style={"color": "#00e5ff", "fontFamily": "Barlow Condensed", "fontSize": "13px"},
         ),
+        dbc.Tab(
+            html.Div(history_tab, style={"padding": "18px"}),
+            label="HISTORY", tab_id="history",
+            label_style={"fontFamily": "Barlow Condensed", "letterSpacing": "0.1em", "fontSize": "13px"},
+            active_label_style={"color": "#00e5ff", "fontFamily": "Barlow Condensed", "fontSize": "13px"},
+        ),
     ], active_tab="forecast",
        style={"backgroundColor": "#060e1a", "borderBottom": "1px solid #1e3a4a"}),
 
@@ -610,54 +907,114 @@ app.layout = html.Div([
 
 # ─── Callbacks ────────────────────────────────────────────────────────────────
 
-@app.callback(
+FORECAST_OUTPUTS = [
     Output("likelihood-matrix", "figure"),
     Output("danger-matrix", "figure"),
     Output("forecast-summary", "children"),
+]
+FORECAST_INPUTS = [
     Input("sens-slider", "value"),
     Input("dist-slider", "value"),
     Input("size-slider", "value"),
     Input("danger-grid-store", "data"),
-)
-def update_all(sens_val, dist_val, size_range, danger_grid):
-    import math
+    Input("problems-store", "data"),
+]
+
+
+@instrument("update_all")
+def update_all(sens_val, dist_val, size_range, danger_grid, problem_store=None):
     # Guard against None inputs during initial load
-    if sens_val is None: sens_val = 2
-    if dist_val is None: dist_val = 1
-    if size_range is None: size_range = [1, 4]
-    if danger_grid is None: danger_grid = DEFAULT_DANGER_GRID
-    # sens_val / dist_val are single half-step indices
-    sf = sens_val / 2.0   # float 0.0–3.0
-    df = dist_val / 2.0   # float 0.0–2.0
+    if sens_val is None: sens_val = DEFAULT_PROBLEM[0]
+    if dist_val is None: dist_val = DEFAULT_PROBLEM[1]
+    if size_range is None: size_range = list(DEFAULT_PROBLEM[2:])
+    if not is_grid_code(danger_grid): danger_grid = DEFAULT_GRID_CODE
+    # sens_val / dist_val are slider indices; sf / df their position on the likelihood matrix
+    sf = slider_to_sens(sens_val)   # float 0.0–3.0
+    df = slider_to_dist(dist_val)   # float 0.0–2.0
     sz0, sz1 = size_range
+    l0, l1   = likelihood_range(sens_val, dist_val)
+
+    problems, active = current_problems(problem_store, sens_val, dist_val, (sz0, sz1))
+
+    grid_key = grid_fingerprint(danger_grid)
+    summary = SUMMARY_CACHE.get_or_build(
+        (problems, active, grid_key),
+        lambda: build_summary(problems, active, danger_grid),
+    )
 
-    # For matrix lookup, cover both adjacent cells when on a half-step
-    s_lo = max(0, min(math.floor(sf), len(SENSITIVITY_LABELS) - 1))
-    s_hi = max(0, min(math.ceil(sf),  len(SENSITIVITY_LABELS) - 1))
-    d_lo = max(0, min(math.floor(df), len(DISTRIBUTION_LABELS) - 1))
-    d_hi = max(0, min(math.ceil(df),  len(DISTRIBUTION_LABELS) - 1))
+    triggered = _triggered_ids()
+    if PATCH_UPDATES and triggered and triggered <= SLIDER_IDS:
+        # The client already holds full figures for this grid and problem list —
+        # just move the highlights of the problem being edited
+        lik_patch = Patch()
+        lik_patch["layout"]["shapes"][0]["path"] = likelihood_highlight_path(sf, df)
+        lik_patch["data"][1]["x"] = [sf]
+        lik_patch["data"][1]["y"] = [df]
+        shape, trace = danger_overlay((l0, l1), (sz0, sz1), danger_grid, active)
+        danger_patch = Patch()
+        danger_patch["layout"]["shapes"][active]["path"] = shape["path"]
+        danger_patch["data"][1 + active]["x"] = trace["x"]
+        danger_patch["data"][1 + active]["y"] = trace["y"]
+        # A size-only move leaves the likelihood matrix untouched
+        return (no_update if triggered == {"size-slider"} else lik_patch), danger_patch, summary
+
+    lik_fig = LIKELIHOOD_FIG_CACHE.get_or_build(
+        (sens_val, dist_val),
+        lambda: build_likelihood_figure(sf, df, fig_w=465, fig_h=350).to_plotly_json(),
+    )
+    base = DANGER_BASE_CACHE.get_or_build(
+        grid_key,
+        lambda: build_danger_figure(None, None, danger_grid, fig_w=420, fig_h=420).to_plotly_json(),
+    )
+    assessment = assess_problems(problems, danger_grid)
+    danger_fig = compose_danger_figure(base, [
+        danger_overlay((lo, hi), (p[2], p[3]), danger_grid, i, i == active)
+        for i, (p, lo, hi) in enumerate(zip(problems, assessment.lik_lo, assessment.lik_hi))
+    ])
+    return lik_fig, danger_fig, summary
 
-    lik_vals = [LIKELIHOOD_MATRIX[r][c]
-                for r in range(d_lo, d_hi + 1)
-                for c in range(s_lo, s_hi + 1)]
-    l0, l1 = min(lik_vals), max(lik_vals)
 
-    lik_fig    = build_likelihood_figure(sf, df, fig_w=465, fig_h=350)
-    danger_fig = build_danger_figure([l0, l1], size_range, danger_grid, fig_w=420, fig_h=420)
+def assess_problems(problems, danger_grid):
+    """All problems of a forecast in one vectorised assess() pass."""
+    sens, dist, size_lo, size_hi = zip(*problems)
+    return assess(sens, dist, size_lo, size_hi, danger_grid)
 
-    danger_in_box = {danger_grid[r][c] for r in range(l0, l1 + 1) for c in range(sz0, sz1 + 1)}
-    max_danger    = max(danger_in_box, key=lambda d: DANGER_LEVELS.index(d))
 
-    def badge(text, d):
+SLIDER_IDS = {"sens-slider", "dist-slider", "size-slider"}
+
+
+def _triggered_ids():
+    """Component ids that fired the current callback (empty outside a Dash request)."""
+    try:
+        return {pid.split(".")[0] for pid in callback_context.triggered_prop_ids}
+    except MissingCallbackContextException:
+        return set()
+
+
+def build_summary(problems, active, danger_grid):
+    """Forecast summary panel: the problem being edited, then per-problem and overall max danger."""
+    sens_val, dist_val, sz0, sz1 = problems[active]
+    assessment = assess_problems(problems, danger_grid)
+    levels  = [int(v) for v in assessment.max_level]
+    overall = max(levels)
+    l0, l1  = int(assessment.lik_lo[active]), int(assessment.lik_hi[active])
+
+    index = box_index(danger_grid)
+
+    def drivers(i):
+        lo, hi = int(assessment.lik_lo[i]), int(assessment.lik_hi[i])
+        return index.argmax_cells((lo, hi), (problems[i][2], problems[i][3]))
+
+    def badge(text, d, size="14px"):
         return html.Span(text, style={
             "backgroundColor": DANGER_COLORS[d], "color": DANGER_TEXT[d],
             "padding": "2px 10px", "fontFamily": "Barlow Condensed",
-            "fontWeight": "700", "fontSize": "14px", "borderRadius": "3px",
+            "fontWeight": "700", "fontSize": size, "borderRadius": "3px",
         })
 
-    def row(label, value):
+    def row(label, value, color="#666"):
         return html.Div([
-            html.Span(label, style={"color": "#666", "fontSize": "12px",
+            html.Span(label, style={"color": color, "fontSize": "12px",
                                     "fontFamily": "Barlow Condensed", "width": "110px", "display": "inline-block"}),
             html.Span(value, style={"color": "#ccc", "fontSize": "12px", "fontFamily": "Barlow Condensed"}),
         ], style={"marginBottom": "6px"})
@@ -665,78 +1022,584 @@ def update_all(sens_val, dist_val, size_range, danger_grid):
     def rng(labels, lo, hi):
         return labels[lo] if lo == hi else f"{labels[lo]} → {labels[hi]}"
 
-    summary = html.Div([
+    children = [
         row("Sensitivity:",  SENSITIVITY_SLIDER_LABELS[sens_val]),
         row("Distribution:", DISTRIBUTION_SLIDER_LABELS[dist_val]),
         row("Likelihood:",   rng(LIKELIHOOD_LABELS,   l0, l1)),
         row("Size:",         rng(SIZE_LABELS,          sz0, sz1)),
         html.Hr(style={"borderColor": "#1e3a4a", "margin": "10px 0"}),
+    ]
+    if len(problems) > 1:
+        children += [
+            row(f"Problem {i + 1}:", badge(DANGER_LEVELS[level].upper(), DANGER_LEVELS[level], "11px"),
+                color=PROBLEM_COLORS[i])
+            for i, level in enumerate(levels)
+        ]
+        set_by = "; ".join(f"Problem {i + 1}: {driver_text(drivers(i))}"
+                           for i, level in enumerate(levels) if level == overall)
+    else:
+        set_by = driver_text(drivers(0))
+    max_danger = DANGER_LEVELS[overall]
+    children += [
         html.Div([
             html.Span("MAX DANGER: ", style={"color": "#888", "fontSize": "12px",
                                              "fontFamily": "Barlow Condensed", "fontWeight": "700", "marginRight": "8px"}),
             badge(max_danger.upper(), max_danger),
         ]),
+        html.Div("Set by: " + set_by, style={
+            "color": "#666", "fontSize": "11px", "fontFamily": "Barlow Condensed", "marginTop": "8px"}),
+    ]
+    return html.Div(children)
+
+
+def driver_text(cells, limit=3):
+    """Readable list of the (likelihood, size) cells that set the max danger."""
+    names = [f"{LIKELIHOOD_LABELS[r]} × size {SIZE_LABELS[c]}" for r, c in cells[:limit]]
+    if len(cells) > limit:
+        names.append(f"+{len(cells) - limit} more")
+    return ", ".join(names)
+
+
+if CLIENTSIDE_MODE:
+    app.clientside_callback(
+        ClientsideFunction(namespace="cmah", function_name="update_forecast"),
+        *FORECAST_OUTPUTS, *FORECAST_INPUTS,
+        State("likelihood-matrix", "figure"),
+        State("danger-matrix", "figure"),
+        State("forecast-constants", "data"),
+    )
+else:
+    app.callback(*FORECAST_OUTPUTS, *FORECAST_INPUTS)(update_all)
+
+
+# ─── Uncertainty mode ─────────────────────────────────────────────────────────
+# assets/cmah_uncertainty.js shows the spread sliders and copies the forecast
+# inputs into "uncertainty-state" while the switch is on. With the switch off the
+# sliders cause no server round trip for this. update_uncertainty samples every
+# problem (simulate_danger) and draws the probability of each danger level as a
+# stacked bar.
+
+UNCERTAINTY_CACHE = LRUCache(maxsize=512)
+
+
+def build_uncertainty_bar(probs, n_samples=UNCERTAINTY_SAMPLES):
+    """Stacked bar of P(max danger = level), with the percentages listed below it."""
+    shown = [(DANGER_LEVELS[i], float(p)) for i, p in enumerate(probs) if p > 0]
+    segments = [
+        html.Div(f"{p:.0%}" if p >= 0.12 else "", title=f"{level}: {p:.1%}", style={
+            "width": f"{p * 100:.2f}%", "backgroundColor": DANGER_COLORS[level], "color": DANGER_TEXT[level],
+            "fontFamily": "Barlow Condensed", "fontWeight": "700", "fontSize": "11px",
+            "textAlign": "center", "lineHeight": "22px", "overflow": "hidden",
+        })
+        for level, p in shown
+    ]
+    legend = " · ".join(f"{level} {p:.0%}" if p >= 0.005 else f"{level} <1%" for level, p in shown)
+    return html.Div([
+        html.Div("MAX DANGER PROBABILITY", style={"color": "#888", "fontSize": "12px", "fontFamily": "Barlow Condensed",
+                                                  "fontWeight": "700", "marginBottom": "6px"}),
+        html.Div(segments, style={"display": "flex", "height": "22px", "borderRadius": "3px", "overflow": "hidden"}),
+        html.Div(legend, style={"color": "#ccc", "fontSize": "11px", "fontFamily": "Barlow Condensed", "marginTop": "6px"}),
+        html.Div(f"{n_samples:,} samples", style={"color": "#666", "fontSize": "11px", "fontFamily": "Barlow Condensed"}),
     ])
-    return lik_fig, danger_fig, summary
 
 
+app.clientside_callback(
+    ClientsideFunction(namespace="cmah", function_name="uncertainty_gate"),
+    Output("uncertainty-body", "style"),
+    Output("uncertainty-state", "data"),
+    Input("uncertainty-switch", "value"),
+    Input("sens-spread", "value"),
+    Input("dist-spread", "value"),
+    Input("size-spread", "value"),
+    *FORECAST_INPUTS,
+)
+
 
 @app.callback(
-    Output("danger-grid-container", "children"),
-    Input("danger-grid-store", "data"),
+    Output("uncertainty-bar", "children"),
+    Input("uncertainty-state", "data"),
+    prevent_initial_call=True,
+)
+@instrument("update_uncertainty")
+def update_uncertainty(state):
+    if not state:
+        return no_update
+    try:
+        sens_val, dist_val, size_range = int(state["sens"]), int(state["dist"]), state["size"]
+        spread = tuple(min(max(int(v), 0), 4) * k for v, k in zip(state["spread"], SPREAD_SCALE))
+        grid = state.get("grid") or DEFAULT_GRID_CODE
+        problems, _ = current_problems(state.get("problems"), sens_val, dist_val, tuple(size_range))
+        if not is_grid_code(grid):
+            return no_update
+        return UNCERTAINTY_CACHE.get_or_build(
+            (problems, spread, grid_fingerprint(grid)),
+            lambda: build_uncertainty_bar(simulate_danger(problems, spread, grid)),
+        )
+    except (KeyError, TypeError, ValueError):
+        return no_update
+
+
+# The sliders always edit the selected problem. Selecting, adding or removing a
+# problem saves the sliders into problems-store and loads the newly selected
+# problem into them (pointer_to_sliders also writes the sliders, hence the
+# allow_duplicate outputs).
+@app.callback(
+    Output("problems-store", "data"),
+    Output("problem-select", "options"),
+    Output("problem-select", "value"),
+    Output("sens-slider", "value", allow_duplicate=True),
+    Output("dist-slider", "value", allow_duplicate=True),
+    Output("size-slider", "value"),
+    Input("problem-select", "value"),
+    Input("add-problem-btn", "n_clicks"),
+    Input("remove-problem-btn", "n_clicks"),
+    State("problems-store", "data"),
+    State("sens-slider", "value"),
+    State("dist-slider", "value"),
+    State("size-slider", "value"),
+    prevent_initial_call=True,
 )
-def refresh_grid(danger_grid):
-    return make_danger_grid_buttons(danger_grid or DEFAULT_DANGER_GRID)
+@instrument("edit_problems")
+def edit_problems(selected, add_clicks, remove_clicks, store, sens_val, dist_val, size_range):
+    problems, active = current_problems(store, sens_val, dist_val, size_range)
+    problems = list(problems)
+    triggered = _triggered_ids()
+
+    if "add-problem-btn" in triggered:
+        if len(problems) >= MAX_PROBLEMS:
+            return (no_update,) * 6
+        problems.append(DEFAULT_PROBLEM)
+        active = len(problems) - 1
+    elif "remove-problem-btn" in triggered:
+        if len(problems) == 1:
+            return (no_update,) * 6
+        del problems[active]
+        active = min(active, len(problems) - 1)
+    elif selected is not None and selected != active and 0 <= selected < len(problems):
+        active = selected
+    else:
+        return (no_update,) * 6
+
+    sens, dist, sz0, sz1 = problems[active]
+    return ({"active": active, "problems": [list(p) for p in problems]},
+            problem_options(len(problems)), active, sens, dist, [sz0, sz1])
 
 
 @app.callback(
     Output("danger-grid-store", "data"),
-    Input({"type": "grid-cell", "row": ALL, "col": ALL}, "value"),
+    Output("grid-editor", "figure"),
+    Output("grid-history", "data"),
+    Output("undo-grid-btn", "disabled"),
+    Output("redo-grid-btn", "disabled"),
+    Input("grid-editor", "clickData"),
     Input("reset-grid-btn", "n_clicks"),
+    Input("profile-select", "value"),
+    Input("undo-grid-btn", "n_clicks"),
+    Input("redo-grid-btn", "n_clicks"),
+    State("grid-brush", "value"),
     State("danger-grid-store", "data"),
+    State("grid-history", "data"),
+    State("collab-session", "data"),
     prevent_initial_call=True,
 )
-def edit_grid(cell_values, reset_clicks, current_grid):
+@instrument("edit_grid")
+def edit_grid(click_data, reset_clicks, profile_ref, undo_clicks, redo_clicks, brush, current_grid, history,
+              collab_session):
     ctx = callback_context
     if not ctx.triggered:
-        return current_grid
+        return (no_update,) * 5
+
+    if not is_grid_code(current_grid):
+        # A stale or hand-edited store can't be diffed against; start over from the default grid
+        return (DEFAULT_GRID_CODE, build_grid_editor_figure(DEFAULT_GRID_CODE), EMPTY_GRID_HISTORY,
+                True, True)
 
     trigger_id = ctx.triggered[0]["prop_id"]
+    undo = "undo-grid-btn" in trigger_id
+
+    if undo or "redo-grid-btn" in trigger_id:
+        new_grid, history, deltas = history_step(current_grid, history, redo=not undo)
+        if deltas is None:
+            return (no_update,) * 5
+        buttons = (not history["undo"], not history["redo"])
+    else:
+        if "reset-grid-btn" in trigger_id or "profile-select" in trigger_id:
+            if "reset-grid-btn" in trigger_id:
+                new_grid = DEFAULT_GRID_CODE
+            else:
+                profile = PROFILES.load(*parse_profile_ref(profile_ref)) if profile_ref else None
+                new_grid = profile[1] if profile is not None else current_grid
+            deltas = grid_diff(current_grid, new_grid)
+            if not deltas:
+                return (no_update,) * 5
+        else:
+            try:
+                point = click_data["points"][0]
+                row, col = int(point["y"]), int(point["x"])
+            except (TypeError, KeyError, IndexError, ValueError):
+                return (no_update,) * 5
+            level_idx = LEVEL_INDEX.get(brush)
+            if level_idx is None or grid_cell(current_grid, row, col) == level_idx:
+                return (no_update,) * 5
+            deltas = [[row, col, grid_cell(current_grid, row, col), level_idx]]
+            new_grid = grid_apply(current_grid, deltas)
+        history = history_record(history, deltas)
+        buttons = (False, True)
+
+    if collab_session and COLLAB is not None:
+        if COLLAB.publish(collab_session, [[r, c, old if undo else new] for r, c, old, new in deltas]) is not None:
+            # The session's stream brings the edit back to this browser too (assets/cmah_collab.js),
+            # so every browser applies the session's edits in the same order
+            return no_update, no_update, history, *buttons
+        # Nobody is connected to the session (e.g. the server restarted and this browser's
+        # stream hasn't reconnected yet): keep the edit here and say it wasn't shared
+        set_props("collab-status", {"children": "Disconnected: edits are local to this browser"})
+    return new_grid, grid_editor_update(new_grid, deltas, undo=undo), history, *buttons
 
-    if "reset-grid-btn" in trigger_id:
-        return _build_default_grid()
 
-    try:
-        d = json.loads(trigger_id.split(".")[0])
-        row, col  = d["row"], d["col"]
-        new_value = ctx.triggered[0]["value"]
-    except Exception:
-        return current_grid
+@app.callback(
+    Output("profile-select", "options"),
+    Output("profile-select", "value"),
+    Output("profile-status", "children"),
+    Output("impact-reference", "options"),
+    Input("save-profile-btn", "n_clicks"),
+    State("profile-name", "value"),
+    State("danger-grid-store", "data"),
+)
+@instrument("save_profile")
+def save_profile(n_clicks, name, grid_code):
+    """Save the current grid as a new profile version; also lists profiles on page load."""
+    value, status = no_update, ""
+    if n_clicks:
+        try:
+            version = PROFILES.save(name, grid_code)
+        except ValueError as e:
+            status = str(e)
+        else:
+            value, status = name.strip(), f"Saved {name.strip()} v{version}"
+    options = [{"label": f"{n} (v{v})", "value": n} for n, v, _ in PROFILES.list_profiles()]
+    return options, value, status, reference_options()
 
-    if new_value not in DANGER_LEVELS:
-        return current_grid
 
-    grid = copy.deepcopy(current_grid)
-    grid[row][col] = new_value
-    return grid
+@app.callback(
+    Output("impact-summary", "children"),
+    Output("impact-chart", "figure"),
+    Input("impact-reference", "value"),
+    Input("danger-grid-store", "data"),
+)
+@instrument("update_impact")
+def update_impact(reference, grid_code):
+    """Compare the edited grid against the reference; reruns after every cell edit."""
+    before = resolve_reference(reference)
+    grid_code = grid_code or DEFAULT_GRID_CODE
+    if before is None or not is_grid_code(grid_code):
+        return html.Div("Unknown grid.", style={"color": "#777", "fontFamily": "Barlow Condensed"}), no_update
+
+    def build():
+        impact = compare_grids(before, grid_code)
+        return build_impact_summary(impact), build_impact_figure(impact)
+    return IMPACT_CACHE.get_or_build((grid_fingerprint(before), grid_fingerprint(grid_code)), build)
+
+
+# ─── Issuing and history ──────────────────────────────────────────────────────
+
+@app.callback(
+    Output("issue-status", "children"),
+    Output("issue-zone-list", "children"),
+    Output("history-zones", "options"),
+    Input("issue-btn", "n_clicks"),
+    State("issue-zone", "value"),
+    State("issue-date", "date"),
+    State("sens-slider", "value"),
+    State("dist-slider", "value"),
+    State("size-slider", "value"),
+    State("problems-store", "data"),
+    State("danger-grid-store", "data"),
+    State("profile-select", "value"),
+)
+@instrument("issue_forecast")
+def issue_forecast(n_clicks, zone, date, sens_val, dist_val, size_range, problem_store, grid_code, profile_ref):
+    """Record the current forecast in the season history; also lists known zones on page load."""
+    status = ""
+    if n_clicks:
+        date = date or datetime.date.today().isoformat()
+        problems, _ = current_problems(problem_store, sens_val, dist_val, size_range)
+        profile = PROFILES.load(*parse_profile_ref(profile_ref)) if profile_ref else None
+        profile = f"{parse_profile_ref(profile_ref)[0]}@{profile[0]}" if profile and profile[1] == grid_code else None
+        try:
+            n = HISTORY.record(zone, date, problems, assess_problems(problems, grid_code), grid_code, profile)
+        except ValueError as e:
+            status = str(e)
+        else:
+            status = f"Issued {zone.strip()} {date}: {n} problem{'s' if n != 1 else ''}"
+    zones = [z for z, *_ in HISTORY.zones()]
+    return status, [html.Option(value=z) for z in zones], zones
+
+
+@app.callback(
+    Output("history-chart", "figure"),
+    Output("history-caption", "children"),
+    Input("history-zones", "value"),
+    Input("history-range", "start_date"),
+    Input("history-range", "end_date"),
+    Input("issue-status", "children"),      # redraw after a forecast is issued
+)
+@instrument("update_history")
+def update_history(zones, start, end, _issued=None):
+    trends = HISTORY.daily_max(zones or [], start, end)
+    series = history_series(trends)
+    if not zones:
+        return build_history_figure(series), "Pick one or more zones."
+    days  = sum(len(d) for d, _ in trends.values())
+    shown = sum(len(d) for d, _, _ in series.values())
+    caption = f"{days} issued day{'s' if days != 1 else ''}" + (f", downsampled to {shown} points" if shown < days else "")
+    return build_history_figure(series), caption
 
 
 # ─── Drag-to-update: likelihood matrix → sliders ─────────────────────────────
 
-def _snap_to_half(val, max_half_idx):
-    """Convert a float axis coordinate to the nearest half-step slider index."""
-    import math
-    # Each cell is 1 unit wide; half-step idx = round(val * 2)
-    half = round(val * 2)
-    return max(0, min(half, max_half_idx))
+# assets/cmah_drag.js turns pointer drags into snapped axis coordinates and
+# writes them to "likelihood-pointer" only when the snapped slider cell changes; this
+# callback moves both sliders in one response, so update_all runs once per cell.
+
+def _snap_to_step(val, steps, max_idx):
+    """Convert a float axis coordinate to the nearest slider index (steps positions per cell)."""
+    # Each cell is 1 unit wide
+    return max(0, min(round(val * steps), max_idx))
 
 def _snap_to_int(val, max_idx):
     """Snap a float coordinate to the nearest integer grid index."""
     return max(0, min(round(val), max_idx))
 
 
+POINTER_OUTPUTS = [Output("sens-slider", "value"), Output("dist-slider", "value")]
+POINTER_INPUTS  = [Input("likelihood-pointer", "data"),
+                   State("sens-slider", "value"), State("dist-slider", "value")]
 
 
+@instrument("pointer_to_sliders")
+def pointer_to_sliders(pointer, sens_val, dist_val):
+    try:
+        x, y = float(pointer["x"]), float(pointer["y"])
+    except (TypeError, KeyError, ValueError):
+        return no_update, no_update
+    sens = _snap_to_step(x, SENSITIVITY_STEPS, len(SENSITIVITY_SLIDER_LABELS) - 1)
+    dist = _snap_to_step(y, DISTRIBUTION_STEPS, len(DISTRIBUTION_SLIDER_LABELS) - 1)
+    return (no_update if sens == sens_val else sens), (no_update if dist == dist_val else dist)
+
+
+if CLIENTSIDE_MODE:
+    app.clientside_callback(
+        ClientsideFunction(namespace="cmah", function_name="pointer_to_sliders"),
+        *POINTER_OUTPUTS, *POINTER_INPUTS, prevent_initial_call=True,
+    )
+else:
+    app.callback(*POINTER_OUTPUTS, *POINTER_INPUTS, prevent_initial_call=True)(pointer_to_sliders)
+
+
+# ─── Shared grid editing ──────────────────────────────────────────────────────
+# CMAH_COLLAB=1: assets/cmah_collab.js opens /collab/<session>/events when the
+# forecaster joins a session and applies the pushed cells to danger-grid-store
+# and the grid editor; edit_grid publishes this browser's edits to the session.
+
+if COLLAB_MODE:
+    app.clientside_callback(
+        ClientsideFunction(namespace="cmah", function_name="collab_join"),
+        Output("collab-session", "data"),
+        Output("collab-join-btn", "children"),
+        Output("collab-status", "children"),
+        Output("collab-name", "disabled"),
+        Input("collab-join-btn", "n_clicks"),
+        State("collab-name", "value"),
+        State("danger-grid-store", "data"),
+        prevent_initial_call=True,
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace="cmah", function_name="collab_apply"),
+        Output("danger-grid-store", "data", allow_duplicate=True),
+        Output("grid-editor", "figure", allow_duplicate=True),
+        Input("collab-event", "data"),
+        State("danger-grid-store", "data"),
+        prevent_initial_call=True,
+    )
+
+    @server.route("/collab/<name>/events")
+    def collab_events(name):
+        seed = request.args.get("grid")
+        if not valid_session(name, seed):
+            return flask.Response("bad session name or grid", status=400, mimetype="text/plain")
+        last_id = parse_last_id(request.headers.get("Last-Event-ID") or request.args.get("last"))
+        stream = COLLAB.stream(name, seed, last_id)
+        if stream is None:
+            return flask.Response("too many open streams", status=503, mimetype="text/plain",
+                                  headers={"Retry-After": "10"})
+        return flask.Response(stream, mimetype="text/event-stream",
+                              headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# ─── JSON assessment API ──────────────────────────────────────────────────────
+# GET  /api/assess?sensitivity=Reactive&distribution=Specific&size_lo=1.5&size_hi=3&grid=default
+# POST /api/assess/batch  {"grid": "default", "items": [{"sensitivity": ..., ...}, ...]}
+# "grid" is a registered grid name, a saved profile or a raw grid code. Responses carry an ETag
+# built from the grid fingerprint, and rendered bodies are shared across
+# requests through API_RESPONSE_CACHE.
+
+GRIDS = {"default": DEFAULT_GRID_CODE}
+
+API_RESPONSE_CACHE = LRUCache(maxsize=4096)
+API_MAX_BATCH      = 10000
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def resolve_grid(name):
+    """Grid code for a registered grid name, a saved profile ("name" or "name@3") or a raw grid code."""
+    name = name or "default"
+    if not isinstance(name, str):
+        raise ApiError("grid must be a string")
+    if name in GRIDS:
+        return GRIDS[name]
+    if is_grid_code(name):
+        return name
+    try:
+        profile = PROFILES.load(*parse_profile_ref(name))
+    except (OverflowError, ValueError):
+        profile = None
+    if profile is not None:
+        return profile[1]
+    raise ApiError(f"unknown grid {name!r}", status=404)
+
+
+def _parse_item(item):
+    try:
+        return (parse_level(str(item["sensitivity"]), SENSITIVITY_LOOKUP),
+                parse_level(str(item["distribution"]), DISTRIBUTION_LOOKUP),
+                parse_size(str(item["size_lo"])),
+                parse_size(str(item["size_hi"])))
+    except KeyError as e:
+        raise ApiError(f"missing field {e.args[0]!r}") from None
+    except ValueError as e:
+        raise ApiError(str(e)) from None
+
+
+def _assessment_json(sens, dist, size_lo, size_hi, lik_lo, lik_hi, level):
+    return {
+        "sensitivity":  SENSITIVITY_SLIDER_LABELS[sens],
+        "distribution": DISTRIBUTION_SLIDER_LABELS[dist],
+        "likelihood":   {"lo": LIKELIHOOD_LABELS[lik_lo], "hi": LIKELIHOOD_LABELS[lik_hi]},
+        "size":         {"lo": SIZE_LABELS[size_lo], "hi": SIZE_LABELS[size_hi]},
+        "max_danger":   DANGER_LEVELS[level],
+    }
+
+
+def _assess_items(items, grid_code):
+    parsed = [_parse_item(item) for item in items]
+    if not parsed:
+        return []
+    columns = [list(col) for col in zip(*parsed)]
+    try:
+        result = assess(*columns, grid_code)
+    except ValueError as e:
+        raise ApiError(str(e)) from None
+    return [_assessment_json(*p, int(lo), int(hi), int(lv))
+            for p, lo, hi, lv in zip(parsed, result.lik_lo, result.lik_hi, result.max_level)]
+
+
+def _api_response(grid_name, grid_code, key, render):
+    """Serve a cached JSON body with an ETag tied to the grid fingerprint and the inputs."""
+    fingerprint = grid_fingerprint(grid_code)
+    etag = f"{fingerprint}-{hashlib.sha1(repr((grid_name, key)).encode()).hexdigest()[:12]}"
+    if request.if_none_match.contains(etag):
+        response = flask.Response(status=304)
+    else:
+        # grid_name is part of the key: a profile or raw code can match the default grid
+        body = API_RESPONSE_CACHE.get_or_build((grid_name, grid_code, key), lambda: json.dumps({
+            "grid": {"name": grid_name, "fingerprint": fingerprint}, **render(),
+        }).encode("utf-8"))
+        response = flask.Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return response
+
+
+@server.errorhandler(ApiError)
+def _api_error(e):
+    return flask.jsonify({"error": str(e)}), e.status
+
+
+@server.route("/api/assess")
+def api_assess():
+    grid_name = request.args.get("grid", "default")
+    grid_code = resolve_grid(grid_name)
+    item = _parse_item(request.args)
+    return _api_response(grid_name, grid_code, item,
+                         lambda: _assess_items([request.args], grid_code)[0])
+
+
+@server.route("/api/assess/batch", methods=["POST"])
+def api_assess_batch():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get("items"), list):
+        raise ApiError('expected a JSON object with an "items" list')
+    items = payload["items"]
+    if len(items) > API_MAX_BATCH:
+        raise ApiError(f"at most {API_MAX_BATCH} items per batch")
+    if not all(isinstance(item, dict) for item in items):
+        raise ApiError("each item must be an object")
+    grid_name = payload.get("grid", "default")
+    grid_code = resolve_grid(grid_name)
+    key = tuple(_parse_item(item) for item in items)
+    return _api_response(grid_name, grid_code, key,
+                         lambda: {"results": _assess_items(items, grid_code)})
+
+
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+# CMAH_METRICS=1 adds callback timing hooks and a Prometheus /metrics endpoint.
+
+for _name, _cache in [("likelihood_figure", LIKELIHOOD_FIG_CACHE), ("danger_base", DANGER_BASE_CACHE),
+                      ("summary", SUMMARY_CACHE), ("box_index", BOX_INDEX_CACHE),
+                      ("uncertainty", UNCERTAINTY_CACHE), ("impact", IMPACT_CACHE),
+                      ("api_response", API_RESPONSE_CACHE), ("profiles", PROFILES), ("history", HISTORY),
+                      ("compressed", CMAH_http.COMPRESSED_CACHE), ("shared_figure", SHARED_CACHE)]:
+    if _cache is None:
+        continue
+    CMAH_metrics.register_cache(_name, _cache)
+CMAH_metrics.install(server)
+
+
+# ─── Compression & HTTP caching ───────────────────────────────────────────────
+# Installed after the metrics hooks so cmah_response_bytes records what goes on
+# the wire. The layout is a fixed component tree and the callback list doesn't
+# change after import, so both are rendered and compressed once per process.
+
+STATIC_ENDPOINTS = [app.config.routes_pathname_prefix + "_dash-dependencies"]
+if not callable(app.layout):
+    STATIC_ENDPOINTS.append(app.config.routes_pathname_prefix + "_dash-layout")
+CMAH_http.install(server, frozen=STATIC_ENDPOINTS, store=SNAPSHOT)
+CMAH_http.warm(server, STATIC_ENDPOINTS)
+
+
+# ─── Fast start ───────────────────────────────────────────────────────────────
+# Seed the figure/summary caches with the page's first forecast (the default
+# slider state) so the first visitor after a restart doesn't pay for plotly's
+# figure validation, then write back anything the snapshot was missing.
+
+STARTUP_CACHES = {"likelihood_figure": LIKELIHOOD_FIG_CACHE, "danger_base": DANGER_BASE_CACHE,
+                  "summary": SUMMARY_CACHE}
+
+if SNAPSHOT is not None:
+    if SNAPSHOT.get("caches") is None:
+        with server.app_context():
+            update_all(*DEFAULT_PROBLEM[:2], list(DEFAULT_PROBLEM[2:]), DEFAULT_GRID_CODE)
+        SNAPSHOT.put("caches", {name: cache.items() for name, cache in STARTUP_CACHES.items()})
+    for _name, _items in SNAPSHOT.get("caches").items():
+        for _key, _value in _items:
+            STARTUP_CACHES[_name].put(_key, _value)
+    SNAPSHOT.save()
 
 
 if __name__ == "__main__":
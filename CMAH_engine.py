@@ -0,0 +1,718 @@
+# -*- coding: utf-8 -*-
+"""
+Headless CMAH danger assessment.
+
+Scales (configurable, see DEFAULT_SCALES), the likelihood matrix, the danger
+grid encoding and a vectorised batch evaluator, with no Dash/Plotly imports so
+nightly multi-zone product runs can use the same logic as the dashboard without
+starting a web server.
+
+    python CMAH_engine.py forecasts.csv -o assessed.csv
+"""
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+
+# ─── Scales ───────────────────────────────────────────────────────────────────
+# Each scale is a list of named anchors plus "steps", the number of positions
+# from one anchor to the next: steps=2 gives the half-step sliders (7 sensitivity
+# and 5 distribution positions) and the 9×9 danger grid. Intermediate labels,
+# the likelihood matrix and the default grid are interpolated from the anchors
+# (build_scales), so a finer resolution only needs a different "steps".
+# CMAH_SCALES=path/to/scales.json replaces these defaults; see scales/quarter.json.
+
+DEFAULT_SCALES = {
+    "sensitivity": {
+        "labels": ["Unreactive", "Stubborn", "Reactive", "Touchy"], "steps": 2,
+        "slider_labels": ["Unreactive", "Unr.–Stub.", "Stubborn", "Stub.–React.",
+                          "Reactive", "React.–Touchy", "Touchy"],
+    },
+    "distribution": {
+        "labels": ["Isolated", "Specific", "Widespread"], "steps": 2,
+        "slider_labels": ["Isolated", "Isol.–Specific", "Specific", "Spec.–Widespread", "Widespread"],
+    },
+    "likelihood": {"labels": ["Unlikely", "Possible", "Likely", "Very Likely", "Almost Certain"], "steps": 2},
+    "size":       {"labels": ["1", "2", "3", "4", "5"], "steps": 2},
+    # rows = distribution, cols = sensitivity; values index the likelihood anchors
+    "likelihood_matrix": [
+        [0, 0, 1, 2],   # Isolated:    Unlikely, Unlikely, Possible, Likely
+        [0, 1, 2, 3],   # Specific:    Unlikely, Possible, Likely,   Very Likely
+        [0, 1, 3, 4],   # Widespread:  Unlikely, Possible, Very Likely, Almost Certain
+    ],
+    # rows = likelihood, cols = size, at full resolution (anchor-only grids are interpolated)
+    "danger_grid": [
+        ["Low","Low","Low","Low","Low","Low","Low","Low","Low"],
+        ["Low","Low","Low","Moderate","Moderate","Moderate","Considerable","Considerable","Considerable"],
+        ["Low","Low","Moderate","Moderate","Moderate","Considerable","Considerable","High","High"],
+        ["Low","Low","Moderate","Moderate","Considerable","Considerable","High","High","Extreme"],
+        ["Low","Moderate","Moderate","Considerable","Considerable","High","High","Extreme","Extreme"],
+        ["Low","Moderate","Considerable","Considerable","High","High","Extreme","Extreme","Extreme"],
+        ["Low","Moderate","Considerable","High","High","Extreme","Extreme","Extreme","Extreme"],
+        ["Low","Moderate","High","High","Extreme","Extreme","Extreme","Extreme","Extreme"],
+        ["Low","Moderate","High","High","Extreme","Extreme","Extreme","Extreme","Extreme"],
+    ],
+}
+
+DANGER_LEVELS = ["No Rating", "Low", "Moderate", "Considerable", "High", "Extreme"]
+
+
+def scale_labels(anchors, steps):
+    """
+    Labels for every position of a scale. Numeric anchors are interpolated as
+    numbers ("1", "1.5", "2"); named ones as "A–B" at the midpoint and
+    "A–B 1/4" elsewhere.
+    """
+    try:
+        values = [float(a) for a in anchors]
+    except ValueError:
+        values = None
+    labels = []
+    for i, (a, b) in enumerate(zip(anchors, anchors[1:])):
+        labels.append(a)
+        for j in range(1, steps):
+            if values is not None:
+                labels.append(f"{values[i] + (values[i + 1] - values[i]) * j / steps:g}")
+            else:
+                labels.append(f"{a}–{b}" if 2 * j == steps else f"{a}–{b} {j}/{steps}")
+    return labels + anchors[-1:]
+
+
+def interpolate_grid(levels, steps_y, steps_x):
+    """Refine a grid of level indices (at least 2 × 2) by bilinear interpolation, rounding half up."""
+    levels = np.asarray(levels, dtype=float)
+    n_y, n_x = levels.shape
+    ys = np.arange((n_y - 1) * steps_y + 1) / steps_y
+    xs = np.arange((n_x - 1) * steps_x + 1) / steps_x
+    y0 = np.minimum(ys.astype(np.intp), n_y - 2)[:, None]
+    x0 = np.minimum(xs.astype(np.intp), n_x - 2)[None, :]
+    fy, fx = ys[:, None] - y0, xs[None, :] - x0
+    value = (levels[y0, x0] * (1 - fy) * (1 - fx) + levels[y0, x0 + 1] * (1 - fy) * fx
+             + levels[y0 + 1, x0] * fy * (1 - fx) + levels[y0 + 1, x0 + 1] * fy * fx)
+    return np.floor(value + 0.5).astype(np.uint8)
+
+
+def build_scales(config):
+    """
+    Every derived scale table for a scale definition (the shape of DEFAULT_SCALES).
+    Raises ValueError if the parts don't fit together.
+    """
+    out = {}
+    for name in ("sensitivity", "distribution", "likelihood", "size"):
+        scale = config[name]
+        anchors, steps = [str(a) for a in scale["labels"]], int(scale.get("steps", 1))
+        if len(anchors) < 2 or steps < 1:
+            raise ValueError(f"{name}: need at least two labels and steps >= 1")
+        labels = [str(a) for a in scale.get("slider_labels", ())] or scale_labels(anchors, steps)
+        if len(labels) != (len(anchors) - 1) * steps + 1:
+            raise ValueError(f"{name}: expected {(len(anchors) - 1) * steps + 1} slider labels")
+        out[name] = (anchors, steps, labels)
+
+    matrix = np.asarray(config["likelihood_matrix"], dtype=np.intp)
+    if matrix.shape != (len(out["distribution"][0]), len(out["sensitivity"][0])):
+        raise ValueError("likelihood_matrix must be distribution × sensitivity labels")
+    if matrix.min() < 0 or matrix.max() >= len(out["likelihood"][0]):
+        raise ValueError("likelihood_matrix values must index the likelihood labels")
+
+    lik_anchors, lik_steps, lik_labels = out["likelihood"]
+    size_anchors, size_steps, size_labels = out["size"]
+    level_index = {d: i for i, d in enumerate(DANGER_LEVELS)}
+    try:
+        grid = np.array([[level_index[d] for d in row] for row in config["danger_grid"]], dtype=np.uint8)
+    except KeyError as e:
+        raise ValueError(f"danger_grid: unknown level {e}") from None
+    if grid.shape == (len(lik_anchors), len(size_anchors)) and (lik_steps, size_steps) != (1, 1):
+        grid = interpolate_grid(grid, lik_steps, size_steps)
+    if grid.shape != (len(lik_labels), len(size_labels)):
+        raise ValueError(f"danger_grid must be {len(lik_labels)} × {len(size_labels)} "
+                         f"(or {len(lik_anchors)} × {len(size_anchors)} anchors)")
+    return {
+        **out,
+        "likelihood_matrix": (matrix * lik_steps).tolist(),
+        "danger_grid": [[DANGER_LEVELS[v] for v in row] for row in grid.tolist()],
+    }
+
+
+def load_scales(path=None):
+    """Scale definition from a JSON file (DEFAULT_SCALES when path is empty)."""
+    if not path:
+        return DEFAULT_SCALES
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+SCALES = build_scales(load_scales(os.environ.get("CMAH_SCALES")))
+# Changes with the scale definition; part of every cache/snapshot key that outlives a process
+SCALES_FINGERPRINT = hashlib.sha1(json.dumps(SCALES, sort_keys=True).encode()).hexdigest()[:12]
+
+# ─── Constants ────────────────────────────────────────────────────────────────
+
+# Named labels (matrix cells) and slider labels (every position, named ones every *_STEPS)
+SENSITIVITY_LABELS, SENSITIVITY_STEPS, SENSITIVITY_SLIDER_LABELS = SCALES["sensitivity"]
+DISTRIBUTION_LABELS, DISTRIBUTION_STEPS, DISTRIBUTION_SLIDER_LABELS = SCALES["distribution"]
+LIKELIHOOD_ANCHORS, LIKELIHOOD_STEPS, LIKELIHOOD_LABELS = SCALES["likelihood"]
+SIZE_ANCHORS, SIZE_STEPS, SIZE_LABELS = SCALES["size"]
+
+
+# Map slider index → position on the likelihood matrix (cell centres at integers)
+def slider_to_sens(v):
+    return v / SENSITIVITY_STEPS
+
+
+def slider_to_dist(v):
+    return v / DISTRIBUTION_STEPS
+
+
+# rows = Distribution, cols = Sensitivity; values index LIKELIHOOD_LABELS (named
+# levels every LIKELIHOOD_STEPS)
+LIKELIHOOD_MATRIX = SCALES["likelihood_matrix"]
+
+# Official avalanche danger colors
+DANGER_COLORS = {
+    "No Rating":    "#444444",
+    "Low":          "#50B848",
+    "Moderate":     "#FFF200",
+    "Considerable": "#F7941E",
+    "High":         "#ED1C24",
+    "Extreme":      "#231F20",
+}
+DANGER_TEXT = {
+    "No Rating":    "#cccccc",
+    "Low":          "#111111",
+    "Moderate":     "#111111",
+    "Considerable": "#111111",
+    "High":         "#ffffff",
+    "Extreme":      "#ffffff",
+}
+DANGER_ABBREV = {
+    "No Rating": "—", "Low": "Low", "Moderate": "Mod",
+    "Considerable": "Con", "High": "High", "Extreme": "Ext"
+}
+
+
+# rows = Likelihood, cols = Size
+DEFAULT_DANGER_GRID = SCALES["danger_grid"]
+
+
+# ─── Compact grid encoding ────────────────────────────────────────────────────
+# The danger grid travels through danger-grid-store as a short string: one digit
+# (the DANGER_LEVELS index) per cell, row-major, rows = likelihood, cols = size.
+# Decoding is a single frombuffer into a uint8 array, and editing a cell splices
+# one character instead of deep-copying nested lists.
+
+LEVEL_INDEX  = {d: i for i, d in enumerate(DANGER_LEVELS)}
+LEVEL_NAMES  = np.array(DANGER_LEVELS, dtype=object)
+LEVEL_COLORS = [DANGER_COLORS[d] for d in DANGER_LEVELS]
+LEVEL_TEXT   = [DANGER_TEXT[d]   for d in DANGER_LEVELS]
+LEVEL_ABBREV = np.array([DANGER_ABBREV[d] for d in DANGER_LEVELS], dtype=object)
+GRID_SHAPE   = (len(LIKELIHOOD_LABELS), len(SIZE_LABELS))
+GRID_CELLS   = GRID_SHAPE[0] * GRID_SHAPE[1]
+# For help and error messages: what a valid grid code looks like on the current scales
+GRID_CODE_FORMAT = f"{GRID_CELLS} digits 0-{len(DANGER_LEVELS) - 1} ({GRID_SHAPE[0]}×{GRID_SHAPE[1]}, row-major)"
+
+
+def encode_grid(grid):
+    """Encode a nested list of level names as a digit string."""
+    return "".join(str(LEVEL_INDEX[d]) for row in grid for d in row)
+
+
+def decode_grid(code):
+    """Decode a digit string to a (likelihood, size) uint8 array of level indices."""
+    return (np.frombuffer(code.encode("ascii"), dtype=np.uint8) - ord("0")).reshape(GRID_SHAPE)
+
+
+def is_grid_code(code):
+    """True if code is a well-formed grid encoding for the current scales."""
+    return (isinstance(code, str) and len(code) == GRID_CELLS
+            and all("0" <= ch < str(len(DANGER_LEVELS)) for ch in code))
+
+
+def grid_cell(code, row, col):
+    """Level index of a single cell without decoding the whole grid."""
+    return ord(code[row * GRID_SHAPE[1] + col]) - ord("0")
+
+
+def grid_set_cell(code, row, col, level_idx):
+    """Return a new code with one cell changed."""
+    i = row * GRID_SHAPE[1] + col
+    return code[:i] + str(level_idx) + code[i + 1:]
+
+
+DEFAULT_GRID_CODE = encode_grid(DEFAULT_DANGER_GRID)
+
+
+# ─── Grid edit history ────────────────────────────────────────────────────────
+# Undo/redo entries hold only the cells an edit changed, as [row, col, old, new]
+# deltas. Every entry is relative to the one live grid code, so history never
+# stores a copy of the grid: a cell click costs one delta, a reset or profile
+# load only the cells that actually differ. History is bounded by both entry
+# count and total delta cells, so a long session has a fixed payload ceiling.
+
+GRID_HISTORY_LIMIT = 100
+GRID_HISTORY_CELLS = 1024
+EMPTY_GRID_HISTORY = {"undo": [], "redo": []}
+
+
+def grid_diff(before, after):
+    """[row, col, old, new] for every cell that differs between two grid codes."""
+    a, b = decode_grid(before), decode_grid(after)
+    rows, cols = np.nonzero(a != b)
+    return [[int(r), int(c), int(a[r, c]), int(b[r, c])] for r, c in zip(rows, cols)]
+
+
+def grid_apply(code, deltas, undo=False):
+    """Return code with deltas applied (or reverted, with undo=True)."""
+    cells = bytearray(code, "ascii")
+    for row, col, old, new in deltas:
+        cells[row * GRID_SHAPE[1] + col] = ord("0") + (old if undo else new)
+    return cells.decode("ascii")
+
+
+def _trim_history(entries):
+    """Drop the oldest entries until entries fits both history bounds."""
+    entries = entries[-GRID_HISTORY_LIMIT:]
+    total = sum(len(e) for e in entries)
+    while len(entries) > 1 and total > GRID_HISTORY_CELLS:
+        total -= len(entries.pop(0))
+    return entries
+
+
+def history_record(history, deltas):
+    """History after a new edit: deltas become the latest undo entry and the redo stack is cleared."""
+    if not deltas:
+        return history
+    undo = list((history or EMPTY_GRID_HISTORY)["undo"])
+    return {"undo": _trim_history(undo + [deltas]), "redo": []}
+
+
+def history_step(code, history, redo=False):
+    """
+    (code, history, deltas) after one undo, or one redo with redo=True.
+    deltas is the entry that was reverted or reapplied; None if there was nothing to step.
+    """
+    history = history or EMPTY_GRID_HISTORY
+    source, target = ("redo", "undo") if redo else ("undo", "redo")
+    if not history[source]:
+        return code, history, None
+    deltas = history[source][-1]
+    return grid_apply(code, deltas, undo=not redo), {
+        source: history[source][:-1],
+        target: _trim_history(history[target] + [deltas]),
+    }, deltas
+
+
+class DangerBoxIndex:
+    """
+    Max danger of every likelihood × size box of one grid, precomputed once.
+
+    table[l0, l1, s0, s1] is the highest level index in rows l0..l1 and columns
+    s0..s1 (inclusive), so a box query is a single array lookup. Built with
+    running maxima: O(R²·C²) cells, 6,561 bytes for the default 9×9 grid.
+    """
+
+    def __init__(self, grid_code):
+        self.grid = decode_grid(grid_code)
+        n_rows, n_cols = self.grid.shape
+        # row_max[l0, l1, c] = max(grid[l0..l1, c])
+        row_max = np.zeros((n_rows, n_rows, n_cols), dtype=np.uint8)
+        for l0 in range(n_rows):
+            row_max[l0, l0:] = np.maximum.accumulate(self.grid[l0:], axis=0)
+        self.table = np.zeros((n_rows, n_rows, n_cols, n_cols), dtype=np.uint8)
+        for s0 in range(n_cols):
+            self.table[:, :, s0, s0:] = np.maximum.accumulate(row_max[:, :, s0:], axis=2)
+
+    def max_level(self, lik_range, size_range):
+        """Highest level index inside the box."""
+        (l0, l1), (s0, s1) = lik_range, size_range
+        return int(self.table[l0, l1, s0, s1])
+
+    def argmax_cells(self, lik_range, size_range):
+        """(likelihood, size) cells inside the box that carry the max level."""
+        (l0, l1), (s0, s1) = lik_range, size_range
+        box   = self.grid[l0:l1 + 1, s0:s1 + 1]
+        cells = np.argwhere(box == self.table[l0, l1, s0, s1]) + (l0, s0)
+        return [tuple(int(v) for v in cell) for cell in cells]
+
+# ─── Caching ──────────────────────────────────────────────────────────────────
+
+class LRUCache:
+    """Bounded, thread-safe LRU mapping with hit/miss/eviction counters."""
+
+    def __init__(self, maxsize):
+        self.maxsize   = maxsize
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """Return the cached value for key, calling build() to fill it on a miss."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        # Build outside the lock; a concurrent miss on the same key just builds twice
+        value = build()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def items(self):
+        """(key, value) pairs, least recently used first."""
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+
+def grid_fingerprint(grid_code):
+    """Short stable hash of an encoded danger grid, used as a cache key component."""
+    return hashlib.sha1(grid_code.encode("ascii")).hexdigest()[:16]
+
+
+
+# One DangerBoxIndex per grid code; rebuilt only when the grid changes.
+BOX_INDEX_CACHE = LRUCache(maxsize=64)
+
+
+def box_index(grid_code):
+    """Shared DangerBoxIndex for a grid code."""
+    return BOX_INDEX_CACHE.get_or_build(grid_code, lambda: DangerBoxIndex(grid_code))
+
+
+# ─── Highlight geometry ───────────────────────────────────────────────────────
+# SVG paths in data coordinates (cell centres at integers), shared by the Dash
+# figures and the native bulletin renderer (CMAH_render.py).
+
+# One colour per avalanche problem of a forecast, in problem order
+PROBLEM_COLORS = ["#00e5ff", "#ff6ec7", "#c6ff00", "#ffab40"]
+MAX_PROBLEMS   = len(PROBLEM_COLORS)
+
+
+def rounded_rect_path(x0, y0, x1, y1, r=0.12):
+    """Return an SVG path string for a rounded rectangle in data coordinates."""
+    # Clamp r so it doesn't exceed half the box size
+    r = min(r, abs(x1 - x0) / 2.0, abs(y1 - y0) / 2.0)
+    p = (
+        f"M {x0+r},{y0} "
+        f"L {x1-r},{y0} "
+        f"Q {x1},{y0} {x1},{y0+r} "
+        f"L {x1},{y1-r} "
+        f"Q {x1},{y1} {x1-r},{y1} "
+        f"L {x0+r},{y1} "
+        f"Q {x0},{y1} {x0},{y1-r} "
+        f"L {x0},{y0+r} "
+        f"Q {x0},{y0} {x0+r},{y0} Z"
+    )
+    return p
+
+
+def likelihood_highlight_path(sf, df):
+    """
+    Highlight box covering the likelihood cell(s) touched by the point (sf, df).
+    Between named steps the point sits on a boundary, so both neighbours are highlighted.
+    """
+    s_lo = math.floor(sf); s_hi = math.ceil(sf)
+    d_lo = math.floor(df); d_hi = math.ceil(df)
+    return rounded_rect_path(s_lo - 0.45, d_lo - 0.45, s_hi + 0.45, d_hi + 0.45, r=0.15)
+
+
+def danger_highlight_path(lik_range, size_range):
+    """Highlight box covering the likelihood × size cells in the danger matrix."""
+    l0, l1 = lik_range
+    s0, s1 = size_range
+    pad_s = 0.49 if s0 != s1 else 0.42
+    pad_l = 0.49 if l0 != l1 else 0.42
+    return rounded_rect_path(s0 - pad_s, l0 - pad_l, s1 + pad_s, l1 + pad_l, r=0.2)
+
+
+# ─── Assessment ───────────────────────────────────────────────────────────────
+
+Assessment = namedtuple("Assessment", ["lik_lo", "lik_hi", "max_level"])
+
+_LIKELIHOOD = np.array(LIKELIHOOD_MATRIX, dtype=np.intp)
+
+
+def likelihood_range(sens_val, dist_val):
+    """
+    (lo, hi) likelihood indices for one slider state. Between named steps the
+    point sits between cells, so both neighbours are covered.
+    """
+    s_lo, s_hi = _step_bounds(sens_val, len(SENSITIVITY_LABELS), SENSITIVITY_STEPS)
+    d_lo, d_hi = _step_bounds(dist_val, len(DISTRIBUTION_LABELS), DISTRIBUTION_STEPS)
+    cells = _LIKELIHOOD[d_lo:d_hi + 1, s_lo:s_hi + 1]
+    return int(cells.min()), int(cells.max())
+
+
+def _step_bounds(v, n, steps):
+    """Floor/ceil cell indices for a slider value with steps positions per cell (works on arrays too)."""
+    return np.clip(v // steps, 0, n - 1), np.clip(-(-v // steps), 0, n - 1)
+
+
+def assess(sens, dist, size_lo, size_hi, grid_code=DEFAULT_GRID_CODE):
+    """
+    Assess many (sensitivity, distribution, size range) entries in one pass.
+
+    sens and dist are slider indices (0–6 and 0–4 on the default half-step
+    scales); size_lo and size_hi index SIZE_LABELS. Scalars broadcast. Returns an Assessment of int arrays:
+    likelihood range (LIKELIHOOD_LABELS indices) and max danger (DANGER_LEVELS index).
+    """
+    sens, dist, size_lo, size_hi = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.intp) for v in (sens, dist, size_lo, size_hi)))
+    _check_range("sensitivity", sens, len(SENSITIVITY_SLIDER_LABELS))
+    _check_range("distribution", dist, len(DISTRIBUTION_SLIDER_LABELS))
+    _check_range("size_lo", size_lo, len(SIZE_LABELS))
+    _check_range("size_hi", size_hi, len(SIZE_LABELS))
+    if np.any(size_lo > size_hi):
+        raise ValueError("size_lo must not exceed size_hi")
+
+    s_lo, s_hi = _step_bounds(sens, len(SENSITIVITY_LABELS), SENSITIVITY_STEPS)
+    d_lo, d_hi = _step_bounds(dist, len(DISTRIBUTION_LABELS), DISTRIBUTION_STEPS)
+    # The touched cells form at most a 2×2 block, so its corners are all of it
+    corners = np.stack([_LIKELIHOOD[d_lo, s_lo], _LIKELIHOOD[d_lo, s_hi],
+                        _LIKELIHOOD[d_hi, s_lo], _LIKELIHOOD[d_hi, s_hi]])
+    lik_lo, lik_hi = corners.min(axis=0), corners.max(axis=0)
+    max_level = box_index(grid_code).table[lik_lo, lik_hi, size_lo, size_hi]
+    return Assessment(lik_lo, lik_hi, max_level.astype(np.intp))
+
+
+# ─── Uncertainty ──────────────────────────────────────────────────────────────
+
+UNCERTAINTY_SAMPLES = 20000
+
+STATE_LEVEL_CACHE = LRUCache(maxsize=64)
+
+
+def state_levels(grid_code):
+    """
+    Max danger of every slider state of one grid, indexed [sens, dist, size_lo,
+    size_hi] (7 × 5 × 9 × 9 uint8 on the default scales). Reversed size pairs
+    hold the same level as the ordered pair, so sampled sizes need no sorting.
+    """
+    def build():
+        sens, dist, a, b = np.indices((len(SENSITIVITY_SLIDER_LABELS), len(DISTRIBUTION_SLIDER_LABELS),
+                                       len(SIZE_LABELS), len(SIZE_LABELS)))
+        result = assess(sens, dist, np.minimum(a, b), np.maximum(a, b), grid_code)
+        return result.max_level.astype(np.uint8)
+    return STATE_LEVEL_CACHE.get_or_build(grid_code, build)
+
+
+def simulate_danger(problems, spread, grid_code=DEFAULT_GRID_CODE, n=UNCERTAINTY_SAMPLES, seed=0):
+    """
+    Probability of each DANGER_LEVELS rating when the inputs are uncertain.
+
+    problems are (sens, dist, size_lo, size_hi) slider indices; spread is the
+    (sensitivity, distribution, size) half-width in slider steps. Every input is
+    drawn from a triangular distribution centred on its slider value, rounded to
+    the nearest slider step and clipped to the slider. Problems vary
+    independently and each sample keeps the highest level over all problems.
+    Samples are looked up in state_levels() in one vectorised pass. The seed is
+    fixed, so the same state always gives the same answer. Returns floats summing to 1.
+    """
+    problems = np.asarray(problems, dtype=np.intp).reshape(-1, 4)
+    table = state_levels(grid_code)
+    rng = np.random.default_rng(seed)
+    shape = (len(problems), n)
+
+    def draw(column, width, n_steps):
+        values = problems[:, column, None]
+        if width <= 0:
+            return values
+        # The difference of two uniforms is triangular on (-1, 1)
+        u = rng.random((2, *shape), dtype=np.float32)
+        return np.clip(np.rint(values + (u[0] - u[1]) * width), 0, n_steps - 1).astype(np.intp)
+
+    sens_w, dist_w, size_w = spread
+    index = np.ravel_multi_index((draw(0, sens_w, table.shape[0]), draw(1, dist_w, table.shape[1]),
+                                  draw(2, size_w, table.shape[2]), draw(3, size_w, table.shape[3])), table.shape)
+    levels = table.ravel()[np.broadcast_to(index, shape)].max(axis=0)
+    return np.bincount(levels, minlength=len(DANGER_LEVELS)) / n
+
+
+# ─── Grid comparison ──────────────────────────────────────────────────────────
+
+GridImpact = namedtuple("GridImpact", ["states", "raised", "lowered", "transitions", "by_input", "by_size"])
+
+
+def compare_grids(before, after):
+    """
+    How switching from grid before to grid after changes the max danger of every
+    reachable slider state (7 sensitivity × 5 distribution half-steps × 45 size
+    ranges = 1,575 states on the default scales), compared as two state_levels() tables.
+
+    Returns a GridImpact: states (total), raised / lowered (number of states
+    whose rating goes up / down), transitions[from, to] (state counts by
+    DANGER_LEVELS index), and per-input counts of changed states split by
+    direction. by_input[up/down, sens, dist] counts the size ranges that
+    changed. by_size[up/down, size_lo, size_hi] counts the sensitivity ×
+    distribution states that changed, and is zero where size_lo > size_hi.
+    """
+    a, b = state_levels(before), state_levels(after)
+    n_sizes = a.shape[2]
+    ordered = np.triu(np.ones((n_sizes, n_sizes), dtype=bool))       # size_lo <= size_hi
+    valid = np.broadcast_to(ordered, a.shape)
+    up, down = (b > a) & valid, (b < a) & valid
+    n_levels = len(DANGER_LEVELS)
+    transitions = np.bincount((a[valid].astype(np.intp) * n_levels + b[valid]),
+                              minlength=n_levels * n_levels).reshape(n_levels, n_levels)
+    return GridImpact(
+        states=int(valid.sum()),
+        raised=int(up.sum()),
+        lowered=int(down.sum()),
+        transitions=transitions,
+        by_input=np.stack([up.sum(axis=(2, 3)), down.sum(axis=(2, 3))]),
+        by_size=np.stack([up.sum(axis=(0, 1)), down.sum(axis=(0, 1))]),
+    )
+
+
+def _check_range(name, values, n):
+    if values.size and (values.min() < 0 or values.max() >= n):
+        raise ValueError(f"{name} must be in 0..{n - 1}")
+
+
+# ─── CSV command line ─────────────────────────────────────────────────────────
+
+def _label_lookup(labels):
+    """Case-insensitive label → slider index map."""
+    return {label.lower(): i for i, label in enumerate(labels)}
+
+
+SENSITIVITY_LOOKUP  = _label_lookup(SENSITIVITY_SLIDER_LABELS)
+DISTRIBUTION_LOOKUP = _label_lookup(DISTRIBUTION_SLIDER_LABELS)
+
+
+def _size_key(label):
+    """Sizes match by value when numeric ("2" == "2.0"), otherwise by label ("D2", "d2")."""
+    try:
+        return float(label)
+    except ValueError:
+        return label.strip().lower()
+
+
+SIZE_LOOKUP         = {_size_key(label): i for i, label in enumerate(SIZE_LABELS)}
+# Scales with labels such as "D1".."D5" also accept a SIZE_LABELS index
+SIZE_NUMERIC        = all(isinstance(key, float) for key in SIZE_LOOKUP)
+
+
+def parse_level(value, lookup):
+    """Slider index from a label ("Stubborn", "Stub.–React.") or an integer index."""
+    key = value.strip().lower()
+    if key in lookup:
+        return lookup[key]
+    try:
+        return int(key)
+    except ValueError:
+        raise ValueError(f"unknown level {value!r}") from None
+
+
+def parse_size(value):
+    """SIZE_LABELS index from a destructive size such as "2" or "2.5" (or a label/index on non-numeric scales)."""
+    key = _size_key(value)
+    if key in SIZE_LOOKUP:
+        return SIZE_LOOKUP[key]
+    if not SIZE_NUMERIC and isinstance(key, float) and key.is_integer() and 0 <= key < len(SIZE_LABELS):
+        return int(key)
+    raise ValueError(f"unknown destructive size {value!r}")
+
+
+def load_grid(path):
+    """Grid code from a JSON file holding either a code string or a nested list of level names."""
+    with open(path, encoding="utf-8") as f:
+        grid = json.load(f)
+    return grid if isinstance(grid, str) else encode_grid(grid)
+
+
+def assess_csv(reader, writer, grid_code=DEFAULT_GRID_CODE, chunk_size=10000):
+    """
+    Stream rows with sensitivity, distribution, size_lo and size_hi columns from a
+    csv.DictReader, assess them chunk by chunk and write them back out with
+    likelihood_lo, likelihood_hi and max_danger appended. Returns the row count.
+    """
+    out = None
+    count = 0
+    while True:
+        rows = [row for _, row in zip(range(chunk_size), reader)]
+        if not rows:
+            return count
+        result = assess(
+            [parse_level(r["sensitivity"], SENSITIVITY_LOOKUP) for r in rows],
+            [parse_level(r["distribution"], DISTRIBUTION_LOOKUP) for r in rows],
+            [parse_size(r["size_lo"]) for r in rows],
+            [parse_size(r["size_hi"]) for r in rows],
+            grid_code,
+        )
+        if out is None:
+            out = csv.DictWriter(writer, fieldnames=list(reader.fieldnames) +
+                                 ["likelihood_lo", "likelihood_hi", "max_danger"])
+            out.writeheader()
+        for row, lo, hi, level in zip(rows, result.lik_lo, result.lik_hi, result.max_level):
+            row["likelihood_lo"] = LIKELIHOOD_LABELS[lo]
+            row["likelihood_hi"] = LIKELIHOOD_LABELS[hi]
+            row["max_danger"]    = DANGER_LEVELS[level]
+        out.writerows(rows)
+        count += len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch CMAH danger assessment over a CSV of forecasts.")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="CSV with sensitivity, distribution, size_lo, size_hi columns (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="output CSV (default: stdout)")
+    parser.add_argument("--grid", help="danger grid code (one digit per cell)")
+    parser.add_argument("--grid-file", help="JSON file with a grid code or nested list of level names")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="rows assessed per vectorised pass")
+    args = parser.parse_args(argv)
+
+    grid_code = DEFAULT_GRID_CODE
+    if args.grid_file:
+        try:
+            grid_code = load_grid(args.grid_file)
+        except (OSError, KeyError, ValueError) as e:
+            parser.error(f"can't read --grid-file {args.grid_file}: {e}")
+    elif args.grid:
+        grid_code = args.grid
+    if not is_grid_code(grid_code):
+        parser.error(f"grid must be {GRID_SHAPE[0] * GRID_SHAPE[1]} digits in 0..{len(DANGER_LEVELS) - 1}")
+
+    src = dst = None
+    try:
+        src = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+        dst = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+        n = assess_csv(csv.DictReader(src), dst, grid_code, args.chunk_size)
+    except OSError as e:
+        parser.error(str(e))
+    except (KeyError, ValueError) as e:
+        parser.error(f"bad input: {e}")
+    finally:
+        if src not in (None, sys.stdin):
+            src.close()
+        if dst not in (None, sys.stdout):
+            dst.close()
+    print(f"assessed {n} rows", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
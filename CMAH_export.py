@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Export a read-only forecast page as static files, for hosting on any CDN or
+static host with no Python running.
+
+With a fixed grid, the forecast tab has a finite state space: 7 × 5
+sensitivity/distribution steps × 45 size ranges on the default scales. Instead
+of storing 1575 copies of each figure, the bundle holds one base figure per matrix plus
+deduplicated overlays:
+
+    points[sens][dist] = [l0, l1, highlight path, crosshair x, y]      35 entries
+    boxes["l0,l1,s0,s1"] = [highlight path, max level, driver xs, driver ys, set-by text]
+                           one per distinct likelihood range × size range
+
+static/export/cmah_export.js swaps the overlays in as the sliders move. All
+files except index.html are content-hashed, so a CDN can cache them forever.
+The live server is still needed for grid editing.
+
+    python CMAH_export.py -o dist                       # default grid
+    python CMAH_export.py -o dist --profile Turnagain   # a saved grid profile (name or name@version)
+    python CMAH_export.py -o dist --grid-file grid.json
+"""
+import argparse
+import hashlib
+import html
+import os
+import re
+import shutil
+import sys
+
+import plotly
+from plotly.io.json import to_json_plotly
+
+from CMAH_engine import (
+    SENSITIVITY_SLIDER_LABELS, DISTRIBUTION_SLIDER_LABELS, SIZE_LABELS,
+    DEFAULT_GRID_CODE, GRID_SHAPE, GRID_CODE_FORMAT, box_index, likelihood_range, load_grid, is_grid_code,
+    slider_to_sens, slider_to_dist,
+)
+
+PLOTLY_JS = os.path.join(os.path.dirname(plotly.__file__), "package_data", "plotly.min.js")
+
+INDEX_HTML = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>CMAH Dashboard</title>
+{stylesheets}
+<style>
+.cmah-label {{ font-family: "Barlow Condensed"; font-weight: 700; font-size: 13px; color: #00e5ff;
+              letter-spacing: 0.12em; margin-bottom: 6px; }}
+.cmah-card {{ background-color: #0d1b2a; border: 1px solid #1e3a4a; margin-bottom: 14px; }}
+.cmah-value {{ color: #ccc; font-family: "Barlow Condensed"; font-size: 12px; }}
+.cmah-plot {{ display: flex; justify-content: center; }}
+</style>
+</head>
+<body data-bundle="{bundle}">
+<div style="background-color: #060e1a; border-bottom: 1px solid #1e3a4a; padding: 14px 24px 10px;">
+  <div style="display: flex; align-items: center; justify-content: space-between;">
+    <div>
+      <span style="font-family: 'Barlow Condensed'; font-weight: 700; font-size: 22px; letter-spacing: 0.25em;
+                   color: #fff;">&#x1F52E; CMAH DASHBOARD</span>
+      <div style="font-family: 'Share Tech Mono'; font-size: 10px; color: #00e5ff; letter-spacing: 0.2em;
+                  margin-top: 2px;">AVALANCHE RISK ASSESSMENT TOOL &middot; {title}</div>
+    </div>
+    <img src="{logo}" srcset="{logo_srcset}" sizes="188px" alt="CNFAC" width="188" height="50"
+         style="height: 50px; width: auto;">
+  </div>
+</div>
+<div class="row" style="padding: 18px; margin: 0;">
+  <div class="col-12 col-md-8">
+    <div class="card cmah-card"><div class="card-body">
+      <div class="cmah-label">SENSITIVITY <span id="sens-value" class="cmah-value"></span></div>
+      <input type="range" class="form-range" id="sens-slider" min="0" max="{sens_max}" step="1" value="{sens_default}">
+      <div class="cmah-label">DISTRIBUTION <span id="dist-value" class="cmah-value"></span></div>
+      <input type="range" class="form-range" id="dist-slider" min="0" max="{dist_max}" step="1" value="{dist_default}">
+      <div class="cmah-label">SIZE <span id="size-value" class="cmah-value"></span></div>
+      <input type="range" class="form-range" id="size-lo" min="0" max="{size_max}" step="1" value="{size_lo_default}">
+      <input type="range" class="form-range" id="size-hi" min="0" max="{size_max}" step="1" value="{size_hi_default}">
+    </div></div>
+    <div class="card cmah-card"><div class="card-body">
+      <div class="cmah-label">LIKELIHOOD MATRIX</div>
+      <div class="cmah-plot"><div id="likelihood-matrix"></div></div>
+    </div></div>
+    <div class="card cmah-card"><div class="card-body">
+      <div class="cmah-label">DANGER MATRIX</div>
+      <div class="cmah-plot"><div id="danger-matrix"></div></div>
+    </div></div>
+  </div>
+  <div class="col-12 col-md-4">
+    <div class="card cmah-card"><div class="card-body">
+      <div class="cmah-label">FORECAST SUMMARY</div>
+      <div id="forecast-summary"></div>
+    </div></div>
+    <img src="{napads}" srcset="{napads_srcset}" sizes="(max-width: 767px) 100vw, 33vw"
+         alt="North American Public Avalanche Danger Scale" width="2157" height="1613"
+         style="width: 100%; height: auto; margin-top: 4px; border-radius: 4px; opacity: 0.9;">
+  </div>
+</div>
+<script src="{plotly_js}"></script>
+<script src="{export_js}"></script>
+</body>
+</html>
+"""
+
+
+_FLOAT = re.compile(r"-?\d+\.\d{5,}")
+
+
+def compact_path(path):
+    """SVG path with float noise (0.21999999999999997) rounded off, ~10% off the bundle."""
+    return _FLOAT.sub(lambda m: f"{float(m.group()):.4g}", path)
+
+
+def build_bundle(grid_code):
+    """Base figures plus deduplicated per-state overlays for one grid (a JSON-ready dict)."""
+    import CMAH_dash as app   # figure builders and layout constants
+
+    points = [[None] * len(DISTRIBUTION_SLIDER_LABELS) for _ in SENSITIVITY_SLIDER_LABELS]
+    lik_ranges = set()
+    for sens in range(len(SENSITIVITY_SLIDER_LABELS)):
+        for dist in range(len(DISTRIBUTION_SLIDER_LABELS)):
+            l0, l1 = likelihood_range(sens, dist)
+            lik_ranges.add((l0, l1))
+            sf, df = slider_to_sens(sens), slider_to_dist(dist)
+            points[sens][dist] = [l0, l1, compact_path(app.likelihood_highlight_path(sf, df)), sf, df]
+
+    index = box_index(grid_code)
+    boxes = {}
+    for l0, l1 in sorted(lik_ranges):
+        for s0 in range(len(SIZE_LABELS)):
+            for s1 in range(s0, len(SIZE_LABELS)):
+                drivers = index.argmax_cells((l0, l1), (s0, s1))
+                boxes[f"{l0},{l1},{s0},{s1}"] = [
+                    compact_path(app.danger_highlight_path((l0, l1), (s0, s1))),
+                    index.max_level((l0, l1), (s0, s1)),
+                    [c for _, c in drivers], [r for r, _ in drivers],
+                    app.driver_text(drivers),
+                ]
+
+    sens, dist, s0, s1 = app.DEFAULT_PROBLEM
+    l0, l1 = likelihood_range(sens, dist)
+    return {
+        "constants":         app.forecast_constants(),
+        "likelihood_figure": app.build_likelihood_figure(slider_to_sens(sens), slider_to_dist(dist)).to_plotly_json(),
+        "danger_figure":     app.build_danger_figure([l0, l1], [s0, s1], grid_code).to_plotly_json(),
+        "points":            points,
+        "boxes":             boxes,
+    }
+
+
+def write_hashed(out_dir, logical, data):
+    """Write data as <stem>.<hash><ext> under out_dir and return its relative URL."""
+    stem, ext = os.path.splitext(logical)
+    if stem.endswith(".min"):
+        stem, ext = stem[:-4], ".min" + ext
+    name = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+    path = os.path.join(out_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return name
+
+
+def export(out_dir, grid_code, title="Default grid"):
+    """Write index.html, the bundle and every referenced asset into out_dir; return {file: bytes}."""
+    import CMAH_dash as app
+    from CMAH_assets import variant_name
+
+    if os.path.isdir(out_dir) and os.listdir(out_dir):
+        if not os.path.exists(os.path.join(out_dir, "index.html")):
+            raise ValueError(f"{out_dir} is not empty and doesn't look like a previous export; not replacing it")
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Static assets keep the live server's hashed paths (minus the leading slash)
+    assets = app.ASSETS
+    for logical, (body, _) in assets.files.items():
+        if logical.startswith(("vendor/", "img/", "export/")) or logical in ("cmah.css", "system-fonts.css"):
+            path = os.path.join(out_dir, assets.url(logical).lstrip("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(body)
+
+    def rel(logical):
+        return assets.url(logical).lstrip("/")
+
+    def srcset(stem, widths):
+        return ", ".join(f"{rel(variant_name(stem, w, 'webp'))} {w}w" for w in widths)
+
+    bundle = to_json_plotly(build_bundle(grid_code)).encode("utf-8")
+    with open(PLOTLY_JS, "rb") as f:
+        plotly_js = write_hashed(out_dir, "static/plotly.min.js", f.read())
+
+    fonts = "vendor/fonts.css" if assets.has("vendor/fonts.css") else "system-fonts.css"
+    stylesheets = [rel("vendor/darkly.min.css"), rel(fonts), rel("cmah.css")]
+    page = INDEX_HTML.format(
+        stylesheets="\n".join(f'<link rel="stylesheet" href="{html.escape(s)}">' for s in stylesheets),
+        bundle=write_hashed(out_dir, "forecast.json", bundle),
+        title=html.escape(title.upper()),
+        logo=rel("img/logo-376.png"), logo_srcset=srcset("img/logo", (188, 376, 564)),
+        napads=rel("img/napads-960.png"), napads_srcset=srcset("img/napads", (480, 960, 1440)),
+        sens_max=len(SENSITIVITY_SLIDER_LABELS) - 1,
+        dist_max=len(DISTRIBUTION_SLIDER_LABELS) - 1,
+        size_max=len(SIZE_LABELS) - 1,
+        sens_default=app.DEFAULT_PROBLEM[0], dist_default=app.DEFAULT_PROBLEM[1],
+        size_lo_default=app.DEFAULT_PROBLEM[2], size_hi_default=app.DEFAULT_PROBLEM[3],
+        plotly_js=plotly_js, export_js=rel("export/cmah_export.js"),
+    )
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(page)
+
+    sizes = {}
+    for dirpath, _, filenames in os.walk(out_dir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            sizes[os.path.relpath(path, out_dir)] = os.path.getsize(path)
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a static, read-only CMAH forecast page.")
+    parser.add_argument("-o", "--output", default="dist", help="output directory (replaced if it exists)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--grid", help=f"grid code, {GRID_CODE_FORMAT}")
+    source.add_argument("--grid-file", help=f"JSON file with a grid code or a {GRID_SHAPE[0]}×{GRID_SHAPE[1]} "
+                                            "list of level names")
+    source.add_argument("--profile", help="saved grid profile, name or name@version")
+    args = parser.parse_args(argv)
+
+    grid_code, title = DEFAULT_GRID_CODE, "Default grid"
+    if args.grid:
+        if not is_grid_code(args.grid):
+            parser.error(f"--grid must be {GRID_CODE_FORMAT}")
+        grid_code, title = args.grid, "Custom grid"
+    elif args.grid_file:
+        try:
+            grid_code = load_grid(args.grid_file)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            parser.error(f"can't read --grid-file {args.grid_file}: {e}")
+        if not is_grid_code(grid_code):
+            parser.error(f"--grid-file must hold {GRID_CODE_FORMAT} or a {GRID_SHAPE[0]}×{GRID_SHAPE[1]} "
+                         "list of level names")
+        title = os.path.basename(args.grid_file)
+    elif args.profile:
+        from CMAH_dash import PROFILES
+        from CMAH_profiles import parse_profile_ref
+        profile = PROFILES.load(*parse_profile_ref(args.profile))
+        if profile is None:
+            parser.error(f"unknown profile: {args.profile}")
+        grid_code, title = profile[1], f"{parse_profile_ref(args.profile)[0]} v{profile[0]}"
+
+    try:
+        sizes = export(args.output, grid_code, title)
+    except ValueError as e:
+        parser.error(str(e))
+    for name, size in sorted(sizes.items(), key=lambda kv: -kv[1]):
+        print(f"{size:10d}  {name}", file=sys.stderr)
+    print(f"{sum(sizes.values()):10d}  total in {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
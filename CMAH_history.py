@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Season history of issued forecasts, kept in a local SQLite database.
+
+Every "Issue" on the forecast tab stores one row per avalanche problem: zone,
+date, the problem inputs, the resulting likelihood range and max danger, and
+the grid it was assessed against. Issuing the same zone and date again
+replaces that day's forecast.
+
+Rows are small integers (dates as days since 1970-01-01) in a WITHOUT ROWID
+table clustered on (zone, day). Alongside the per-problem rows, each day's
+overall max danger is kept column-wise: one byte per day in 256-day blocks, so
+ten seasons of a zone are about fifteen rows and a trend query over several
+seasons and zones returns NumPy arrays in a few milliseconds without reading
+the per-problem table. Charts are downsampled on the server (downsample)
+before they are sent to the browser.
+"""
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from CMAH_engine import grid_fingerprint, is_grid_code
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cmah_history.sqlite3")
+
+BLOCK_DAYS  = 256
+NO_FORECAST = 255
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    zone      TEXT    NOT NULL,
+    day       INTEGER NOT NULL,     -- days since 1970-01-01
+    problem   INTEGER NOT NULL,     -- position of the problem in the forecast
+    sens      INTEGER NOT NULL,     -- slider indices, as in CMAH_engine.assess()
+    dist      INTEGER NOT NULL,
+    size_lo   INTEGER NOT NULL,
+    size_hi   INTEGER NOT NULL,
+    lik_lo    INTEGER NOT NULL,
+    lik_hi    INTEGER NOT NULL,
+    max_level INTEGER NOT NULL,
+    grid      TEXT    NOT NULL,     -- grids.fingerprint
+    profile   TEXT,                 -- "name@version" when the grid was a saved profile
+    issued_at REAL    NOT NULL,
+    PRIMARY KEY (zone, day, problem)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS assessments_day ON assessments (day, zone);
+-- Each day's overall max danger, one byte per day in blocks of BLOCK_DAYS days
+-- (NO_FORECAST where nothing was issued). A season of one zone is one or two
+-- rows, read straight into a NumPy array.
+CREATE TABLE IF NOT EXISTS daily_blocks (
+    zone   TEXT    NOT NULL,
+    block  INTEGER NOT NULL,        -- day // BLOCK_DAYS
+    levels BLOB    NOT NULL,
+    PRIMARY KEY (zone, block)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS grids (
+    fingerprint TEXT PRIMARY KEY,
+    code        TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def to_day(value):
+    """Day number for a date, datetime or "YYYY-MM-DD" string (None passes through)."""
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def from_days(days):
+    """datetime64[D] array for an array of day numbers."""
+    return np.asarray(days, dtype=np.int64).astype("datetime64[D]")
+
+
+class HistoryStore:
+    """Issued forecasts by zone and day, one row per avalanche problem."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock  = threading.Lock()
+        self.queries = self.writes = 0
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        """This thread's connection; reopened after a fork (gunicorn --preload)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        """Counters in the same shape as LRUCache.stats() (size = stored rows)."""
+        (rows,) = self._conn().execute("SELECT COUNT(*) FROM assessments").fetchone()
+        with self._lock:
+            return {"size": rows, "hits": self.queries, "misses": 0, "evictions": self.writes}
+
+    def record(self, zone, day, problems, assessment, grid_code, profile=None, issued_at=None):
+        """
+        Store one issued forecast: problems is a list of (sens, dist, size_lo, size_hi)
+        and assessment the matching CMAH_engine.Assessment. Replaces any forecast
+        already stored for zone and day. Returns the number of rows written.
+        """
+        zone = (zone or "").strip()
+        if not zone:
+            raise ValueError("zone must be non-empty")
+        if not is_grid_code(grid_code):
+            raise ValueError("not a valid grid code")
+        day, fp = to_day(day), grid_fingerprint(grid_code)
+        issued_at = time.time() if issued_at is None else issued_at
+        rows = [
+            (zone, day, i, *map(int, problem), int(lo), int(hi), int(level), fp, profile, issued_at)
+            for i, (problem, lo, hi, level) in enumerate(
+                zip(problems, assessment.lik_lo, assessment.lik_hi, assessment.max_level))
+        ]
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO grids (fingerprint, code) VALUES (?, ?)", (fp, grid_code))
+            conn.execute("DELETE FROM assessments WHERE zone = ? AND day = ?", (zone, day))
+            conn.executemany("INSERT INTO assessments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            _set_daily(conn, zone, np.array([day]), np.array([max(row[9] for row in rows)]))
+        self._count("writes")
+        return len(rows)
+
+    def record_many(self, rows):
+        """Bulk insert (zone, day, problem, sens, dist, size_lo, size_hi, lik_lo, lik_hi,
+        max_level, grid code, profile, issued_at) tuples, e.g. for importing past seasons.
+        Like record(), replaces any forecast already stored for each zone and day in rows."""
+        conn = self._conn()
+        grids = {}
+        with conn:
+            for row in rows:
+                grids.setdefault(row[10], grid_fingerprint(row[10]))
+            conn.executemany("INSERT OR IGNORE INTO grids (fingerprint, code) VALUES (?, ?)",
+                             [(fp, code) for code, fp in grids.items()])
+            conn.executemany("DELETE FROM assessments WHERE zone = ? AND day = ?",
+                             sorted({(row[0], row[1]) for row in rows}))
+            conn.executemany("INSERT OR REPLACE INTO assessments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             [(*row[:10], grids[row[10]], *row[11:]) for row in rows])
+            for zone in sorted({row[0] for row in rows}):
+                days = sorted({row[1] for row in rows if row[0] == zone})
+                daily = conn.execute(
+                    "SELECT day, MAX(max_level) FROM assessments WHERE zone = ? AND day BETWEEN ? AND ? "
+                    "GROUP BY day", (zone, days[0], days[-1])).fetchall()
+                _set_daily(conn, zone, *np.array(daily, dtype=np.int64).T)
+        self._count("writes")
+
+    def zones(self):
+        """[(zone, first day, last day, days issued)] sorted by zone."""
+        self._count("queries")
+        result = []
+        for zone, (days, _) in self._blocks(None, None, None).items():
+            result.append((zone, int(days[0]), int(days[-1]), len(days)))
+        return result
+
+    def forecast(self, zone, day):
+        """Problem rows (sens, dist, size_lo, size_hi, lik_lo, lik_hi, max_level, grid code, profile)
+        issued for zone on day, in problem order."""
+        self._count("queries")
+        return self._conn().execute(
+            "SELECT sens, dist, size_lo, size_hi, lik_lo, lik_hi, max_level, grids.code, profile "
+            "FROM assessments JOIN grids ON grids.fingerprint = assessments.grid "
+            "WHERE zone = ? AND day = ? ORDER BY problem", (zone, to_day(day))).fetchall()
+
+    def daily_max(self, zones, start=None, end=None):
+        """
+        {zone: (days, levels)} — the highest max danger over all problems for each
+        issued day in [start, end], as int32 / uint8 arrays sorted by day. One
+        query for all zones, reading only the daily blocks that overlap the range.
+        """
+        zones = list(zones)
+        if not zones:
+            return {}
+        self._count("queries")
+        empty = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.uint8))
+        return {**dict.fromkeys(zones, empty), **self._blocks(zones, to_day(start), to_day(end))}
+
+    def _blocks(self, zones, start, end):
+        """{zone: (days, levels)} from daily_blocks; zones=None means every zone."""
+        lo = -2 ** 31 if start is None else start
+        hi = 2 ** 31 - 1 if end is None else end
+        where = "block BETWEEN ? AND ?"
+        params = [lo // BLOCK_DAYS, hi // BLOCK_DAYS]
+        if zones is not None:
+            where += f" AND zone IN ({','.join('?' * len(zones))})"
+            params += zones
+        rows = self._conn().execute(
+            f"SELECT zone, block, levels FROM daily_blocks WHERE {where} ORDER BY zone, block", params).fetchall()
+        result = {}
+        i = 0
+        while i < len(rows):
+            # Rows are ordered by zone, so each zone is one contiguous run of blocks
+            j = i
+            while j < len(rows) and rows[j][0] == rows[i][0]:
+                j += 1
+            levels = np.frombuffer(b"".join(r[2] for r in rows[i:j]), dtype=np.uint8)
+            days = (np.repeat(np.array([r[1] for r in rows[i:j]], dtype=np.int32) * BLOCK_DAYS, BLOCK_DAYS)
+                    + np.tile(np.arange(BLOCK_DAYS, dtype=np.int32), j - i))
+            keep = (levels != NO_FORECAST) & (days >= lo) & (days <= hi)
+            if keep.any():
+                result[rows[i][0]] = (days[keep], levels[keep])
+            i = j
+        return result
+
+
+def _set_daily(conn, zone, days, levels):
+    """Write per-day max levels for one zone into its daily blocks (inside the caller's transaction)."""
+    days, levels = np.asarray(days, dtype=np.int64), np.asarray(levels, dtype=np.uint8)
+    for block in np.unique(days // BLOCK_DAYS):
+        row = conn.execute("SELECT levels FROM daily_blocks WHERE zone = ? AND block = ?",
+                           (zone, int(block))).fetchone()
+        data = (np.frombuffer(row[0], dtype=np.uint8).copy() if row
+                else np.full(BLOCK_DAYS, NO_FORECAST, dtype=np.uint8))
+        mask = days // BLOCK_DAYS == block
+        data[days[mask] % BLOCK_DAYS] = levels[mask]
+        conn.execute("INSERT OR REPLACE INTO daily_blocks (zone, block, levels) VALUES (?, ?, ?)",
+                     (zone, int(block), data.tobytes()))
+
+
+def downsample(days, levels, max_points):
+    """
+    Reduce a daily series to at most max_points buckets of equal width in days.
+    Returns (bucket start days, max level, min level) per non-empty bucket: the
+    max keeps every peak visible, the min shows how far danger dropped within it.
+    """
+    days, levels = np.asarray(days), np.asarray(levels)
+    if len(days) <= max_points:
+        return days, levels, levels
+    width = -(-(int(days[-1]) - int(days[0]) + 1) // max_points)     # ceil
+    buckets = (days - days[0]) // width
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    return (days[0] + buckets[starts] * width,
+            np.maximum.reduceat(levels, starts),
+            np.minimum.reduceat(levels, starts))
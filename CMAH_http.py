@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Response compression and cache validators for the Flask server.
+
+Enabled by default; CMAH_COMPRESS=0 turns it off (e.g. behind a proxy that
+already compresses). Text responses of at least MIN_SIZE bytes are sent as
+brotli or gzip, whichever the client prefers (brotli only if the optional
+`brotli` package is installed).
+
+GET responses are compressed once per distinct body and kept in an LRU cache.
+The JS bundles and static assets are identical on every visit, so each worker
+compresses them once. "Frozen" endpoints (the Dash layout and dependency
+list, which don't change while the process runs) are rendered once. Their
+brotli and gzip forms are built up front at maximum quality, and they are
+served with an ETag so a revisit gets a 304 with no body.
+"""
+import gzip
+import hashlib
+import os
+
+import flask
+
+from CMAH_engine import LRUCache
+
+try:
+    import brotli
+except ImportError:     # gzip only
+    brotli = None
+
+ENABLED  = os.environ.get("CMAH_COMPRESS", "1") == "1"
+MIN_SIZE = 1024     # smaller bodies aren't worth a compression round trip
+
+COMPRESSIBLE = {
+    "application/json", "application/javascript", "text/javascript", "text/css",
+    "text/html", "text/plain", "text/csv", "image/svg+xml",
+}
+
+# On-the-fly levels trade a little ratio for speed (brotli 5 is ~10x faster
+# than 11 and within ~10% of its size); frozen bodies get the maximum.
+FAST_LEVELS = {"br": 5, "gzip": 6}
+BEST_LEVELS = {"br": 11, "gzip": 9}
+
+COMPRESSED_CACHE = LRUCache(256)   # (body digest, encoding) → compressed bytes
+
+
+def encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(body, encoding, level):
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def negotiate():
+    """Best encoding the current request accepts, or None."""
+    accepted = flask.request.accept_encodings
+    best, best_q = None, 0
+    for encoding in encodings():
+        q = accepted[encoding]
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def digest(body):
+    return hashlib.sha1(body).hexdigest()[:20]
+
+
+def _compressible(response):
+    return (response.status_code == 200
+            and not response.direct_passthrough
+            and not response.is_streamed
+            and "Content-Encoding" not in response.headers
+            and response.mimetype in COMPRESSIBLE)
+
+
+def _encode(response, encoding, body):
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+
+
+def compress_response(response):
+    """after_request hook: compress text bodies the client can decode."""
+    if not _compressible(response):
+        return response
+    body = response.get_data()
+    if len(body) < MIN_SIZE:
+        return response
+    encoding = negotiate()
+    if encoding is None:
+        response.vary.add("Accept-Encoding")
+        return response
+    if flask.request.method == "GET":
+        data = COMPRESSED_CACHE.get_or_build(
+            (digest(body), encoding), lambda: compress(body, encoding, FAST_LEVELS[encoding]))
+    else:
+        data = compress(body, encoding, FAST_LEVELS[encoding])
+    _encode(response, encoding, data)
+    return response
+
+
+class FrozenResponse:
+    """A view's first response, kept with its ETag and pre-compressed variants."""
+
+    def __init__(self, response):
+        self.body     = response.get_data()
+        self.mimetype = response.mimetype
+        self.etag     = digest(self.body)
+        self.variants = {}
+        if len(self.body) >= MIN_SIZE:
+            for encoding in encodings():
+                self.variants[encoding] = compress(self.body, encoding, BEST_LEVELS[encoding])
+
+    def respond(self):
+        if flask.request.if_none_match.contains_weak(self.etag):
+            response = flask.Response(status=304)
+        else:
+            encoding = negotiate() if ENABLED else None
+            if encoding in self.variants:
+                response = flask.Response(self.variants[encoding], mimetype=self.mimetype)
+                _encode(response, encoding, self.variants[encoding])
+            else:
+                response = flask.Response(self.body, mimetype=self.mimetype)
+                response.vary.add("Accept-Encoding")
+        # Weak: the brotli, gzip and identity bodies are the same representation
+        response.set_etag(self.etag, weak=True)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
+def freeze(server, endpoint, store=None):
+    """
+    Serve endpoint from a FrozenResponse built on first use (or by warm()).
+    With a store (a CMAH_snapshot.Snapshot), the frozen response is taken from
+    and saved to it, so a restart skips rendering and compressing it again.
+    """
+    view = server.view_functions[endpoint]
+    key = ("frozen", endpoint)
+    state = {}
+    if store is not None and store.get(key) is not None:
+        state["frozen"] = store.get(key)
+
+    def frozen_view(*args, **kwargs):
+        if "frozen" not in state:
+            state["frozen"] = FrozenResponse(flask.make_response(view(*args, **kwargs)))
+            if store is not None:
+                store.put(key, state["frozen"])
+        return state["frozen"].respond()
+    server.view_functions[endpoint] = frozen_view
+
+
+def install(server, frozen=(), store=None):
+    """Freeze the given endpoints and add the compression hook (no-op for the hook when disabled)."""
+    for endpoint in frozen:
+        freeze(server, endpoint, store)
+    if ENABLED:
+        server.after_request(compress_response)
+
+
+def warm(server, paths):
+    """Request paths once so their frozen responses are built before the first visitor."""
+    client = server.test_client()
+    for path in paths:
+        client.get(path)
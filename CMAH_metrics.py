@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Optional per-callback instrumentation exposed in Prometheus text format.
+
+Enabled with CMAH_METRICS=1. When disabled, instrument() returns the callback
+unchanged and no request hooks or /metrics route are installed, so the cost is
+zero. Metrics are per process; with several gunicorn workers each worker
+reports its own counts.
+
+Recorded per callback:
+  cmah_callback_seconds         time inside the callback function (figure building etc.)
+  cmah_request_seconds          whole /_dash-update-component request, incl. Dash serialisation
+  cmah_response_bytes           callback response body size, after compression
+  cmah_queue_seconds            time spent queued before the worker picked the request up
+                                (from the proxy's X-Request-Start header, when present)
+plus hit/miss/eviction counters for each registered LRU cache.
+"""
+import functools
+import os
+import threading
+import time
+
+import flask
+
+ENABLED = os.environ.get("CMAH_METRICS", "0") == "1"
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BYTES_BUCKETS   = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a single label value."""
+
+    def __init__(self, name, help_text, buckets, label="callback"):
+        self.name, self.help, self.buckets, self.label = name, help_text, buckets, label
+        self._series = {}   # label value → [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for value, series in items:
+            lbl = f'{self.label}="{value}"'
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{lbl},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{lbl},le="+Inf"}} {series[len(self.buckets)]}')
+            lines.append(f"{self.name}_count{{{lbl}}} {series[len(self.buckets)]}")
+            lines.append(f"{self.name}_sum{{{lbl}}} {series[-1]:.6f}")
+        return lines
+
+
+CALLBACK_SECONDS = Histogram("cmah_callback_seconds", "Time spent inside the callback function.", SECONDS_BUCKETS)
+REQUEST_SECONDS  = Histogram("cmah_request_seconds", "Callback request time including Dash serialisation.",
+                             SECONDS_BUCKETS)
+RESPONSE_BYTES   = Histogram("cmah_response_bytes", "Callback response body size as sent (after compression).",
+                             BYTES_BUCKETS)
+QUEUE_SECONDS    = Histogram("cmah_queue_seconds", "Time between the proxy accepting a request and the worker "
+                             "starting it (X-Request-Start).", SECONDS_BUCKETS, label="endpoint")
+HISTOGRAMS = [CALLBACK_SECONDS, REQUEST_SECONDS, RESPONSE_BYTES, QUEUE_SECONDS]
+
+CACHES = {}     # name → object with .stats()
+
+
+def register_cache(name, cache):
+    CACHES[name] = cache
+
+
+def instrument(name):
+    """Decorator recording the callback's run time; the identity when metrics are off."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            flask.g.cmah_callback = name
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                CALLBACK_SECONDS.observe(name, time.perf_counter() - t0)
+        return wrapper
+    return decorate
+
+
+def _request_start_seconds(header):
+    """Parse X-Request-Start ("t=1700000000.123", or epoch ms/µs) to epoch seconds."""
+    value = header.strip()
+    if value.startswith("t="):
+        value = value[2:]
+    try:
+        t = float(value)
+    except ValueError:
+        return None
+    while t > 1e11:     # ms or µs since the epoch
+        t /= 1000.0
+    return t
+
+
+def render():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for metric in ("hits", "misses", "evictions"):
+        lines.append(f"# TYPE cmah_cache_{metric}_total counter")
+        for name, cache in sorted(CACHES.items()):
+            lines.append(f'cmah_cache_{metric}_total{{cache="{name}"}} {cache.stats()[metric]}')
+    lines.append("# TYPE cmah_cache_entries gauge")
+    for name, cache in sorted(CACHES.items()):
+        lines.append(f'cmah_cache_entries{{cache="{name}"}} {cache.stats()["size"]}')
+    return "\n".join(lines) + "\n"
+
+
+def install(server, path="/metrics"):
+    """Add request hooks and the /metrics route to a Flask server (no-op when disabled)."""
+    if not ENABLED:
+        return
+
+    @server.before_request
+    def _start_timer():
+        flask.g.cmah_t0 = time.perf_counter()
+        start = flask.request.headers.get("X-Request-Start")
+        if start:
+            t = _request_start_seconds(start)
+            if t is not None:
+                QUEUE_SECONDS.observe(flask.request.endpoint or "other", max(0.0, time.time() - t))
+
+    @server.after_request
+    def _record(response):
+        name = flask.g.get("cmah_callback")
+        if name is not None:
+            REQUEST_SECONDS.observe(name, time.perf_counter() - flask.g.cmah_t0)
+            RESPONSE_BYTES.observe(name, response.calculate_content_length() or 0)
+        return response
+
+    @server.route(path)
+    def _metrics():
+        return flask.Response(render(), mimetype="text/plain; version=0.0.4")
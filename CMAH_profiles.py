@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Named, versioned danger grid profiles (per zone or per forecaster) kept in a
+local SQLite database, so custom grids survive page reloads and restarts.
+
+Each thread keeps one open connection, and reads go through an in-process
+cache. The cache is dropped on every write and whenever SQLite reports that
+another connection (e.g. another gunicorn worker) has changed the database.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from CMAH_engine import is_grid_code
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cmah_profiles.sqlite3")
+MAX_VERSION = 2 ** 63 - 1      # largest SQLite INTEGER
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS grid_profiles (
+    name       TEXT    NOT NULL,
+    version    INTEGER NOT NULL,
+    grid       TEXT    NOT NULL,
+    author     TEXT,
+    created_at REAL    NOT NULL,
+    PRIMARY KEY (name, version)
+);
+"""
+
+
+class ProfileStore:
+    """Versioned grid profiles: every save of a name adds a new version."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock  = threading.Lock()
+        self._cache = {}        # (name, version or None) → (version, grid code)
+        self._listing = None    # cached list_profiles() result
+        self.hits = self.misses = self.invalidations = 0
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        """This thread's connection, opened on first use and then reused. Reopened
+        after a fork (gunicorn --preload), as SQLite connections can't cross processes."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+            self._local.data_version = None
+        return conn
+
+    def _check_external_writes(self):
+        """Drop cached reads if another connection has committed since we last looked.
+        A thread's first check has nothing to compare with, and the shared cache may
+        predate a write it can't see, so that drops the cache too."""
+        conn = self._conn()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._local.data_version:
+            self._invalidate()
+        self._local.data_version = version
+
+    def _invalidate(self):
+        with self._lock:
+            self._cache.clear()
+            self._listing = None
+            self.invalidations += 1
+
+    def stats(self):
+        """Read-cache counters, in the same shape as LRUCache.stats()."""
+        with self._lock:
+            return {"size": len(self._cache), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.invalidations}
+
+    def save(self, name, grid_code, author=None):
+        """Store grid_code as the next version of name and return that version number."""
+        name = (name or "").strip()
+        if not name or "@" in name:
+            raise ValueError("profile name must be non-empty and must not contain '@'")
+        if not is_grid_code(grid_code):
+            raise ValueError("not a valid grid code")
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            (latest,) = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM grid_profiles WHERE name = ?", (name,)).fetchone()
+            conn.execute(
+                "INSERT INTO grid_profiles (name, version, grid, author, created_at) VALUES (?, ?, ?, ?, ?)",
+                (name, latest + 1, grid_code, author, time.time()))
+        self._invalidate()
+        return latest + 1
+
+    def load(self, name, version=None):
+        """(version, grid code) for name — latest version unless one is given — or None."""
+        self._check_external_writes()
+        key = (name, version)
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+        if version is None:
+            row = self._conn().execute(
+                "SELECT version, grid FROM grid_profiles WHERE name = ? ORDER BY version DESC LIMIT 1",
+                (name,)).fetchone()
+        else:
+            row = self._conn().execute(
+                "SELECT version, grid FROM grid_profiles WHERE name = ? AND version = ?",
+                (name, version)).fetchone()
+        if row is not None:     # unknown names are not cached, so lookups can't grow it unbounded
+            with self._lock:
+                self._cache[key] = row
+        return row
+
+    def list_profiles(self):
+        """[(name, latest version, last saved timestamp)] sorted by name."""
+        self._check_external_writes()
+        with self._lock:
+            if self._listing is not None:
+                return self._listing
+        rows = self._conn().execute(
+            "SELECT name, MAX(version), MAX(created_at) FROM grid_profiles GROUP BY name ORDER BY name"
+        ).fetchall()
+        with self._lock:
+            self._listing = rows
+        return rows
+
+
+def parse_profile_ref(ref):
+    """Split "name" or "name@3" into (name, version or None). Anything after "@"
+    that isn't a version SQLite can store stays part of the name, which no saved
+    profile can have, so it simply isn't found."""
+    name, sep, version = ref.rpartition("@")
+    if sep and version.isascii() and version.isdigit() and int(version) <= MAX_VERSION:
+        return name, int(version)
+    return ref, None
@@ -0,0 +1,438 @@
+# -*- coding: utf-8 -*-
+"""
+Bulletin graphics without Plotly: the likelihood and danger matrices drawn
+straight to SVG, optionally rasterised to PNG with Pillow.
+
+Plotly's static image export needs a headless browser; this draws the same
+cells, labels and highlight boxes (CMAH_engine.rounded_rect_path) from the
+engine's constants in a few milliseconds and only imports NumPy. Each figure
+is first laid out as a list of pixel-space primitives, which to_svg() and
+to_png() then paint, so both formats show the same picture. Rendered images are kept
+in RENDER_CACHE keyed by forecast state.
+
+Batch mode renders every zone's graphics in one run, spread over a process
+pool. Identical forecasts are only rendered once:
+
+    python CMAH_render.py forecasts.csv -o bulletins/              # zone, sensitivity, distribution, size_lo, size_hi
+    python CMAH_render.py --history 2026-01-05 -o bulletins/ --format svg,png
+"""
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+
+from CMAH_engine import (
+    SENSITIVITY_LABELS, DISTRIBUTION_LABELS, SIZE_LABELS, LIKELIHOOD_LABELS, LIKELIHOOD_MATRIX,
+    LIKELIHOOD_ANCHORS, LIKELIHOOD_STEPS, slider_to_sens, slider_to_dist,
+    LEVEL_COLORS, PROBLEM_COLORS, MAX_PROBLEMS, DEFAULT_GRID_CODE, GRID_CODE_FORMAT,
+    SENSITIVITY_LOOKUP, DISTRIBUTION_LOOKUP, SENSITIVITY_SLIDER_LABELS, DISTRIBUTION_SLIDER_LABELS,
+    LRUCache, assess, box_index, decode_grid, grid_fingerprint, is_grid_code, load_grid,
+    parse_level, parse_size, likelihood_highlight_path, danger_highlight_path,
+)
+
+PAPER      = "#0d1b2a"
+TICK_COLOR = "#bbbbbb"
+AXIS_COLOR = "#888888"
+FONT_FAMILY = "Barlow Condensed, Arial Narrow, sans-serif"
+# Pillow needs a font file; the first one found is used
+PNG_FONTS = ["BarlowCondensed-Medium.ttf", "DejaVuSansCondensed.ttf", "DejaVuSans.ttf", "Arial.ttf"]
+
+# Same stops as the likelihood heatmap in CMAH_dash.build_likelihood_figure (z 0–8)
+LIKELIHOOD_SCALE = [(0.00, "#2a2a2a"), (0.33, "#5a5a5a"), (0.66, "#9a9a9a"), (1.00, "#d8d8d8")]
+
+# (kind, problems, grid fingerprint, format, scale) → bytes
+RENDER_CACHE = LRUCache(maxsize=512)
+
+
+# ─── Layout ───────────────────────────────────────────────────────────────────
+
+class Axes:
+    """Maps data coordinates (cell centres at integers, y up) to pixels."""
+
+    def __init__(self, width, height, margin, n_x, n_y):
+        left, right, top, bottom = margin
+        self.left, self.top = left, top
+        self.w, self.h = width - left - right, height - top - bottom
+        self.sx, self.sy = self.w / n_x, self.h / n_y
+
+    def x(self, v):
+        return self.left + (v + 0.5) * self.sx
+
+    def y(self, v):
+        return self.top + self.h - (v + 0.5) * self.sy
+
+
+_PATH_TOKEN = re.compile(r"([MLQZ])|(-?[\d.]+(?:e-?\d+)?),(-?[\d.]+(?:e-?\d+)?)")
+
+
+def path_to_pixels(path, ax):
+    """[(command, [(x, y), ...])] in pixels for an M/L/Q/Z path in data coordinates."""
+    segments = []
+    for cmd, x, y in _PATH_TOKEN.findall(path):
+        if cmd:
+            segments.append((cmd, []))
+        else:
+            segments[-1][1].append((ax.x(float(x)), ax.y(float(y))))
+    return segments
+
+
+def _hex_to_rgb(color):
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+
+def _interp(scale, t):
+    """Colour at t (0–1) on a list of (stop, #rrggbb), interpolated in RGB like plotly."""
+    for (t0, c0), (t1, c1) in zip(scale, scale[1:]):
+        if t <= t1:
+            f = (t - t0) / (t1 - t0) if t1 > t0 else 0.0
+            rgb = [round(a + (b - a) * f) for a, b in zip(_hex_to_rgb(c0), _hex_to_rgb(c1))]
+            return "#%02x%02x%02x" % tuple(rgb)
+    return scale[-1][1]
+
+
+def _overlay(ax, path, color, width=3):
+    return ("path", path_to_pixels(path, ax), color, width, color, 0.18)
+
+
+def _x_ticks(ax, labels, size):
+    return [("text", ax.x(i), ax.top + ax.h + 14, label, size, TICK_COLOR, "middle", 0)
+            for i, label in enumerate(labels)]
+
+
+def _y_ticks(ax, ticks, size):
+    return [("text", ax.left - 6, ax.y(i), label, size, TICK_COLOR, "end", 0) for i, label in ticks]
+
+
+def _titles(ax, width, height, x_title, y_title):
+    return [("text", ax.left + ax.w / 2, height - 10, x_title, 11, AXIS_COLOR, "middle", 0),
+            ("text", 12, ax.top + ax.h / 2, y_title, 11, AXIS_COLOR, "middle", -90)]
+
+
+def likelihood_scene(problems, width=505, height=360):
+    """
+    Primitives for the likelihood matrix with each problem's highlight box and
+    crosshair. problems are (sens, dist, size_lo, size_hi) slider indices.
+    """
+    n_x, n_y = len(SENSITIVITY_LABELS), len(DISTRIBUTION_LABELS)
+    ax = Axes(width, height, (100, 10, 10, 50), n_x, n_y)
+    scene = [("rect", 0, 0, width, height, PAPER)]
+    top = len(LIKELIHOOD_LABELS) - 1
+    for r, row in enumerate(LIKELIHOOD_MATRIX):
+        for c, v in enumerate(row):
+            scene.append(("rect", ax.x(c - 0.5), ax.y(r + 0.5), ax.sx, ax.sy, _interp(LIKELIHOOD_SCALE, v / top)))
+            scene.append(("text", ax.x(c), ax.y(r), LIKELIHOOD_LABELS[v], 12,
+                          "#111111" if v / top >= 0.7 else "#ffffff", "middle", 0))
+    for i, (sens, dist, _, _) in enumerate(problems):
+        sf, df = slider_to_sens(sens), slider_to_dist(dist)
+        color = PROBLEM_COLORS[i % len(PROBLEM_COLORS)]
+        scene.append(_overlay(ax, likelihood_highlight_path(sf, df), color))
+        scene.append(("cross", ax.x(sf), ax.y(df), 8, color, 3))
+    scene += _x_ticks(ax, SENSITIVITY_LABELS, 12)
+    scene += _y_ticks(ax, list(enumerate(DISTRIBUTION_LABELS)), 12)
+    scene += _titles(ax, width, height, "Sensitivity to Triggers", "Spatial Distribution")
+    return scene
+
+
+def danger_scene(problems, grid_code=DEFAULT_GRID_CODE, width=450, height=420):
+    """Primitives for the danger matrix with each problem's box and the cells setting its max."""
+    grid = decode_grid(grid_code)
+    n_y, n_x = grid.shape
+    ax = Axes(width, height, (95, 10, 10, 50), n_x, n_y)
+    scene = [("rect", 0, 0, width, height, PAPER)]
+    for r in range(n_y):
+        for c in range(n_x):
+            scene.append(("rect", ax.x(c - 0.5), ax.y(r + 0.5), ax.sx, ax.sy, LEVEL_COLORS[grid[r, c]]))
+    if len(problems):
+        result = assess(*zip(*problems), grid_code)
+        index = box_index(grid_code)
+        for i, (p, lo, hi) in enumerate(zip(problems, result.lik_lo, result.lik_hi)):
+            color = PROBLEM_COLORS[i % len(PROBLEM_COLORS)]
+            lik, size = (int(lo), int(hi)), (p[2], p[3])
+            scene.append(_overlay(ax, danger_highlight_path(lik, size), color))
+            scene += [("circle", ax.x(c), ax.y(r), 7, color, 2) for r, c in index.argmax_cells(lik, size)]
+    scene += _x_ticks(ax, SIZE_LABELS, 11)
+    scene += _y_ticks(ax, list(zip(range(0, n_y, LIKELIHOOD_STEPS), LIKELIHOOD_ANCHORS)), 10)
+    scene += _titles(ax, width, height, "Destructive Size", "Likelihood")
+    return scene
+
+
+SCENES = {"likelihood": likelihood_scene, "danger": danger_scene}
+SIZES  = {"likelihood": (505, 360), "danger": (450, 420)}
+
+
+# ─── SVG ──────────────────────────────────────────────────────────────────────
+
+def _num(v):
+    return f"{v:.2f}".rstrip("0").rstrip(".")
+
+
+def to_svg(scene, width, height):
+    """SVG document for a scene."""
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+           f'viewBox="0 0 {width} {height}" font-family="{FONT_FAMILY}">']
+    for prim in scene:
+        kind = prim[0]
+        if kind == "rect":
+            _, x, y, w, h, fill = prim
+            out.append(f'<rect x="{_num(x)}" y="{_num(y)}" width="{_num(w)}" height="{_num(h)}" fill="{fill}"/>')
+        elif kind == "path":
+            _, segments, stroke, width_, fill, opacity = prim
+            d = " ".join(cmd + " " + " ".join(f"{_num(x)},{_num(y)}" for x, y in pts) for cmd, pts in segments)
+            out.append(f'<path d="{d}" fill="{fill}" fill-opacity="{opacity}" stroke="{stroke}" '
+                       f'stroke-width="{width_}"/>')
+        elif kind == "circle":
+            _, cx, cy, r, stroke, width_ = prim
+            out.append(f'<circle cx="{_num(cx)}" cy="{_num(cy)}" r="{r}" fill="none" stroke="{stroke}" '
+                       f'stroke-width="{width_}"/>')
+        elif kind == "cross":
+            _, cx, cy, r, stroke, width_ = prim
+            out.append(f'<path d="M {_num(cx - r)},{_num(cy)} H {_num(cx + r)} M {_num(cx)},{_num(cy - r)} '
+                       f'V {_num(cy + r)}" stroke="{stroke}" stroke-width="{width_}"/>')
+        elif kind == "text":
+            _, x, y, text, size, color, anchor, rotate = prim
+            rot = f' transform="rotate({rotate} {_num(x)} {_num(y)})"' if rotate else ""
+            out.append(f'<text x="{_num(x)}" y="{_num(y)}" font-size="{size}" fill="{color}" '
+                       f'text-anchor="{anchor}" dominant-baseline="central"{rot}>{escape(text)}</text>')
+    out.append("</svg>")
+    return "\n".join(out)
+
+
+# ─── PNG ──────────────────────────────────────────────────────────────────────
+
+def _flatten(segments, steps=8):
+    """Polyline points for M/L/Q/Z path segments (quadratic curves subdivided)."""
+    points = []
+    for cmd, pts in segments:
+        if cmd in "ML":
+            points.extend(pts)
+        elif cmd == "Q":
+            (cx, cy), (x1, y1) = pts
+            x0, y0 = points[-1]
+            for i in range(1, steps + 1):
+                t = i / steps
+                points.append(((1 - t) ** 2 * x0 + 2 * (1 - t) * t * cx + t * t * x1,
+                               (1 - t) ** 2 * y0 + 2 * (1 - t) * t * cy + t * t * y1))
+    return points
+
+
+_FONTS = {}
+
+
+def _font(size):
+    from PIL import ImageFont
+    if size not in _FONTS:
+        for name in PNG_FONTS:
+            try:
+                _FONTS[size] = ImageFont.truetype(name, size)
+                break
+            except OSError:
+                continue
+        else:
+            _FONTS[size] = ImageFont.load_default(size)
+    return _FONTS[size]
+
+
+def to_png(scene, width, height, scale=2, supersample=2):
+    """PNG bytes for a scene, scale × the SVG's pixel size. Needs Pillow."""
+    from PIL import Image, ImageDraw     # optional: only PNG output needs it
+
+    k = scale * supersample
+    image = Image.new("RGBA", (round(width * scale) * supersample, round(height * scale) * supersample))
+    draw = ImageDraw.Draw(image)
+    for prim in scene:
+        kind = prim[0]
+        if kind == "rect":
+            _, x, y, w, h, fill = prim
+            draw.rectangle([x * k, y * k, (x + w) * k, (y + h) * k], fill=fill)
+        elif kind == "path":
+            _, segments, stroke, width_, fill, opacity = prim
+            points = [(x * k, y * k) for x, y in _flatten(segments)]
+            layer = Image.new("RGBA", image.size)
+            ImageDraw.Draw(layer).polygon(points, fill=(*_hex_to_rgb(fill), round(255 * opacity)))
+            image.alpha_composite(layer)
+            draw.line(points + points[:1], fill=stroke, width=round(width_ * k), joint="curve")
+        elif kind == "circle":
+            _, cx, cy, r, stroke, width_ = prim
+            draw.ellipse([(cx - r) * k, (cy - r) * k, (cx + r) * k, (cy + r) * k],
+                         outline=stroke, width=round(width_ * k))
+        elif kind == "cross":
+            _, cx, cy, r, stroke, width_ = prim
+            draw.line([(cx - r) * k, cy * k, (cx + r) * k, cy * k], fill=stroke, width=round(width_ * k))
+            draw.line([cx * k, (cy - r) * k, cx * k, (cy + r) * k], fill=stroke, width=round(width_ * k))
+        elif kind == "text":
+            _, x, y, text, size, color, anchor, rotate = prim
+            font = _font(round(size * k))
+            pil_anchor = {"start": "lm", "middle": "mm", "end": "rm"}[anchor]
+            if rotate:
+                box = draw.textbbox((0, 0), text, font=font, anchor="mm")
+                label = Image.new("RGBA", (box[2] - box[0] + 4, box[3] - box[1] + 4))
+                ImageDraw.Draw(label).text((label.width / 2, label.height / 2), text, font=font,
+                                           fill=color, anchor="mm")
+                label = label.rotate(-rotate, expand=True)
+                image.alpha_composite(label, (round(x * k - label.width / 2), round(y * k - label.height / 2)))
+            else:
+                draw.text((x * k, y * k), text, font=font, fill=color, anchor=pil_anchor)
+    if supersample > 1:
+        image = image.reduce(supersample)       # box filter: plain averaging is enough for antialiasing
+    buf = io.BytesIO()
+    image.convert("RGB").save(buf, "PNG", compress_level=6)
+    return buf.getvalue()
+
+
+# ─── Cached rendering ─────────────────────────────────────────────────────────
+
+def render(kind, problems, grid_code=DEFAULT_GRID_CODE, fmt="svg", scale=2):
+    """
+    "likelihood" or "danger" graphic for a forecast's problems as SVG (utf-8) or
+    PNG bytes. Cached by state: the likelihood matrix doesn't depend on the grid.
+    """
+    problems = tuple(tuple(int(v) for v in p) for p in problems)
+    if kind not in SCENES:
+        raise ValueError(f"unknown graphic {kind!r}")
+    if fmt not in ("svg", "png"):
+        raise ValueError(f"unknown format {fmt!r}")
+    if len(problems) > MAX_PROBLEMS:
+        raise ValueError(f"at most {MAX_PROBLEMS} problems")
+    grid_key = grid_fingerprint(grid_code) if kind == "danger" else None
+    key = (kind, problems, grid_key, fmt, scale if fmt == "png" else None)
+
+    def build():
+        width, height = SIZES[kind]
+        args = (problems, grid_code) if kind == "danger" else (problems,)
+        scene = SCENES[kind](*args, width=width, height=height)
+        if fmt == "png":
+            return to_png(scene, width, height, scale)
+        return to_svg(scene, width, height).encode("utf-8")
+
+    return RENDER_CACHE.get_or_build(key, build)
+
+
+# ─── Batch mode ───────────────────────────────────────────────────────────────
+
+def zones_from_csv(path):
+    """{zone: (problems, None)} from a CSV with one row per problem."""
+    zones = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            problem = (parse_level(row["sensitivity"], SENSITIVITY_LOOKUP),
+                       parse_level(row["distribution"], DISTRIBUTION_LOOKUP),
+                       parse_size(row["size_lo"]), parse_size(row["size_hi"]))
+            if not 0 <= problem[0] < len(SENSITIVITY_SLIDER_LABELS):
+                raise ValueError(f"line {reader.line_num}: sensitivity out of range")
+            if not 0 <= problem[1] < len(DISTRIBUTION_SLIDER_LABELS):
+                raise ValueError(f"line {reader.line_num}: distribution out of range")
+            if problem[2] > problem[3]:
+                raise ValueError(f"line {reader.line_num}: size_lo must not exceed size_hi")
+            problems, _ = zones.setdefault(row["zone"].strip(), ([], None))
+            problems.append(problem)
+    return zones
+
+
+def zones_from_history(day, db_path=None):
+    """{zone: (problems, grid code)} for every zone with a forecast issued on day."""
+    from CMAH_history import HistoryStore, DEFAULT_DB_PATH
+    store = HistoryStore(db_path or os.environ.get("CMAH_HISTORY_DB", DEFAULT_DB_PATH))
+    zones = {}
+    for zone, *_ in store.zones():
+        rows = store.forecast(zone, day)
+        if rows:
+            zones[zone] = ([tuple(r[:4]) for r in rows], rows[0][7])
+    return zones
+
+
+def _render_task(task):
+    kind, problems, grid_code, fmt, scale = task
+    return render(kind, problems, grid_code, fmt, scale)
+
+
+def slug(zone):
+    return re.sub(r"[^A-Za-z0-9]+", "-", zone).strip("-").lower() or "zone"
+
+
+def render_zones(zones, out_dir, formats=("svg",), grid_code=DEFAULT_GRID_CODE, workers=None, scale=2):
+    """
+    Write <zone>-likelihood.<fmt> and <zone>-danger.<fmt> for every zone. zones
+    maps zone → (problems, grid code or None for grid_code). Each distinct
+    graphic is rendered once, on a process pool when workers > 1. Returns
+    (files written, graphics rendered).
+    """
+    jobs, tasks = [], {}
+    for zone, (problems, zone_grid) in zones.items():
+        zone_grid = zone_grid or grid_code
+        for kind in SCENES:
+            for fmt in formats:
+                task = (kind, tuple(problems), zone_grid if kind == "danger" else DEFAULT_GRID_CODE, fmt, scale)
+                tasks.setdefault(task, None)
+                jobs.append((os.path.join(out_dir, f"{slug(zone)}-{kind}.{fmt}"), task))
+
+    unique = list(tasks)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(unique) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_task, unique, chunksize=max(1, len(unique) // (workers * 4))))
+    else:
+        results = [_render_task(task) for task in unique]
+    tasks.update(zip(unique, results))
+
+    os.makedirs(out_dir, exist_ok=True)
+    for path, task in jobs:
+        with open(path, "wb") as f:
+            f.write(tasks[task])
+    return len(jobs), len(unique)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render bulletin graphics (SVG/PNG) for every zone.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("input", nargs="?",
+                        help="CSV with zone, sensitivity, distribution, size_lo, size_hi (one row per problem)")
+    source.add_argument("--history", metavar="DATE", help="render the forecasts issued on DATE (YYYY-MM-DD)")
+    parser.add_argument("--history-db", help="history database (default: CMAH_HISTORY_DB or cmah_history.sqlite3)")
+    parser.add_argument("-o", "--output", default="bulletins", help="output directory")
+    parser.add_argument("--format", default="svg", help="comma-separated: svg, png (png needs Pillow)")
+    parser.add_argument("--scale", type=float, default=2, help="PNG pixels per SVG pixel")
+    parser.add_argument("--workers", type=int, help="render processes (default: CPU count)")
+    parser.add_argument("--grid", help="danger grid code for CSV input")
+    parser.add_argument("--grid-file", help="JSON file with a grid code or nested list of level names")
+    args = parser.parse_args(argv)
+
+    formats = tuple(f.strip() for f in args.format.split(","))
+    if not set(formats) <= {"svg", "png"}:
+        parser.error("--format takes svg and/or png")
+    try:
+        grid_code = load_grid(args.grid_file) if args.grid_file else (args.grid or DEFAULT_GRID_CODE)
+    except (OSError, KeyError, ValueError) as e:
+        parser.error(f"can't read --grid-file {args.grid_file}: {e}")
+    if not is_grid_code(grid_code):
+        parser.error(f"grid must be {GRID_CODE_FORMAT}")
+
+    try:
+        zones = zones_from_history(args.history, args.history_db) if args.history else zones_from_csv(args.input)
+    except (OSError, KeyError, ValueError) as e:
+        parser.error(f"bad input: {e}")
+    if not zones:
+        parser.error("no forecasts to render")
+    too_many = [zone for zone, (problems, _) in zones.items() if len(problems) > MAX_PROBLEMS]
+    if too_many:
+        parser.error(f"more than {MAX_PROBLEMS} problems for {', '.join(too_many)}")
+    by_slug = {}
+    for zone in zones:
+        by_slug.setdefault(slug(zone), []).append(zone)
+    clashes = [f"{' and '.join(map(repr, names))} → {name}-*" for name, names in by_slug.items() if len(names) > 1]
+    if clashes:
+        parser.error(f"zones would overwrite each other's files: {'; '.join(clashes)}")
+
+    t0 = time.perf_counter()
+    files, rendered = render_zones(zones, args.output, formats, grid_code, args.workers, args.scale)
+    print(f"{len(zones)} zones: wrote {files} files ({rendered} distinct graphics) to {args.output} "
+          f"in {time.perf_counter() - t0:.2f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
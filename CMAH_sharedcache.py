@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Rendered-figure cache shared by every gunicorn worker on the host.
+
+Each worker keeps a small in-process LRU (L1) in front of a SQLite table (L2)
+that all workers read and write. A figure built by one worker is a cheap
+lookup for the others, and the per-worker LRUs can stay small, so adding
+workers adds neither cold-cache misses nor a full copy of the cache each.
+SQLite runs in WAL mode, so readers don't block the writer; the OS page
+cache holds the hot part of the file once for all processes.
+
+Enabled by setting CMAH_SHARED_CACHE to a file path (gunicorn.conf.py does
+this automatically when it starts more than one worker). Entries are tagged
+with a build fingerprint; entries from older code are dropped on start.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from CMAH_engine import LRUCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_cache (
+    key        TEXT PRIMARY KEY,
+    version    TEXT NOT NULL,
+    value      BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS shared_cache_created ON shared_cache (created_at);
+"""
+
+TRIM_EVERY = 256    # check the row count after this many inserts per process
+
+
+class SharedCache:
+    """Byte values in one SQLite table, readable and writable from any process."""
+
+    def __init__(self, path, version, maxrows=20000):
+        self.path, self.version, self.maxrows = path, version, maxrows
+        self._local = threading.local()
+        self._lock  = threading.Lock()
+        self.hits = self.misses = self.writes = 0
+        conn = self._conn()
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.execute("DELETE FROM shared_cache WHERE version != ?", (version,))
+
+    def _conn(self):
+        """This thread's connection; reopened after a fork (gunicorn --preload) since
+        SQLite connections must not be shared between processes."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")     # a lost write is just a cache miss
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute("SELECT value FROM shared_cache WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def put(self, key, value):
+        conn = self._conn()
+        try:
+            conn.execute("INSERT OR REPLACE INTO shared_cache (key, version, value, created_at) VALUES (?, ?, ?, ?)",
+                         (key, self.version, value, time.time()))
+        except sqlite3.OperationalError:
+            return      # locked for longer than the timeout: skip, the value is still served from L1
+        with self._lock:
+            self.writes += 1
+            trim = self.writes % TRIM_EVERY == 0
+        if trim:
+            self.trim()
+
+    def trim(self):
+        """Drop the oldest entries beyond maxrows."""
+        conn = self._conn()
+        (count,) = conn.execute("SELECT COUNT(*) FROM shared_cache").fetchone()
+        if count > self.maxrows:
+            conn.execute("DELETE FROM shared_cache WHERE key IN "
+                         "(SELECT key FROM shared_cache ORDER BY created_at LIMIT ?)", (count - self.maxrows,))
+
+    def stats(self):
+        (count,) = self._conn().execute("SELECT COUNT(*) FROM shared_cache").fetchone()
+        with self._lock:
+            return {"size": count, "maxsize": self.maxrows, "hits": self.hits, "misses": self.misses,
+                    "evictions": 0}
+
+
+class TieredCache(LRUCache):
+    """
+    LRUCache whose misses are looked up in a SharedCache before being built, and
+    whose newly built values are written to it. Without a SharedCache it is a
+    plain LRUCache. Values go through dumps/loads (bytes) on the way to and from L2.
+    """
+
+    def __init__(self, namespace, maxsize, shared=None, dumps=None, loads=None):
+        super().__init__(maxsize)
+        self.namespace, self.shared = namespace, shared
+        self.dumps, self.loads = dumps, loads
+
+    def get_or_build(self, key, build):
+        if self.shared is None:
+            return super().get_or_build(key, build)
+        return super().get_or_build(key, lambda: self._shared_or_build(key, build))
+
+    def _shared_or_build(self, key, build):
+        shared_key = f"{self.namespace}:{key!r}"
+        blob = self.shared.get(shared_key)
+        if blob is not None:
+            return self.loads(blob)
+        value = build()
+        self.shared.put(shared_key, self.dumps(value))
+        return value
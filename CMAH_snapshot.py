@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk snapshot of values that are expensive to build at startup (the default
+figures, the frozen layout and callback-list responses, the first forecast),
+used in fast-start mode (CMAH_FAST_START=1) so a restarted worker loads them
+instead of rebuilding them.
+
+The file name is a fingerprint of everything the values depend on: the app's
+own source files, the static assets, the installed dash/plotly/dbc/numpy
+versions and the CMAH_* environment. Any change makes a new snapshot, so a
+stale one is never used. Snapshots are pickles written by the app itself into
+its own directory, so only point CMAH_SNAPSHOT_DIR at a location you trust.
+
+    python CMAH_snapshot.py          # build the snapshot ahead of time (e.g. in a deploy build step)
+"""
+import glob
+import hashlib
+import os
+import pickle
+import platform
+import sys
+import tempfile
+from importlib import metadata
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SNAPSHOT_DIR = os.path.join(HERE, ".cmah_snapshot")
+
+PACKAGES = ("dash", "plotly", "dash-bootstrap-components", "numpy", "flask", "brotli")
+
+
+def fingerprint(extra=()):
+    """Hash of the app sources, package versions, CMAH_* env vars and any extra strings."""
+    h = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(HERE, "CMAH_*.py"))):
+        with open(path, "rb") as f:
+            h.update(os.path.basename(path).encode() + b"\0" + f.read())
+    for package in PACKAGES:
+        try:
+            h.update(f"{package}={metadata.version(package)}".encode())
+        except metadata.PackageNotFoundError:
+            pass
+    h.update(platform.python_version().encode())
+    for key in sorted(os.environ):
+        if key.startswith("CMAH_"):
+            h.update(f"{key}={os.environ[key]}".encode())
+    for item in extra:
+        h.update(str(item).encode())
+    return h.hexdigest()[:16]
+
+
+class Snapshot:
+    """A dict loaded from <directory>/<fingerprint>.pickle, written back by save() if it changed."""
+
+    def __init__(self, directory=DEFAULT_SNAPSHOT_DIR, extra=()):
+        self.path = os.path.join(directory, fingerprint(extra) + ".pickle")
+        self.data = {}
+        self.loaded = self.dirty = False
+        try:
+            with open(self.path, "rb") as f:
+                self.data = pickle.load(f)
+            self.loaded = True
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            pass    # missing or unreadable: start empty and rebuild
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.dirty = True
+
+    def get_or_build(self, key, build):
+        if key not in self.data:
+            self.put(key, build())
+        return self.data[key]
+
+    def save(self):
+        """Write the snapshot (atomically) if anything was added, and drop older snapshots."""
+        if not self.dirty:
+            return False
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(self.data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+        except OSError:
+            return False    # read-only filesystem etc. — fast start still works, just without reuse
+        for old in glob.glob(os.path.join(directory, "*.pickle")):
+            if old != self.path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+        self.dirty = False
+        return True
+
+
+if __name__ == "__main__":
+    os.environ["CMAH_FAST_START"] = "1"
+    sys.path.insert(0, HERE)
+    import CMAH_dash
+    snapshot = CMAH_dash.SNAPSHOT
+    print(f"{snapshot.path}  {os.path.getsize(snapshot.path)} bytes  "
+          f"({'reused' if snapshot.loaded else 'built'}: {', '.join(map(str, snapshot.data))})", file=sys.stderr)
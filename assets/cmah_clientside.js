@@ -0,0 +1,194 @@
+/*
+ * In-browser evaluation of the forecast tab (CMAH_CLIENTSIDE=1).
+ *
+ * Mirrors update_all in CMAH_dash.py: looks up the likelihood range from
+ * LIKELIHOOD_MATRIX, finds the max danger in each problem's likelihood × size
+ * box and moves the highlight shapes / crosshair on the figures already in the
+ * page, with one overlay per avalanche problem on the danger matrix.
+ * Constants come from the "forecast-constants" store so Python stays the
+ * single source of truth for labels, colours and the matrix.
+ */
+window.dash_clientside = window.dash_clientside || {};
+
+(function () {
+    function roundedRectPath(x0, y0, x1, y1, r) {
+        r = Math.min(r, Math.abs(x1 - x0) / 2.0, Math.abs(y1 - y0) / 2.0);
+        return (
+            "M " + (x0 + r) + "," + y0 + " " +
+            "L " + (x1 - r) + "," + y0 + " " +
+            "Q " + x1 + "," + y0 + " " + x1 + "," + (y0 + r) + " " +
+            "L " + x1 + "," + (y1 - r) + " " +
+            "Q " + x1 + "," + y1 + " " + (x1 - r) + "," + y1 + " " +
+            "L " + (x0 + r) + "," + y1 + " " +
+            "Q " + x0 + "," + y1 + " " + x0 + "," + (y1 - r) + " " +
+            "L " + x0 + "," + (y0 + r) + " " +
+            "Q " + x0 + "," + y0 + " " + (x0 + r) + "," + y0 + " Z"
+        );
+    }
+
+    function clamp(v, lo, hi) {
+        return Math.max(lo, Math.min(v, hi));
+    }
+
+    function el(type, props) {
+        return {type: type, namespace: "dash_html_components", props: props};
+    }
+
+    function summaryRow(label, value) {
+        return el("Div", {
+            style: {marginBottom: "6px"},
+            children: [
+                el("Span", {children: label, style: {
+                    color: "#666", fontSize: "12px", fontFamily: "Barlow Condensed",
+                    width: "110px", display: "inline-block"}}),
+                el("Span", {children: value, style: {
+                    color: "#ccc", fontSize: "12px", fontFamily: "Barlow Condensed"}}),
+            ],
+        });
+    }
+
+    function rng(labels, lo, hi) {
+        return lo === hi ? labels[lo] : labels[lo] + " → " + labels[hi];
+    }
+
+    function withShapePath(fig, path) {
+        var shapes = fig.layout.shapes.slice();
+        shapes[0] = Object.assign({}, shapes[0], {path: path});
+        return Object.assign({}, fig, {layout: Object.assign({}, fig.layout, {shapes: shapes})});
+    }
+
+    function likelihoodRange(sensVal, distVal, C) {
+        var sf = sensVal / C.sensitivity_steps, df = distVal / C.distribution_steps;
+        var nS = C.sensitivity_labels.length, nD = C.distribution_labels.length;
+        var sLo = clamp(Math.floor(sf), 0, nS - 1), sHi = clamp(Math.ceil(sf), 0, nS - 1);
+        var dLo = clamp(Math.floor(df), 0, nD - 1), dHi = clamp(Math.ceil(df), 0, nD - 1);
+        var l0 = Infinity, l1 = -Infinity;
+        for (var r = dLo; r <= dHi; r++) {
+            for (var c = sLo; c <= sHi; c++) {
+                l0 = Math.min(l0, C.likelihood_matrix[r][c]);
+                l1 = Math.max(l1, C.likelihood_matrix[r][c]);
+            }
+        }
+        return [l0, l1];
+    }
+
+    // One problem's box on the danger grid: its max level and the cells carrying it.
+    // grid is the digit-string encoding from danger-grid-store (row-major)
+    function assessBox(grid, l0, l1, sz0, sz1, C) {
+        var nSize = C.size_labels.length, best = 0, xs = [], ys = [], names = [];
+        for (var lr = l0; lr <= l1; lr++) {
+            for (var sc = sz0; sc <= sz1; sc++) {
+                best = Math.max(best, grid.charCodeAt(lr * nSize + sc) - 48);
+            }
+        }
+        for (lr = l0; lr <= l1; lr++) {
+            for (sc = sz0; sc <= sz1; sc++) {
+                if (grid.charCodeAt(lr * nSize + sc) - 48 === best) {
+                    xs.push(sc);
+                    ys.push(lr);
+                    names.push(C.likelihood_labels[lr] + " × size " + C.size_labels[sc]);
+                }
+            }
+        }
+        var text = names.slice(0, 3).join(", ");
+        if (names.length > 3) { text += ", +" + (names.length - 3) + " more"; }
+        return {level: best, xs: xs, ys: ys, text: text};
+    }
+
+    function badge(level, size, C) {
+        return el("Span", {children: level.toUpperCase(), style: {
+            backgroundColor: C.danger_colors[level], color: C.danger_text[level],
+            padding: "2px 10px", fontFamily: "Barlow Condensed",
+            fontWeight: "700", fontSize: size, borderRadius: "3px"}});
+    }
+
+    window.dash_clientside.cmah = Object.assign(window.dash_clientside.cmah || {}, {
+        update_forecast: function (sensVal, distVal, sizeRange, grid, store, likFig, dangerFig, C) {
+            if (sensVal === null || sensVal === undefined) { sensVal = C.default_problem[0]; }
+            if (distVal === null || distVal === undefined) { distVal = C.default_problem[1]; }
+            if (!sizeRange) { sizeRange = C.default_problem.slice(2); }
+            if (!grid) { grid = C.default_grid; }
+
+            // Same as current_problems(): the selected problem comes from the sliders
+            var active = store ? store.active : 0;
+            var problems = store ? store.problems.slice() : [null];
+            problems[active] = [sensVal, distVal, sizeRange[0], sizeRange[1]];
+
+            var sf = sensVal / C.sensitivity_steps, df = distVal / C.distribution_steps;
+            var sz0 = sizeRange[0], sz1 = sizeRange[1];
+            var lik = likelihoodRange(sensVal, distVal, C), l0 = lik[0], l1 = lik[1];
+
+            // Every problem becomes one shape + one driver trace on the shared heatmap
+            var shapes = [], traces = [], results = [], overall = 0;
+            problems.forEach(function (p, i) {
+                var range = likelihoodRange(p[0], p[1], C);
+                var box = assessBox(grid, range[0], range[1], p[2], p[3], C);
+                var style = C.overlay_styles[i][i === active ? 1 : 0];
+                var padS = p[2] !== p[3] ? 0.49 : 0.42;
+                var padL = range[0] !== range[1] ? 0.49 : 0.42;
+                shapes.push(Object.assign({}, style[0], {path: roundedRectPath(
+                    p[2] - padS, range[0] - padL, p[3] + padS, range[1] + padL, 0.2)}));
+                traces.push(Object.assign({}, style[1], {x: box.xs, y: box.ys}));
+                results.push(box);
+                overall = Math.max(overall, box.level);
+            });
+
+            // Likelihood matrix: move the highlight box and the crosshair
+            var likOut = withShapePath(likFig, roundedRectPath(
+                Math.floor(sf) - 0.45, Math.floor(df) - 0.45,
+                Math.ceil(sf) + 0.45, Math.ceil(df) + 0.45, 0.15));
+            likOut.data = likFig.data.slice();
+            likOut.data[1] = Object.assign({}, likFig.data[1], {x: [sf], y: [df]});
+
+            // Danger matrix: recolour from the grid store and swap in the overlays
+            var nSize = C.size_labels.length;
+            var z = [], text = [];
+            for (var gr = 0; gr < C.likelihood_labels.length; gr++) {
+                var zRow = [], tRow = [];
+                for (var gc = 0; gc < nSize; gc++) {
+                    var idx = grid.charCodeAt(gr * nSize + gc) - 48;
+                    zRow.push(idx);
+                    tRow.push(C.danger_levels[idx]);
+                }
+                z.push(zRow);
+                text.push(tRow);
+            }
+            var danger = Object.assign({}, dangerFig, {
+                data: [Object.assign({}, dangerFig.data[0], {z: z, text: text})].concat(traces),
+                layout: Object.assign({}, dangerFig.layout, {shapes: shapes}),
+            });
+
+            var children = [
+                summaryRow("Sensitivity:", C.sensitivity_slider_labels[sensVal]),
+                summaryRow("Distribution:", C.distribution_slider_labels[distVal]),
+                summaryRow("Likelihood:", rng(C.likelihood_labels, l0, l1)),
+                summaryRow("Size:", rng(C.size_labels, sz0, sz1)),
+                el("Hr", {style: {borderColor: "#1e3a4a", margin: "10px 0"}}),
+            ];
+            var setBy = results[0].text;
+            if (problems.length > 1) {
+                var setters = [];
+                results.forEach(function (box, i) {
+                    var row = summaryRow("Problem " + (i + 1) + ":", badge(C.danger_levels[box.level], "11px", C));
+                    row.props.children[0].props.style.color = C.overlay_styles[i][1][0].line.color;
+                    children.push(row);
+                    if (box.level === overall) { setters.push("Problem " + (i + 1) + ": " + box.text); }
+                });
+                setBy = setters.join("; ");
+            }
+            var maxDanger = C.danger_levels[overall];
+            children.push(
+                el("Div", {children: [
+                    el("Span", {children: "MAX DANGER: ", style: {
+                        color: "#888", fontSize: "12px", fontFamily: "Barlow Condensed",
+                        fontWeight: "700", marginRight: "8px"}}),
+                    badge(maxDanger, "14px", C),
+                ]}),
+                el("Div", {children: "Set by: " + setBy, style: {
+                    color: "#666", fontSize: "11px", fontFamily: "Barlow Condensed", marginTop: "8px"}})
+            );
+
+            return [likOut, danger, el("Div", {children: children})];
+        },
+    });
+})();
@@ -0,0 +1,110 @@
+/*
+ * Shared grid editing (CMAH_COLLAB=1, see CMAH_collab.py).
+ *
+ * Joining a session opens an EventSource on /collab/<session>/events. The
+ * server first sends a "grid" event with the session's whole grid code. After
+ * that it sends one "cells" event of [row, col, level] triples per edit. Events
+ * are queued here, and collab_apply drains the queue into danger-grid-store
+ * and a partial update of the grid editor that repaints only the changed
+ * cells. While joined, edit_grid doesn't change this browser's grid itself. It
+ * publishes the edit, which comes back on the stream like everyone else's, so
+ * every browser applies the same edits in the same order.
+ *
+ * Reconnects are done here rather than by EventSource so the URL carries the
+ * latest grid (to seed the session again after a server restart) and the last
+ * event id (to receive only the missed edits).
+ */
+window.dash_clientside = window.dash_clientside || {};
+
+(function () {
+    var live = null;        // {name, grid, lastId, source, timer}
+    var queue = [];         // {grid: code} or {cells: [[row, col, level], ...]}
+    var tick = 0;
+
+    function setStatus(text) {
+        window.dash_clientside.set_props("collab-status", {children: text});
+    }
+
+    function receive(e, item) {
+        live.lastId = e.lastEventId || live.lastId;
+        queue.push(item);
+        tick += 1;
+        window.dash_clientside.set_props("collab-event", {data: tick});
+    }
+
+    function connect() {
+        var url = "/collab/" + encodeURIComponent(live.name) + "/events?grid=" + live.grid
+            + (live.lastId ? "&last=" + live.lastId : "");
+        var source = new EventSource(url);
+        live.source = source;
+        source.onopen = function () { setStatus("Live: edits are shared with everyone in this session"); };
+        source.addEventListener("grid", function (e) { receive(e, {grid: JSON.parse(e.data).grid}); });
+        source.addEventListener("cells", function (e) { receive(e, {cells: JSON.parse(e.data)}); });
+        source.onerror = function () {
+            source.close();
+            if (live && live.source === source) {
+                setStatus("Connection lost, reconnecting…");
+                live.timer = setTimeout(connect, 3000);
+            }
+        };
+    }
+
+    function leave() {
+        clearTimeout(live.timer);
+        live.source.close();
+        live = null;
+        queue = [];
+    }
+
+    window.dash_clientside.cmah = Object.assign(window.dash_clientside.cmah || {}, {
+        collab_join: function (nClicks, name, grid) {
+            var noUpdate = window.dash_clientside.no_update;
+            if (live) {
+                leave();
+                return [null, "Join", "", false];
+            }
+            name = (name || "").trim();
+            if (!/^[\w .-]{1,40}$/.test(name)) {
+                return [noUpdate, noUpdate, "Session names are letters, digits, spaces, . - _", noUpdate];
+            }
+            live = {name: name, grid: grid, lastId: null, source: null, timer: 0};
+            connect();
+            return [name, "Leave", "Connecting…", true];
+        },
+
+        collab_apply: function (eventTick, grid) {
+            var noUpdate = window.dash_clientside.no_update;
+            if (!queue.length || !grid) {
+                return [noUpdate, noUpdate];
+            }
+            var box = document.querySelector("[data-collab-levels]");
+            var cols = +box.dataset.collabCols, levels = JSON.parse(box.dataset.collabLevels);
+            var cells = grid.split(""), changed = {};
+            queue.forEach(function (item) {
+                if (item.grid) {
+                    for (var i = 0; i < cells.length; i++) {
+                        if (cells[i] !== item.grid[i]) { cells[i] = item.grid[i]; changed[i] = true; }
+                    }
+                } else {
+                    item.cells.forEach(function (cell) {
+                        var i = cell[0] * cols + cell[1], ch = String(cell[2]);
+                        if (cells[i] !== ch) { cells[i] = ch; changed[i] = true; }
+                    });
+                }
+            });
+            queue = [];
+            var patch = new window.dash_clientside.Patch(), any = false;
+            Object.keys(changed).forEach(function (key) {
+                var i = +key, row = Math.floor(i / cols), col = i % cols, level = +cells[i];
+                if (grid[i] === cells[i]) { return; }     // changed and changed back
+                patch.assign(["data", 0, "z", row, col], level);
+                patch.assign(["data", 0, "text", row, col], levels[level][1]);
+                patch.assign(["data", 0, "customdata", row, col], levels[level][0]);
+                any = true;
+            });
+            var code = cells.join("");
+            if (live) { live.grid = code; }
+            return any ? [code, patch.build()] : [noUpdate, noUpdate];
+        },
+    });
+})();
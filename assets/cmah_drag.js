@@ -0,0 +1,92 @@
+/*
+ * Click-and-drag on the likelihood matrix moves the sensitivity/distribution point.
+ *
+ * Pointer moves are coalesced to one per animation frame and snapped to the
+ * sliders' steps here in the browser; the "likelihood-pointer" store is only
+ * written when the snapped position actually changes. A whole drag across the
+ * matrix therefore sends at most one callback per step crossed (7 × 5
+ * positions on the default half-step scales) instead of one per mousemove event.
+ * Steps and slider maxima come from the data-* attributes on the graph's wrapper.
+ *
+ * pointer_to_sliders is the clientside twin of pointer_to_sliders in
+ * CMAH_dash.py, used when CMAH_CLIENTSIDE=1.
+ */
+window.dash_clientside = window.dash_clientside || {};
+
+(function () {
+    // {sens: [steps per cell, max index], dist: [...]} from the layout
+    function scales() {
+        var box = document.querySelector("[data-sens-steps]");
+        var d = box ? box.dataset : {sensSteps: 2, sensMax: 6, distSteps: 2, distMax: 4};
+        return {sens: [+d.sensSteps, +d.sensMax], dist: [+d.distSteps, +d.distMax]};
+    }
+
+    function snap(val, scale) {
+        return Math.max(0, Math.min(Math.round(val * scale[0]), scale[1]));
+    }
+
+    window.dash_clientside.cmah = Object.assign(window.dash_clientside.cmah || {}, {
+        pointer_to_sliders: function (pointer, sensVal, distVal) {
+            var noUpdate = window.dash_clientside.no_update;
+            if (!pointer || typeof pointer.x !== "number" || typeof pointer.y !== "number") {
+                return [noUpdate, noUpdate];
+            }
+            var S = scales();
+            var sens = snap(pointer.x, S.sens);
+            var dist = snap(pointer.y, S.dist);
+            return [sens === sensVal ? noUpdate : sens, dist === distVal ? noUpdate : dist];
+        },
+    });
+
+    var dragging = false, pending = null, frame = 0, lastKey = null;
+
+    function plotOf(target) {
+        var graph = target.closest && target.closest("#likelihood-matrix");
+        return graph ? graph.querySelector(".js-plotly-plot") : null;
+    }
+
+    function toData(gd, clientX, clientY) {
+        var layout = gd._fullLayout, xa = layout && layout.xaxis, ya = layout && layout.yaxis;
+        if (!xa || !ya) { return null; }
+        // The graph may be CSS-scaled on small screens; map back to layout pixels
+        var rect = gd.getBoundingClientRect();
+        var px = (clientX - rect.left) * layout.width / rect.width;
+        var py = (clientY - rect.top) * layout.height / rect.height;
+        return {x: xa.p2d(px - xa._offset), y: ya.p2d(py - ya._offset)};
+    }
+
+    function flush() {
+        frame = 0;
+        var p = pending;
+        pending = null;
+        if (!p) { return; }
+        var point = toData(p.gd, p.clientX, p.clientY);
+        if (!point || !isFinite(point.x) || !isFinite(point.y)) { return; }
+        var S = scales();
+        var sens = snap(point.x, S.sens), dist = snap(point.y, S.dist);
+        var key = sens + "," + dist;
+        if (key === lastKey) { return; }        // same slider cell: nothing to send
+        lastKey = key;
+        window.dash_clientside.set_props("likelihood-pointer", {data: {x: sens / S.sens[0], y: dist / S.dist[0]}});
+    }
+
+    function schedule(gd, e) {
+        pending = {gd: gd, clientX: e.clientX, clientY: e.clientY};
+        if (!frame) { frame = window.requestAnimationFrame(flush); }
+    }
+
+    document.addEventListener("pointerdown", function (e) {
+        var gd = plotOf(e.target);
+        if (!gd || e.button > 0) { return; }
+        dragging = gd;
+        lastKey = null;     // a fresh press always re-sends, in case the sliders moved since
+        if (e.target.setPointerCapture) { e.target.setPointerCapture(e.pointerId); }
+        schedule(gd, e);
+    });
+    document.addEventListener("pointermove", function (e) {
+        if (dragging) { schedule(dragging, e); }
+    });
+    function end() { dragging = false; }
+    document.addEventListener("pointerup", end);
+    document.addEventListener("pointercancel", end);
+})();
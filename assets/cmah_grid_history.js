@@ -0,0 +1,27 @@
+/*
+ * Keyboard shortcuts for the Settings grid editor: Ctrl+Z (Cmd+Z) undoes the
+ * last grid edit, Ctrl+Shift+Z or Ctrl+Y redoes it.
+ *
+ * A shortcut just clicks the Undo/Redo button, so edit_grid in CMAH_dash.py
+ * handles it like any other edit and the history stays in one place. Shortcuts
+ * are ignored while the editor is hidden (another tab is open) or while a text
+ * field has focus, so Ctrl+Z still undoes typing in the profile name box.
+ */
+(function () {
+    function isTextField(el) {
+        return el && (el.isContentEditable || /^(INPUT|TEXTAREA|SELECT)$/.test(el.tagName));
+    }
+
+    document.addEventListener("keydown", function (e) {
+        if (!(e.ctrlKey || e.metaKey) || e.altKey || isTextField(e.target)) { return; }
+        var key = e.key.toLowerCase();
+        if (key !== "z" && key !== "y") { return; }
+        var editor = document.getElementById("grid-editor");
+        if (!editor || editor.offsetParent === null) { return; }
+        var button = document.getElementById(key === "y" || e.shiftKey ? "redo-grid-btn" : "undo-grid-btn");
+        if (button && !button.disabled) {
+            e.preventDefault();
+            button.click();
+        }
+    });
+})();
@@ -0,0 +1,35 @@
+/*
+ * Uncertainty mode gate.
+ *
+ * While the switch on the forecast tab is off, the sliders never reach the
+ * server for uncertainty: the spread controls stay hidden and
+ * "uncertainty-state" is left alone. Once it is on, every change copies the
+ * forecast inputs and spreads into the store, which triggers
+ * update_uncertainty in CMAH_dash.py (Monte Carlo sampling, probability bar).
+ */
+window.dash_clientside = window.dash_clientside || {};
+
+(function () {
+    // DEFAULT_PROBLEM from the layout (sensitivity, distribution, size lo, size hi)
+    function defaults() {
+        var body = document.getElementById("uncertainty-body");
+        return body && body.dataset.defaultProblem ? JSON.parse(body.dataset.defaultProblem) : [2, 1, 1, 4];
+    }
+
+    window.dash_clientside.cmah = Object.assign(window.dash_clientside.cmah || {}, {
+        uncertainty_gate: function (enabled, sensSpread, distSpread, sizeSpread, sensVal, distVal, sizeRange, grid, store) {
+            if (!enabled) {
+                return [{display: "none"}, window.dash_clientside.no_update];
+            }
+            var d = defaults();
+            return [{display: "block"}, {
+                spread: [sensSpread || 0, distSpread || 0, sizeSpread || 0],
+                sens: sensVal === null || sensVal === undefined ? d[0] : sensVal,
+                dist: distVal === null || distVal === undefined ? d[1] : distVal,
+                size: sizeRange || [d[2], d[3]],
+                grid: grid,
+                problems: store,
+            }];
+        },
+    });
+})();
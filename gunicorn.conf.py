@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Gunicorn settings used by start.sh (gunicorn picks this file up automatically
+when started from the repository directory).
+
+    WEB_CONCURRENCY   worker processes                 (default 2)
+    CMAH_THREADS      threads per worker               (default 4)
+    CMAH_TIMEOUT      seconds before a stuck worker is restarted (default 30)
+    CMAH_COLLAB       1: shared grid editing; one worker, plus a thread per open
+                      session stream (CMAH_COLLAB_STREAMS, default 48)
+    PORT              listen port                      (default 10000)
+
+Callbacks hold no per-user state — every input arrives with the request and
+the only shared objects are locked caches and per-thread SQLite connections —
+so any mix of processes and threads is safe. Threads help while a request
+waits on SQLite or the network; CPU-bound figure building scales with
+processes. The app is imported once in the master (preload_app) and forked,
+so workers share its memory copy-on-write and start in milliseconds.
+"""
+import os
+
+bind    = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("CMAH_THREADS", "4"))
+worker_class = "gthread"
+timeout = int(os.environ.get("CMAH_TIMEOUT", "30"))
+graceful_timeout = 20
+keepalive   = 5
+preload_app = True
+
+# Shared editing sessions live in one process and every open stream holds a
+# thread (blocked on the session's Condition, so idle streams cost no CPU)
+if os.environ.get("CMAH_COLLAB", "0") == "1":
+    workers = 1
+    threads += int(os.environ.get("CMAH_COLLAB_STREAMS", "48"))
+
+# More than one worker: share rendered figures between them (CMAH_sharedcache.py)
+if workers > 1:
+    os.environ.setdefault("CMAH_SHARED_CACHE",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "cmah_cache.sqlite3"))
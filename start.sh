@@ -1,2 +1,5 @@
 #!/bin/bash
-exec gunicorn CMAH_dash:server --bind "0.0.0.0:${PORT:-10000}" --timeout 120 --workers 1
+# Fast start (CMAH_snapshot.py) is on by default here; the host sleeps idle workers.
+# Workers, threads and timeout come from gunicorn.conf.py (WEB_CONCURRENCY, CMAH_THREADS, CMAH_TIMEOUT).
+export CMAH_FAST_START="${CMAH_FAST_START:-1}"
+exec gunicorn CMAH_dash:server --config gunicorn.conf.py
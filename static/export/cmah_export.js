@@ -0,0 +1,96 @@
+/*
+ * Read-only forecast page for the static export (python CMAH_export.py).
+ *
+ * Everything is pre-rendered by the exporter: one base figure per matrix plus,
+ * per slider state, the highlight path, crosshair / driver cells and summary
+ * text. This script only looks those up and moves them on the page — no
+ * danger logic runs in the browser and no server is involved.
+ */
+(function () {
+    "use strict";
+
+    var FONT = "Barlow Condensed";
+
+    function el(tag, style, text) {
+        var node = document.createElement(tag);
+        Object.assign(node.style, style || {});
+        if (text !== undefined) { node.textContent = text; }
+        return node;
+    }
+
+    function summaryRow(label, value) {
+        var row = el("div", {marginBottom: "6px"});
+        row.appendChild(el("span", {color: "#666", fontSize: "12px", fontFamily: FONT,
+                                    width: "110px", display: "inline-block"}, label));
+        row.appendChild(el("span", {color: "#ccc", fontSize: "12px", fontFamily: FONT}, value));
+        return row;
+    }
+
+    function rng(labels, lo, hi) {
+        return lo === hi ? labels[lo] : labels[lo] + " → " + labels[hi];
+    }
+
+    function start(B) {
+        var C = B.constants;
+        var likDiv = document.getElementById("likelihood-matrix");
+        var dangerDiv = document.getElementById("danger-matrix");
+        var config = {displayModeBar: false, responsive: true};
+        Plotly.newPlot(likDiv, B.likelihood_figure.data, B.likelihood_figure.layout, config);
+        Plotly.newPlot(dangerDiv, B.danger_figure.data, B.danger_figure.layout, config);
+
+        var inputs = {
+            sens: document.getElementById("sens-slider"),
+            dist: document.getElementById("dist-slider"),
+            sizeLo: document.getElementById("size-lo"),
+            sizeHi: document.getElementById("size-hi"),
+        };
+
+        function render(changed) {
+            var sens = +inputs.sens.value, dist = +inputs.dist.value;
+            var s0 = +inputs.sizeLo.value, s1 = +inputs.sizeHi.value;
+            if (s0 > s1) {      // keep the size range ordered, moving the other handle
+                if (changed === inputs.sizeLo) { inputs.sizeHi.value = s1 = s0; } else { inputs.sizeLo.value = s0 = s1; }
+            }
+            document.getElementById("sens-value").textContent = C.sensitivity_slider_labels[sens];
+            document.getElementById("dist-value").textContent = C.distribution_slider_labels[dist];
+            document.getElementById("size-value").textContent = rng(C.size_labels, s0, s1);
+
+            var point = B.points[sens][dist];       // [l0, l1, path, x, y]
+            var l0 = point[0], l1 = point[1];
+            var box = B.boxes[[l0, l1, s0, s1].join(",")];   // [path, max level, driver xs, driver ys, set-by]
+
+            Plotly.relayout(likDiv, {"shapes[0].path": point[2]});
+            Plotly.restyle(likDiv, {x: [[point[3]]], y: [[point[4]]]}, [1]);
+            Plotly.relayout(dangerDiv, {"shapes[0].path": box[0]});
+            Plotly.restyle(dangerDiv, {x: [box[2]], y: [box[3]]}, [1]);
+
+            var level = C.danger_levels[box[1]];
+            var summary = document.getElementById("forecast-summary");
+            summary.replaceChildren(
+                summaryRow("Sensitivity:", C.sensitivity_slider_labels[sens]),
+                summaryRow("Distribution:", C.distribution_slider_labels[dist]),
+                summaryRow("Likelihood:", rng(C.likelihood_labels, l0, l1)),
+                summaryRow("Size:", rng(C.size_labels, s0, s1)),
+                el("hr", {borderColor: "#1e3a4a", margin: "10px 0"})
+            );
+            var max = el("div");
+            max.appendChild(el("span", {color: "#888", fontSize: "12px", fontFamily: FONT, fontWeight: "700",
+                                        marginRight: "8px"}, "MAX DANGER: "));
+            max.appendChild(el("span", {backgroundColor: C.danger_colors[level], color: C.danger_text[level],
+                                        padding: "2px 10px", fontFamily: FONT, fontWeight: "700",
+                                        fontSize: "14px", borderRadius: "3px"}, level.toUpperCase()));
+            summary.appendChild(max);
+            summary.appendChild(el("div", {color: "#666", fontSize: "11px", fontFamily: FONT, marginTop: "8px"},
+                                   "Set by: " + box[4]));
+        }
+
+        Object.keys(inputs).forEach(function (k) {
+            inputs[k].addEventListener("input", function (e) { render(e.target); });
+        });
+        render(null);
+    }
+
+    fetch(document.body.dataset.bundle)
+        .then(function (r) { return r.json(); })
+        .then(start);
+})();
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep CMAH_dash's profile and history databases out of the repository
+_TMP = tempfile.mkdtemp(prefix="cmah-tests-")
+os.environ.setdefault("CMAH_PROFILE_DB", os.path.join(_TMP, "profiles.sqlite3"))
+os.environ.setdefault("CMAH_HISTORY_DB", os.path.join(_TMP, "history.sqlite3"))
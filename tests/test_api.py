@@ -0,0 +1,65 @@
+import uuid
+
+import pytest
+
+import CMAH_dash
+from CMAH_engine import DEFAULT_GRID_CODE
+
+QUERY = "/api/assess?sensitivity=Reactive&distribution=Specific&size_lo=1&size_hi=2"
+
+
+@pytest.fixture
+def client():
+    return CMAH_dash.server.test_client()
+
+
+def test_single(client):
+    response = client.get(QUERY)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["grid"]["name"] == "default"
+    assert body["likelihood"] == {"lo": "Likely", "hi": "Likely"}
+    assert body["max_danger"] == "Moderate"
+    assert client.get(QUERY, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_batch_matches_single(client):
+    item = {"sensitivity": "Reactive", "distribution": "Specific", "size_lo": 1, "size_hi": 2}
+    response = client.post("/api/assess/batch", json={"items": [item, {**item, "sensitivity": "Touchy"}]})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert len(results) == 2
+    single = client.get(QUERY).get_json()
+    assert results[0] == {k: v for k, v in single.items() if k != "grid"}
+
+
+@pytest.mark.parametrize("grid", ["nope", "nope@3", "a@99999999999999999999999", "a@²"])
+def test_unknown_grid_is_404(client, grid):
+    response = client.get(f"{QUERY}&grid={grid}")
+    assert response.status_code == 404
+    assert "unknown grid" in response.get_json()["error"]
+    assert client.post("/api/assess/batch", json={"grid": grid, "items": []}).status_code == 404
+
+
+@pytest.mark.parametrize("body", [None, [], {"items": "x"}, {"items": [1]}, {"grid": 5, "items": []},
+                                  {"items": [{"sensitivity": "Reactive"}]},
+                                  {"items": [{"sensitivity": "Reactive", "distribution": "Specific",
+                                              "size_lo": 3, "size_hi": 1}]}])
+def test_malformed_batch_is_400(client, body):
+    response = client.post("/api/assess/batch", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_profile_versions(client):
+    name = f"api-{uuid.uuid4().hex[:8]}"
+    edited = str(CMAH_dash.LEVEL_INDEX["Extreme"]) * len(DEFAULT_GRID_CODE)
+    CMAH_dash.PROFILES.save(name, DEFAULT_GRID_CODE)
+    CMAH_dash.PROFILES.save(name, edited)
+
+    assert client.get(f"{QUERY}&grid={name}").get_json()["max_danger"] == "Extreme"
+    assert client.get(f"{QUERY}&grid={name}@2").get_json()["max_danger"] == "Extreme"
+    first = client.get(f"{QUERY}&grid={name}@1")
+    assert first.get_json()["max_danger"] == "Moderate"
+    assert first.get_json()["grid"]["name"] == f"{name}@1"
+    assert client.get(f"{QUERY}&grid={name}@3").status_code == 404
@@ -0,0 +1,78 @@
+import csv
+import math
+import random
+
+import pytest
+
+import CMAH_engine
+
+HEADER = "sensitivity,distribution,size_lo,size_hi\n"
+
+
+def cli_error(capsys, *argv):
+    with pytest.raises(SystemExit) as exc:
+        CMAH_engine.main(list(argv))
+    assert exc.value.code == 2
+    return capsys.readouterr().err
+
+
+def test_cli_missing_input(tmp_path, capsys):
+    assert "No such file" in cli_error(capsys, str(tmp_path / "nope.csv"), "-o", str(tmp_path / "out.csv"))
+
+
+@pytest.mark.parametrize("content", [None, '[["Low", "Nope"]]', "not json"])
+def test_cli_bad_grid_file(tmp_path, capsys, content):
+    (tmp_path / "in.csv").write_text(HEADER + "Reactive,Specific,1,2\n", encoding="utf-8")
+    grid = tmp_path / "grid.json"
+    if content is not None:
+        grid.write_text(content, encoding="utf-8")
+    assert "--grid-file" in cli_error(capsys, str(tmp_path / "in.csv"), "--grid-file", str(grid))
+
+
+def naive_assess(sens, dist, size_lo, size_hi, grid_code):
+    """One state the slow way: every likelihood cell the slider point touches, then every grid cell in the box."""
+    s_pos, d_pos = sens / CMAH_engine.SENSITIVITY_STEPS, dist / CMAH_engine.DISTRIBUTION_STEPS
+    touched = [CMAH_engine.LIKELIHOOD_MATRIX[d][s]
+               for d in {math.floor(d_pos), math.ceil(d_pos)}
+               for s in {math.floor(s_pos), math.ceil(s_pos)}]
+    lik_lo, lik_hi = min(touched), max(touched)
+    level = max(CMAH_engine.grid_cell(grid_code, row, col)
+                for row in range(lik_lo, lik_hi + 1) for col in range(size_lo, size_hi + 1))
+    return lik_lo, lik_hi, level
+
+
+def test_assess_matches_brute_force():
+    rng = random.Random(7)
+    n_levels = len(CMAH_engine.DANGER_LEVELS)
+    n_sizes = len(CMAH_engine.SIZE_LABELS)
+    for _ in range(20):
+        grid_code = "".join(str(rng.randrange(n_levels)) for _ in range(CMAH_engine.GRID_CELLS))
+        states = []
+        for _ in range(200):
+            lo = rng.randrange(n_sizes)
+            states.append((rng.randrange(len(CMAH_engine.SENSITIVITY_SLIDER_LABELS)),
+                           rng.randrange(len(CMAH_engine.DISTRIBUTION_SLIDER_LABELS)),
+                           lo, rng.randrange(lo, n_sizes)))
+        result = CMAH_engine.assess(*zip(*states), grid_code)
+        for state, lik_lo, lik_hi, level in zip(states, result.lik_lo, result.lik_hi, result.max_level):
+            assert (lik_lo, lik_hi, level) == naive_assess(*state, grid_code), state
+
+
+def test_cli_round_trip(tmp_path, capsys):
+    rows = [("Reactive", "Specific", "1", "2"), ("Stubborn", "Isolated", "1", "1"), ("Touchy", "Widespread", "3", "5")]
+    (tmp_path / "in.csv").write_text(HEADER + "".join(",".join(r) + "\n" for r in rows), encoding="utf-8")
+    CMAH_engine.main([str(tmp_path / "in.csv"), "-o", str(tmp_path / "out.csv"), "--chunk-size", "2"])
+    assert "assessed 3 rows" in capsys.readouterr().err
+
+    with open(tmp_path / "out.csv", newline="", encoding="utf-8") as f:
+        out = list(csv.DictReader(f))
+    assert [(r["sensitivity"], r["distribution"], r["size_lo"], r["size_hi"]) for r in out] == rows
+    for r in out:
+        lik_lo, lik_hi, level = naive_assess(
+            CMAH_engine.parse_level(r["sensitivity"], CMAH_engine.SENSITIVITY_LOOKUP),
+            CMAH_engine.parse_level(r["distribution"], CMAH_engine.DISTRIBUTION_LOOKUP),
+            CMAH_engine.parse_size(r["size_lo"]), CMAH_engine.parse_size(r["size_hi"]),
+            CMAH_engine.DEFAULT_GRID_CODE)
+        assert (r["likelihood_lo"], r["likelihood_hi"], r["max_danger"]) == (
+            CMAH_engine.LIKELIHOOD_LABELS[lik_lo], CMAH_engine.LIKELIHOOD_LABELS[lik_hi],
+            CMAH_engine.DANGER_LEVELS[level])
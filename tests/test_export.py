@@ -0,0 +1,21 @@
+import pytest
+
+import CMAH_export
+
+
+@pytest.mark.parametrize("content", ['"123"', '[["Low", "Nope"]]', '{"grid": 1}', "not json"])
+def test_bad_grid_file_is_a_usage_error(tmp_path, capsys, content):
+    path = tmp_path / "grid.json"
+    path.write_text(content, encoding="utf-8")
+    with pytest.raises(SystemExit) as exc:
+        CMAH_export.main(["--grid-file", str(path), "-o", str(tmp_path / "out")])
+    assert exc.value.code == 2
+    assert "--grid-file" in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()
+
+
+def test_export_refuses_foreign_directory(tmp_path):
+    (tmp_path / "notes.txt").write_text("keep me", encoding="utf-8")
+    with pytest.raises(ValueError):
+        CMAH_export.export(str(tmp_path), CMAH_export.DEFAULT_GRID_CODE)
+    assert [p.name for p in tmp_path.iterdir()] == ["notes.txt"]
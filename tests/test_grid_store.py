@@ -0,0 +1,44 @@
+from contextvars import copy_context
+
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+
+import CMAH_dash
+from CMAH_collab import CollabHub
+from CMAH_engine import DEFAULT_GRID_CODE, EMPTY_GRID_HISTORY
+
+
+def triggered(prop_id, callback, *args, updated_props=None):
+    def run():
+        context_value.set(AttributeDict(triggered_inputs=[{"prop_id": prop_id, "value": 1}],
+                                        updated_props=updated_props if updated_props is not None else {}))
+        return callback(*args)
+    return copy_context().run(run)
+
+
+def test_update_all_ignores_malformed_grid():
+    expected = CMAH_dash.update_all(3, 2, [1, 2], DEFAULT_GRID_CODE)
+    for grid in ("12", "x" * len(DEFAULT_GRID_CODE), ["1"], None):
+        assert CMAH_dash.update_all(3, 2, [1, 2], grid) == expected
+
+
+def test_edit_grid_resets_malformed_store():
+    grid, figure, history, undo_disabled, redo_disabled = triggered(
+        "grid-editor.clickData", CMAH_dash.edit_grid,
+        {"points": [{"x": 0, "y": 0}]}, None, None, None, None, "Low", "123", EMPTY_GRID_HISTORY, None)
+    assert grid == DEFAULT_GRID_CODE
+    assert history == EMPTY_GRID_HISTORY
+    assert undo_disabled and redo_disabled
+    assert figure["data"][0]["z"] is not None
+
+
+def test_unpublished_collab_edit_is_local_and_reported(monkeypatch):
+    monkeypatch.setattr(CMAH_dash, "COLLAB", CollabHub())     # no browser is connected to "gone"
+    updated = {}
+    grid, figure, history, undo_disabled, redo_disabled = triggered(
+        "grid-editor.clickData", CMAH_dash.edit_grid,
+        {"points": [{"x": 0, "y": 0}]}, None, None, None, None, "Extreme", DEFAULT_GRID_CODE,
+        EMPTY_GRID_HISTORY, "gone", updated_props=updated)
+    assert grid[0] == str(CMAH_dash.LEVEL_INDEX["Extreme"]) != DEFAULT_GRID_CODE[0]
+    assert not undo_disabled
+    assert "local" in updated["collab-status"]["children"]
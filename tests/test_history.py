@@ -0,0 +1,18 @@
+from CMAH_engine import DEFAULT_GRID_CODE
+from CMAH_history import HistoryStore
+
+
+def rows(zone, day, levels):
+    return [(zone, day, i, 2, 1, 1, 2, 3, 3, level, DEFAULT_GRID_CODE, None, 0.0) for i, level in enumerate(levels)]
+
+
+def test_reimport_replaces_whole_day(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.record_many(rows("Summit", 19000, [2, 4, 3]) + rows("Summit", 19001, [1]))
+    store.record_many(rows("Summit", 19000, [2]))
+
+    assert len(store.forecast("Summit", 19000)) == 1
+    assert len(store.forecast("Summit", 19001)) == 1
+    days, levels = store.daily_max(["Summit"])["Summit"]
+    assert days.tolist() == [19000, 19001]
+    assert levels.tolist() == [2, 1]
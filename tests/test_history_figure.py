@@ -0,0 +1,29 @@
+import numpy as np
+
+import CMAH_dash
+from CMAH_history import downsample
+
+
+def test_long_span_is_one_continuous_line():
+    # 25 seasons of daily data: buckets are wider than HISTORY_GAP_DAYS
+    days = np.arange(19000, 19000 + 25 * 365)
+    levels = (days % 5 + 1).astype(np.uint8)
+    assert len(days) > CMAH_dash.HISTORY_GAP_DAYS * CMAH_dash.HISTORY_MAX_POINTS
+
+    series = {"Turnagain": downsample(days, levels, CMAH_dash.HISTORY_MAX_POINTS)}
+    figure = CMAH_dash.build_history_figure(series)
+
+    line = figure["data"][1]
+    assert line["name"] == "Turnagain"
+    assert None not in line["x"]
+    assert len(line["x"]) == len(series["Turnagain"][0])
+
+
+def test_off_season_still_breaks_the_line():
+    season = np.arange(0, 150)
+    days = np.concatenate([19000 + season, 19365 + season])
+    levels = np.full(len(days), 3, dtype=np.uint8)
+
+    figure = CMAH_dash.build_history_figure({"Summit": downsample(days, levels, 1000)})
+
+    assert figure["data"][1]["x"].count(None) == 1
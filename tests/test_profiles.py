@@ -0,0 +1,51 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from CMAH_engine import DEFAULT_GRID_CODE
+from CMAH_profiles import MAX_VERSION, ProfileStore, parse_profile_ref
+
+
+def in_thread(fn):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_new_thread_sees_external_write(tmp_path):
+    path = str(tmp_path / "profiles.sqlite3")
+    store = ProfileStore(path)
+    store.save("Turnagain", DEFAULT_GRID_CODE)
+    assert store.load("Turnagain")[0] == 1      # cached by this thread
+
+    edited = "1" + DEFAULT_GRID_CODE[1:]
+    with sqlite3.connect(path) as other:        # another process saving a new version
+        other.execute("INSERT INTO grid_profiles (name, version, grid, author, created_at) "
+                      "VALUES (?, 2, ?, NULL, ?)", ("Turnagain", edited, time.time()))
+
+    assert in_thread(lambda: store.load("Turnagain")) == (2, edited)
+    assert store.load("Turnagain") == (2, edited)
+
+
+@pytest.mark.parametrize("ref, expected", [
+    ("Turnagain", ("Turnagain", None)),
+    ("Turnagain@3", ("Turnagain", 3)),
+    ("a@b@2", ("a@b", 2)),
+    ("a@²", ("a@²", None)),
+    ("a@١", ("a@١", None)),
+    (f"a@{MAX_VERSION}", ("a", MAX_VERSION)),
+    (f"a@{MAX_VERSION + 1}", (f"a@{MAX_VERSION + 1}", None)),
+])
+def test_parse_profile_ref(ref, expected):
+    assert parse_profile_ref(ref) == expected
+
+
+def test_oversized_version_is_not_found(tmp_path):
+    store = ProfileStore(str(tmp_path / "profiles.sqlite3"))
+    store.save("a", DEFAULT_GRID_CODE)
+    assert store.load(*parse_profile_ref("a@99999999999999999999999")) is None
+    assert store.load(*parse_profile_ref(f"a@{MAX_VERSION}")) is None
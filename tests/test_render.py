@@ -0,0 +1,43 @@
+import pytest
+
+import CMAH_render
+
+HEADER = "zone,sensitivity,distribution,size_lo,size_hi\n"
+
+
+def run(capsys, *argv):
+    with pytest.raises(SystemExit) as exc:
+        CMAH_render.main(list(argv))
+    assert exc.value.code == 2
+    return capsys.readouterr().err
+
+
+@pytest.mark.parametrize("content", ['[["Low", "Nope"]]', "not json"])
+def test_bad_grid_file_is_a_usage_error(tmp_path, capsys, content):
+    (tmp_path / "in.csv").write_text(HEADER + "Summit,Reactive,Specific,1,2\n", encoding="utf-8")
+    (tmp_path / "grid.json").write_text(content, encoding="utf-8")
+    err = run(capsys, str(tmp_path / "in.csv"), "--grid-file", str(tmp_path / "grid.json"),
+              "-o", str(tmp_path / "out"))
+    assert "--grid-file" in err
+
+
+def test_missing_grid_file_is_a_usage_error(tmp_path, capsys):
+    (tmp_path / "in.csv").write_text(HEADER + "Summit,Reactive,Specific,1,2\n", encoding="utf-8")
+    assert "--grid-file" in run(capsys, str(tmp_path / "in.csv"), "--grid-file", str(tmp_path / "nope.json"))
+
+
+@pytest.mark.parametrize("row", ["Summit,Reactive,Specific,3,1", "Summit,99,Specific,1,2", "Summit,Reactive,-1,1,2"])
+def test_bad_csv_row_is_bad_input(tmp_path, capsys, row):
+    (tmp_path / "in.csv").write_text(HEADER + row + "\n", encoding="utf-8")
+    err = run(capsys, str(tmp_path / "in.csv"), "-o", str(tmp_path / "out"), "--workers", "1")
+    assert "bad input: line 2" in err
+    assert not (tmp_path / "out").exists()
+
+
+def test_zone_slug_clash_is_an_error(tmp_path, capsys):
+    rows = "Turnagain Pass,Reactive,Specific,1,2\nturnagain-pass,Touchy,Specific,1,2\nSummit,Reactive,Specific,1,2\n"
+    (tmp_path / "in.csv").write_text(HEADER + rows, encoding="utf-8")
+    err = run(capsys, str(tmp_path / "in.csv"), "-o", str(tmp_path / "out"), "--workers", "1")
+    assert "'Turnagain Pass' and 'turnagain-pass'" in err
+    assert "Summit" not in err
+    assert not (tmp_path / "out").exists()
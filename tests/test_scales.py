@@ -0,0 +1,65 @@
+import copy
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import CMAH_engine
+from conftest import ROOT
+
+
+def import_with_scales(tmp_path, scales, code):
+    """Run code in a fresh interpreter with CMAH_SCALES pointing at scales; returns its stdout."""
+    path = tmp_path / "scales.json"
+    path.write_text(json.dumps(scales), encoding="utf-8")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                            env={**os.environ, "CMAH_SCALES": str(path)})
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_non_numeric_size_labels(tmp_path):
+    scales = copy.deepcopy(CMAH_engine.DEFAULT_SCALES)
+    scales["size"] = {"labels": ["D1", "D2", "D3", "D4", "D5"], "steps": 2}
+    out = import_with_scales(tmp_path, scales, (
+        "import CMAH_engine as e\n"
+        "print(e.SIZE_LABELS[1], e.parse_size('D2'), e.parse_size('d5'), e.parse_size('3'))\n"
+        "import CMAH_dash\n"
+    ))
+    assert out.split() == ["D1–D2", "2", "8", "3"]
+
+
+def test_non_numeric_size_rejects_unknown(tmp_path):
+    scales = copy.deepcopy(CMAH_engine.DEFAULT_SCALES)
+    scales["size"] = {"labels": ["D1", "D2", "D3"], "steps": 1}
+    scales["danger_grid"] = [["Low"] * 3 for _ in range(9)]
+    out = import_with_scales(tmp_path, scales, (
+        "import CMAH_engine as e\n"
+        "for v in ('D9', '3', '1.5'):\n"
+        "    try:\n"
+        "        e.parse_size(v)\n"
+        "    except ValueError:\n"
+        "        print('rejected')\n"
+    ))
+    assert out.split() == ["rejected"] * 3
+
+
+def test_numeric_sizes_match_by_value():
+    assert CMAH_engine.parse_size("2.0") == CMAH_engine.parse_size("2") == 2
+    with pytest.raises(ValueError):
+        CMAH_engine.parse_size("8")
+
+
+def test_likelihood_cache_holds_every_state(tmp_path):
+    with open(os.path.join(ROOT, "scales", "quarter.json"), encoding="utf-8") as f:
+        scales = json.load(f)
+    out = import_with_scales(tmp_path, scales, (
+        "import CMAH_dash as d\n"
+        "for s in range(len(d.SENSITIVITY_SLIDER_LABELS)):\n"
+        "    for t in range(len(d.DISTRIBUTION_SLIDER_LABELS)):\n"
+        "        d.LIKELIHOOD_FIG_CACHE.get_or_build((s, t), dict)\n"
+        "print(d.LIKELIHOOD_FIG_CACHE.stats()['evictions'], len(d.SENSITIVITY_SLIDER_LABELS))\n"
+    ))
+    assert out.split() == ["0", "13"]